@@ -0,0 +1,90 @@
+"""Benchmark: generation throughput as concurrent requests rise, one at a time vs batched"""
+
+import sys
+import asyncio
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from loguru import logger
+
+from core.config import AIConfig
+from nlp.ai_engine import AIEngine, TRANSFORMERS_AVAILABLE
+
+# Keep log I/O out of the measurements
+logger.remove()
+
+CONCURRENCY = (1, 2, 4, 8)
+NEW_TOKENS = 32
+ROUNDS = 3
+
+PROMPTS = [
+    "User: What is a good way to learn Python?\nAssistant:",
+    "User: Explain what a hash table is.\nAssistant:",
+    "User: How do I stay focused while working from home?\nAssistant:",
+    "User: What should I cook for dinner tonight?\nAssistant:",
+    "User: Why is the sky blue?\nAssistant:",
+    "User: Give me a tip for writing clean code.\nAssistant:",
+    "User: What is the difference between a list and a tuple?\nAssistant:",
+    "User: How can I sleep better?\nAssistant:",
+]
+
+
+async def run_concurrent(engine: AIEngine, concurrency: int):
+    """Stream `concurrency` replies at once; returns (generated tokens, seconds, mean first-text latency)"""
+    start = time.perf_counter()
+
+    async def one(prompt: str):
+        first = None
+        pieces = []
+        async for piece in engine.stream_response(prompt, NEW_TOKENS):
+            if first is None:
+                first = time.perf_counter() - start
+            pieces.append(piece)
+        return len(engine.tokenizer("".join(pieces))["input_ids"]), first
+
+    results = await asyncio.gather(*(one(PROMPTS[i % len(PROMPTS)]) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    tokens = sum(count for count, _ in results)
+    first = sum(latency or elapsed for _, latency in results) / concurrency
+    return tokens, elapsed, first
+
+
+async def bench(batch_size: int):
+    engine = AIEngine(AIConfig(batch_size=batch_size))
+    engine.warm_up()
+    # Warm up the batched path too before measuring
+    await run_concurrent(engine, max(CONCURRENCY))
+
+    label = "one at a time" if batch_size == 1 else f"batched (up to {batch_size})"
+    print(f"  {label}")
+    for concurrency in CONCURRENCY:
+        tokens = elapsed = first = 0.0
+        for _ in range(ROUNDS):
+            round_tokens, round_elapsed, round_first = await run_concurrent(engine, concurrency)
+            tokens += round_tokens
+            elapsed += round_elapsed
+            first += round_first / ROUNDS
+        print(f"    {concurrency} concurrent  {tokens / elapsed:>8.1f} tokens/s   "
+              f"first text after {first * 1000:>7.0f} ms")
+    print()
+    engine.shutdown()
+
+
+def main():
+    if not TRANSFORMERS_AVAILABLE:
+        print("torch and transformers are required for this benchmark")
+        return 1
+
+    print(f"Generation throughput ({AIConfig().model_name}, {NEW_TOKENS} new tokens per reply, "
+          f"{ROUNDS} rounds)\n")
+    asyncio.run(bench(1))
+    asyncio.run(bench(max(CONCURRENCY)))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,106 @@
+"""Benchmark: CPU generation speed and resident memory for each inference mode"""
+
+import sys
+import json
+import os
+import subprocess
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import psutil
+from loguru import logger
+
+from core.config import AIConfig
+from nlp.ai_engine import AIEngine, TRANSFORMERS_AVAILABLE
+
+# Keep log I/O out of the measurements
+logger.remove()
+
+NEW_TOKENS = 48
+ROUNDS = 3
+
+CORES = psutil.cpu_count(logical=False) or os.cpu_count() or 1
+
+# Mode name -> AIConfig settings
+MODES = {
+    "float32": {},
+    "float32, tuned threads": {"cpu_threads": CORES, "cpu_interop_threads": 1},
+    "int8": {"quantize": True},
+    "int8, tuned threads": {"quantize": True, "cpu_threads": CORES, "cpu_interop_threads": 1},
+    "int8, compiled": {"quantize": True, "compile_model": True,
+                       "cpu_threads": CORES, "cpu_interop_threads": 1},
+}
+
+PROMPTS = [
+    "User: What is a good way to learn Python?\nAssistant:",
+    "User: Explain what a hash table is.\nAssistant:",
+    "User: How do I stay focused while working from home?\nAssistant:",
+    "User: Why is the sky blue?\nAssistant:",
+]
+
+
+def run_mode(name: str) -> dict:
+    """Load the model in one mode and time generations (one mode per process)"""
+    import torch
+
+    torch.manual_seed(0)
+    # One prompt at a time and no prefix reuse, so only the mode differs
+    engine = AIEngine(AIConfig(batch_size=1, prefix_cache_mb=0, **MODES[name]))
+    start = time.perf_counter()
+    engine.warm_up()
+    load_seconds = time.perf_counter() - start
+
+    # An untimed round first: compiled graphs build on their first shapes
+    for prompt in PROMPTS:
+        engine.generate_response(prompt, NEW_TOKENS)
+
+    tokens = 0
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for prompt in PROMPTS:
+            reply = engine.generate_response(prompt, NEW_TOKENS)
+            tokens += len(engine.tokenizer(reply)["input_ids"])
+    elapsed = time.perf_counter() - start
+    engine.shutdown()
+
+    return {
+        "tokens_per_second": tokens / elapsed,
+        "load_seconds": load_seconds,
+        "rss_mb": psutil.Process().memory_info().rss / 1_000_000,
+        "threads": torch.get_num_threads(),
+    }
+
+
+def main():
+    if not TRANSFORMERS_AVAILABLE:
+        print("torch and transformers are required for this benchmark")
+        return 1
+
+    if len(sys.argv) == 3 and sys.argv[1] == "--mode":
+        print(json.dumps(run_mode(sys.argv[2])))
+        return 0
+
+    print(f"CPU inference modes ({AIConfig().model_name}, {len(PROMPTS)} prompts x {ROUNDS} rounds, "
+          f"{NEW_TOKENS} new tokens per reply, {CORES} cores)\n")
+    print(f"  {'mode':<24} {'tokens/s':>9} {'RSS':>9} {'load':>7} {'threads':>8}")
+    for name in MODES:
+        # A fresh process per mode: thread pools can only be sized once per
+        # process, and memory a mode allocated would inflate the next one's RSS
+        result = subprocess.run([sys.executable, __file__, "--mode", name],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            error = (result.stderr.strip().splitlines() or ["no output"])[-1]
+            print(f"  {name:<24} failed: {error}")
+            continue
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"  {name:<24} {stats['tokens_per_second']:>9.1f} {stats['rss_mb']:>6.0f} MB "
+              f"{stats['load_seconds']:>6.1f}s {stats['threads']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
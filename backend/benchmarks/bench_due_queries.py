@@ -0,0 +1,124 @@
+"""Benchmark: due-time range queries on text due_date/due_time vs the indexed due_at"""
+
+import sys
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from loguru import logger
+
+from core.database import close_all
+from nlp.reminder_system import ReminderSystem, compute_due_at, DEFAULT_DUE_TIME, REMINDER_SELECT
+
+# Keep log I/O out of the measurements
+logger.remove()
+
+ROWS = 100_000
+ROUNDS = 50
+
+# Due dates spread a year either side of now; some reminders have no date
+SPREAD_DAYS = 365
+UNDATED_SHARE = 0.1
+
+# The same local timestamp the text columns compare as strings
+TEXT_DUE_SQL = f"due_date || ' ' || COALESCE(due_time, '{DEFAULT_DUE_TIME}')"
+
+
+def populate(reminders: ReminderSystem):
+    """Insert ROWS reminders straight into the table (create_reminder per row is slow)"""
+    rng = random.Random(42)
+    now = datetime.now()
+    rows = []
+    for i in range(ROWS):
+        if rng.random() < UNDATED_SHARE:
+            rows.append((f"reminder {i}", None, None, None, "pending"))
+            continue
+        due = now + timedelta(minutes=rng.randint(-SPREAD_DAYS * 1440, SPREAD_DAYS * 1440))
+        due_date = due.strftime("%Y-%m-%d")
+        due_time = due.strftime("%H:%M") if rng.random() < 0.7 else None
+        status = "completed" if rng.random() < 0.3 else "pending"
+        rows.append((f"reminder {i}", due_date, due_time, compute_due_at(due_date, due_time), status))
+
+    with reminders.db.transaction() as cursor:
+        cursor.executemany("""
+            INSERT INTO reminders (title, due_date, due_time, due_at, status)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+        cursor.execute("ANALYZE")
+
+
+def text_range(reminders: ReminderSystem, after, before, limit=None):
+    """The string-comparison version: every pending row's key is built and compared"""
+    conditions = ["status = 'pending'", "due_date IS NOT NULL"]
+    params = []
+    if after is not None:
+        conditions.append(f"{TEXT_DUE_SQL} >= ?")
+        params.append(datetime.fromtimestamp(after).strftime("%Y-%m-%d %H:%M"))
+    if before is not None:
+        conditions.append(f"{TEXT_DUE_SQL} < ?")
+        params.append(datetime.fromtimestamp(before).strftime("%Y-%m-%d %H:%M"))
+
+    with reminders.db.transaction() as cursor:
+        cursor.execute(f"""
+            {REMINDER_SELECT} WHERE {' AND '.join(conditions)}
+            ORDER BY {TEXT_DUE_SQL}, id
+            LIMIT ?
+        """, params + [limit if limit is not None else -1])
+        return [reminders._reminder_from_row(row) for row in cursor.fetchall()]
+
+
+def indexed_range(reminders: ReminderSystem, after, before, limit=None):
+    """The due_at version"""
+    return reminders.get_due_between("reminders", after, before, limit=limit)
+
+
+def measure(label: str, query) -> float:
+    """Run a query ROUNDS times and report milliseconds per query"""
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        query()
+    per_query = (time.perf_counter() - start) / ROUNDS * 1000
+    print(f"    {label:<8} {per_query:>8.3f} ms/query")
+    return per_query
+
+
+def main():
+    print(f"Due-time range query benchmark ({ROWS:,} reminders, {ROUNDS} rounds)\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reminders = ReminderSystem(Path(tmp) / "reminders.db")
+        populate(reminders)
+
+        # Whole minutes, so both versions see the same boundaries
+        now = int(time.time()) // 60 * 60
+        # name -> (after, before, limit)
+        cases = {
+            "due in the next hour": (now, now + 3600, None),
+            "due in the next day": (now, now + 86400, None),
+            "due last week": (now - 7 * 86400, now - 6 * 86400, None),
+            "oldest 20 overdue": (None, now, 20),
+            "all overdue": (None, now, None),
+        }
+
+        for name, (after, before, limit) in cases.items():
+            expected = text_range(reminders, after, before, limit)
+            assert expected == indexed_range(reminders, after, before, limit), name
+
+            print(f"  {name} ({len(expected):,} rows)")
+            before_ms = measure("text", lambda: text_range(reminders, after, before, limit))
+            after_ms = measure("due_at", lambda: indexed_range(reminders, after, before, limit))
+            print(f"    speedup  {before_ms / after_ms:>8.1f}x\n")
+
+        close_all()
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,123 @@
+"""Benchmark: conversation history reads and database size, before and after retention"""
+
+import sys
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from loguru import logger
+
+from core.database import close_all
+from user.profile import UserProfile, TIMESTAMP_FORMAT, encode_history_cursor
+
+# Keep log I/O out of the measurements
+logger.remove()
+
+# About five years of chat at 100 exchanges a day
+ROWS = 180_000
+ROUNDS = 50
+PAGE_SIZE = 20
+HOT_DAYS = 90
+
+WORDS = "the a to and of is in it you that for on my can what how do this with be".split()
+
+
+def populate(profile: UserProfile):
+    """Insert ROWS exchanges straight into the table, oldest first"""
+    rng = random.Random(42)
+    start = datetime.now(timezone.utc) - timedelta(days=5 * 365)
+
+    def sentence(words: int) -> str:
+        return " ".join(rng.choices(WORDS, k=words))
+
+    rows = [
+        (sentence(rng.randint(4, 16)), sentence(rng.randint(8, 30)),
+         (start + timedelta(minutes=15 * i)).strftime(TIMESTAMP_FORMAT))
+        for i in range(ROWS)
+    ]
+    with profile.db.transaction() as cursor:
+        cursor.executemany("""
+            INSERT INTO conversations (user_input, assistant_response, timestamp)
+            VALUES (?, ?, ?)
+        """, rows)
+
+
+def unindexed_history(profile: UserProfile):
+    """The original read: sort the whole table by an unindexed timestamp"""
+    with profile.db.transaction() as cursor:
+        cursor.execute("""
+            SELECT user_input, assistant_response, timestamp
+            FROM conversations NOT INDEXED
+            ORDER BY timestamp DESC
+            LIMIT ?
+        """, (PAGE_SIZE,))
+        return cursor.fetchall()
+
+
+def measure(label: str, read) -> float:
+    """Run a read ROUNDS times and report milliseconds per read"""
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        read()
+    per_read = (time.perf_counter() - start) / ROUNDS * 1000
+    print(f"    {label:<16} {per_read:>8.3f} ms/read")
+    return per_read
+
+
+def file_size(path: Path) -> str:
+    return f"{path.stat().st_size / 1_000_000:.1f} MB"
+
+
+def main():
+    print(f"Conversation history benchmark ({ROWS:,} exchanges, pages of {PAGE_SIZE})\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        profile = UserProfile(Path(tmp), "Bench")
+        populate(profile)
+        profile.db.reclaim_space()
+
+        print("  Latest page")
+        before_ms = measure("unindexed", lambda: unindexed_history(profile))
+        after_ms = measure("indexed", lambda: profile.get_conversation_page(PAGE_SIZE))
+        print(f"    speedup          {before_ms / after_ms:>8.1f}x\n")
+
+        print(f"  Keeping {HOT_DAYS} days in the main database")
+        print(f"    main database before   {file_size(profile.db_path)}")
+        start = time.perf_counter()
+        result = profile.compact_history(HOT_DAYS)
+        print(f"    compacted in           {time.perf_counter() - start:.1f}s "
+              f"({result['archived']:,} exchanges archived)")
+        print(f"    main database after    {file_size(profile.db_path)}")
+        print(f"    archive                {file_size(profile.archive.db.db_path)}\n")
+
+        # Continue from two years ago: the read decompresses one chunk
+        two_years_ago = (datetime.now(timezone.utc) - timedelta(days=2 * 365)).strftime(TIMESTAMP_FORMAT)
+        cursor = encode_history_cursor({"timestamp": two_years_ago, "id": 0})
+        assert len(profile.get_conversation_page(PAGE_SIZE, cursor)["items"]) == PAGE_SIZE
+        stats = profile.get_history_stats()
+
+        print(f"  Archived page ({stats['archive']['chunks']} chunks)")
+        measure("latest page", lambda: profile.get_conversation_page(PAGE_SIZE))
+        measure("two years back", lambda: profile.get_conversation_page(PAGE_SIZE, cursor))
+        measure("uncached", lambda: (profile.archive._cache.clear(),
+                                     profile.get_conversation_page(PAGE_SIZE, cursor)))
+
+        # Every exchange uses these words: both indexes rank a full window
+        print("\n  Search (main database and archive)")
+        assert len(profile.search_conversations("what you", PAGE_SIZE)) == PAGE_SIZE
+        measure("common words", lambda: profile.search_conversations("what you", PAGE_SIZE))
+
+        profile.conversation_writer.close()
+        close_all()
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,151 @@
+"""Benchmark: per-message cost of UserMemory.analyze_message"""
+
+import sys
+import re
+import tempfile
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from loguru import logger
+
+from core.database import close_all
+from user.profile import UserProfile
+from user.memory import UserMemory
+
+# Keep log I/O out of the measurements
+logger.remove()
+
+ROUNDS = 2000
+
+MESSAGES = [
+    "hey what's up",
+    "Could you please remind me about the project meeting tomorrow?",
+    "i am working on a python script for my job and it keeps crashing!!",
+    "I live in Berlin and I work as a software engineer",
+    "i like playing video games and watching movies lol",
+    "Kindly explain how this function works, I would appreciate it 🙂",
+    "what's the weather like",
+    "I want to learn more about machine learning and study a course on AI",
+]
+
+
+class OriginalMemory(UserMemory):
+    """The previous analyzer: patterns rebuilt and text re-lowercased per call"""
+
+    def analyze_message(self, message):
+        self.session_data["interaction_count"] += 1
+        self._update_avg_message_length(len(message.split()))
+        self._detect_formality(message)
+        self._detect_emoji_usage(message)
+        self._extract_common_phrases(message.lower().split())
+        topics = self._extract_topics(message)
+        self.session_data["topics_discussed"].extend(topics)
+        self._update_interests(topics)
+        self._extract_user_facts(message)
+
+    def _detect_formality(self, message):
+        casual_indicators = [
+            r"\b(hey|hi|sup|yo|yeah|yep|nah|gonna|wanna|gotta)\b",
+            r"[!]{2,}",
+            r"\blol\b|\blmao\b|\bhaha\b"
+        ]
+        formal_indicators = [
+            r"\b(greetings|please|thank you|could you|would you|sir|madam)\b",
+            r"\b(kindly|appreciate|grateful)\b"
+        ]
+        casual_score = sum(1 for pattern in casual_indicators if re.search(pattern, message.lower()))
+        formal_score = sum(1 for pattern in formal_indicators if re.search(pattern, message.lower()))
+        if casual_score > formal_score:
+            self._set_style("formality", "casual")
+        elif formal_score > casual_score:
+            self._set_style("formality", "formal")
+        else:
+            self._set_style("formality", "neutral")
+
+    def _detect_emoji_usage(self, message):
+        emoji_pattern = r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]'
+        if re.search(emoji_pattern, message):
+            self._set_style("emoji_usage", True)
+
+    def _extract_topics(self, message):
+        topic_keywords = {
+            "programming": ["code", "program", "script", "python", "java", "javascript", "function", "debug"],
+            "work": ["work", "job", "office", "project", "meeting", "deadline", "boss"],
+            "technology": ["computer", "system", "software", "hardware", "tech", "ai", "ml"],
+            "personal": ["i am", "i like", "i love", "i want", "my", "me"],
+            "entertainment": ["movie", "game", "music", "video", "watch", "play"],
+            "learning": ["learn", "study", "teach", "tutorial", "course", "understand"],
+            "health": ["exercise", "health", "fitness", "sleep", "diet"],
+            "hobbies": ["hobby", "interest", "enjoy", "fun", "leisure"],
+        }
+        message_lower = message.lower()
+        return [
+            topic for topic, keywords in topic_keywords.items()
+            if any(keyword in message_lower for keyword in keywords)
+        ]
+
+    def _extract_user_facts(self, message):
+        message_lower = message.lower()
+        name_match = re.search(r"(my name is|i'm|i am|call me) (\w+)", message_lower)
+        if name_match:
+            self._set_fact("name", name_match.group(2).capitalize())
+        location_match = re.search(r"(i live in|i'm from|located in) ([\w\s]+)", message_lower)
+        if location_match:
+            self._set_fact("location", location_match.group(2).strip())
+        occupation_match = re.search(r"(i work as|i am a|i'm a) ([\w\s]+)", message_lower)
+        if occupation_match:
+            self._set_fact("occupation", occupation_match.group(2).strip())
+        likes_match = re.search(r"i (like|love|enjoy|prefer) ([\w\s]+)", message_lower)
+        if likes_match:
+            likes = self.user_facts.setdefault("likes", [])
+            if likes_match.group(2).strip() not in likes:
+                likes.append(likes_match.group(2).strip())
+        dislikes_match = re.search(r"i (don't like|hate|dislike) ([\w\s]+)", message_lower)
+        if dislikes_match:
+            dislikes = self.user_facts.setdefault("dislikes", [])
+            if dislikes_match.group(2).strip() not in dislikes:
+                dislikes.append(dislikes_match.group(2).strip())
+
+
+def measure(label: str, memory: UserMemory) -> float:
+    """Analyze every message ROUNDS times and report microseconds per message"""
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for message in MESSAGES:
+            memory.analyze_message(message)
+    elapsed = time.perf_counter() - start
+    per_message = elapsed / (ROUNDS * len(MESSAGES)) * 1e6
+    print(f"  {label:<10} {per_message:>8.1f} µs/message")
+    return per_message
+
+
+def main():
+    print(f"analyze_message benchmark ({ROUNDS * len(MESSAGES)} messages)\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        profile = UserProfile(Path(tmp), "Bench")
+
+        old, new = OriginalMemory(profile), UserMemory(profile)
+
+        # Same topics detected either way
+        for message in MESSAGES:
+            assert new._extract_topics(message.lower()) == old._extract_topics(message), message
+
+        before = measure("before", old)
+        after = measure("after", new)
+
+        # Save now, while the temporary profile still exists
+        old.save_memory()
+        new.save_memory()
+        close_all()
+
+    print(f"\nSpeedup: {before / after:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
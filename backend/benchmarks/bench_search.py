@@ -0,0 +1,137 @@
+"""Benchmark: searching conversation history with LIKE scans vs the FTS5 index"""
+
+import sys
+import itertools
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from loguru import logger
+
+from core.database import close_all, fts_match_query
+from user.profile import UserProfile
+
+# Keep log I/O out of the measurements
+logger.remove()
+
+# About five years of chat at 100 exchanges a day
+ROWS = 180_000
+ROUNDS = 20
+PAGE_SIZE = 10
+
+# Word frequencies in chat follow Zipf's law: a few words are everywhere,
+# most are rare. Pseudo-words keep the vocabulary large and realistic.
+VOCABULARY_SIZE = 20_000
+SYLLABLES = "ba ko ri su te ma ne lo pi da ge hu ya zo fe wi".split()
+
+
+def make_vocabulary(rng: random.Random) -> list:
+    """Distinct pronounceable pseudo-words, most frequent first"""
+    words = {}
+    while len(words) < VOCABULARY_SIZE:
+        words["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))] = None
+    return list(words)
+
+
+def populate(profile: UserProfile, vocabulary: list):
+    """Insert ROWS exchanges straight into the table (the triggers index them)"""
+    rng = random.Random(42)
+    start = datetime.now() - timedelta(days=5 * 365)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+    def sentence(words: int) -> str:
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=words))
+
+    rows = [
+        (sentence(rng.randint(4, 16)), sentence(rng.randint(8, 30)),
+         (start + timedelta(minutes=15 * i)).strftime("%Y-%m-%d %H:%M:%S"))
+        for i in range(ROWS)
+    ]
+    with profile.db.transaction() as cursor:
+        cursor.executemany("""
+            INSERT INTO conversations (user_input, assistant_response, timestamp)
+            VALUES (?, ?, ?)
+        """, rows)
+
+
+def like_search(profile: UserProfile, query: str):
+    """The scan an unindexed search would do: every word somewhere in either column"""
+    conditions, params = [], []
+    for word in query.split():
+        conditions.append("(user_input LIKE ? OR assistant_response LIKE ?)")
+        params += [f"%{word}%", f"%{word}%"]
+
+    with profile.db.transaction() as cursor:
+        cursor.execute(f"""
+            SELECT id, user_input, assistant_response, timestamp
+            FROM conversations
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id DESC
+            LIMIT ?
+        """, params + [PAGE_SIZE])
+        return cursor.fetchall()
+
+
+def measure(label: str, search) -> float:
+    """Run a search ROUNDS times and report milliseconds per query"""
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        search()
+    per_query = (time.perf_counter() - start) / ROUNDS * 1000
+    print(f"    {label:<6} {per_query:>9.2f} ms/query")
+    return per_query
+
+
+def main():
+    print(f"Conversation search benchmark ({ROWS:,} exchanges, first page of {PAGE_SIZE})")
+    print("LIKE returns the newest matches unranked, so it stops early on common words;")
+    print("FTS5 ranks matches by relevance.\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        profile = UserProfile(Path(tmp), "Bench")
+        vocabulary = make_vocabulary(random.Random(7))
+
+        start = time.perf_counter()
+        populate(profile, vocabulary)
+        print(f"  Inserted and indexed in {time.perf_counter() - start:.1f}s\n")
+
+        queries = {
+            "rare word": vocabulary[15_000],
+            "uncommon word": vocabulary[2_000],
+            "two words": f"{vocabulary[300]} {vocabulary[900]}",
+            "common word": vocabulary[50],
+            "no match": "zzzz",
+        }
+
+        for name, query in queries.items():
+            # Every hit contains every word
+            for hit in profile.search_conversations(query, PAGE_SIZE):
+                words = set(f"{hit['user']} {hit['assistant']}".split())
+                assert words.issuperset(query.split()), name
+
+            with profile.db.transaction() as cursor:
+                cursor.execute(
+                    "SELECT COUNT(*) FROM conversations_fts WHERE conversations_fts MATCH ?",
+                    (fts_match_query(query),)
+                )
+                matches = cursor.fetchone()[0]
+
+            print(f"  {name}: \"{query}\" ({matches:,} matching exchanges)")
+            like_ms = measure("LIKE", lambda: like_search(profile, query))
+            fts_ms = measure("FTS5", lambda: profile.search_conversations(query, PAGE_SIZE))
+            print(f"    speedup {like_ms / fts_ms:>9.1f}x\n")
+
+        profile.conversation_writer.close()
+        close_all()
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,123 @@
+"""Benchmark: connect-per-query SQLite access vs the shared storage layer"""
+
+import sys
+import json
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from loguru import logger
+
+from core.database import close_all
+from user.profile import UserProfile
+
+# Keep log I/O out of the measurements
+logger.remove()
+
+OPERATIONS = 2000
+
+
+class ConnectPerQueryProfile:
+    """The original access pattern: open, query, commit and close every call"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS preferences (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_input TEXT,
+                assistant_response TEXT,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def set_preference(self, key, value):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            INSERT OR REPLACE INTO preferences (key, value, updated_at)
+            VALUES (?, ?, ?)
+        """, (key, json.dumps(value), datetime.now()))
+        conn.commit()
+        conn.close()
+
+    def get_preference(self, key, default=None):
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute("SELECT value FROM preferences WHERE key = ?", (key,)).fetchone()
+        conn.close()
+        return json.loads(row[0]) if row else default
+
+    def save_conversation(self, user_input, assistant_response):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            INSERT INTO conversations (user_input, assistant_response)
+            VALUES (?, ?)
+        """, (user_input, assistant_response))
+        conn.commit()
+        conn.close()
+
+
+def measure(label: str, operation, finish=None) -> float:
+    """Run an operation OPERATIONS times (then finish, if given) and report ops/sec"""
+    start = time.perf_counter()
+    for i in range(OPERATIONS):
+        operation(i)
+    if finish:
+        finish()
+    elapsed = time.perf_counter() - start
+    ops = OPERATIONS / elapsed
+    print(f"  {label:<22} {ops:>10,.0f} ops/sec")
+    return ops
+
+
+def run(profile) -> dict:
+    """Benchmark the profile operations used on every message"""
+    return {
+        "get_preference": measure("get_preference", lambda i: profile.get_preference("total_messages", 0)),
+        "set_preference": measure("set_preference", lambda i: profile.set_preference("total_messages", i)),
+        "save_conversation": measure(
+            "save_conversation",
+            lambda i: profile.save_conversation(f"message {i}", "response"),
+            getattr(profile, "flush", None)
+        ),
+    }
+
+
+def main():
+    print(f"SQLite storage benchmark ({OPERATIONS} operations each)\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        print("Before: connect per query")
+        (tmp / "before").mkdir()
+        before = run(ConnectPerQueryProfile(tmp / "before" / "user_profile.db"))
+
+        print("\nAfter: shared per-thread connection (WAL)")
+        after = run(UserProfile(tmp / "after", "Bench"))
+        close_all()
+
+    print("\nSpeedup:")
+    for name in before:
+        print(f"  {name:<22} {after[name] / before[name]:>9.1f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,110 @@
+"""Load test: /api/command throughput with 1, 2 and 4 worker processes"""
+
+import os
+import sys
+import socket
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import httpx
+
+backend_dir = Path(__file__).parent.parent
+
+WORKER_COUNTS = (1, 2, 4)
+CLIENTS = 8
+DURATION = 10.0
+STARTUP_TIMEOUT = 60.0
+
+MESSAGES = [
+    "hello",
+    "what time is it",
+    "show my todos",
+    "add todo review the load test results",
+    "system info",
+    "thanks",
+]
+
+
+def free_port() -> int:
+    """Ask the OS for an unused TCP port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(base_url: str):
+    """Poll /api/status until the server answers"""
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/api/status", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+def client(base_url: str, client_id: int) -> int:
+    """Send commands over one keep-alive connection until time runs out"""
+    completed = 0
+    deadline = time.monotonic() + DURATION
+    with httpx.Client(base_url=base_url, timeout=30.0) as http:
+        while time.monotonic() < deadline:
+            message = MESSAGES[completed % len(MESSAGES)]
+            response = http.post(
+                "/api/command",
+                params={"text": message, "session_id": f"load-{client_id}"}
+            )
+            response.raise_for_status()
+            completed += 1
+    return completed
+
+
+def run(workers: int) -> float:
+    """Start the server with N workers, load it and return requests/sec"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, YAAN_WORKERS=str(workers), YAAN_PORT=str(port), YAAN_HOST="127.0.0.1")
+
+    with tempfile.TemporaryDirectory() as cwd:
+        server = subprocess.Popen(
+            [sys.executable, str(backend_dir / "main.py")],
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(base_url)
+
+            start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=CLIENTS) as pool:
+                counts = list(pool.map(client, [base_url] * CLIENTS, range(CLIENTS)))
+            elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    rps = sum(counts) / elapsed
+    print(f"  {workers} worker(s): {rps:>8,.0f} req/s")
+    return rps
+
+
+def main():
+    print(f"/api/command load test ({CLIENTS} clients, {DURATION:.0f}s each, {os.cpu_count()} CPUs)\n")
+
+    results = {workers: run(workers) for workers in WORKER_COUNTS}
+
+    print("\nSpeedup vs 1 worker:")
+    for workers, rps in results.items():
+        print(f"  {workers} worker(s): {rps / results[1]:>6.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -14,6 +14,9 @@ class ServerConfig(BaseModel):
     port: int = 8000
     debug: bool = True
     workers: int = 1
+    metrics_interval: float = 5.0  # Seconds between system metrics samples
+    max_sessions: int = 1000  # Conversation sessions kept in memory
+    session_ttl: float = 1800.0  # Seconds before an idle session is dropped
 
 
 class AIConfig(BaseModel):
@@ -23,6 +26,14 @@ class AIConfig(BaseModel):
     max_tokens: int = 150
     temperature: float = 0.7
     use_gpu: bool = False  # Set to True if GPU available
+    batch_size: int = 8  # Concurrent prompts generated together at most
+    batch_window: float = 0.02  # Seconds a prompt waits for others to join its batch
+    prefix_cache_mb: int = 256  # Memory for cached conversation prefixes across sessions (0 disables)
+    # CPU inference
+    cpu_threads: int = 0  # Threads within each operation (0 = torch's default, one per core)
+    cpu_interop_threads: int = 0  # Threads running independent operations (0 = torch's default)
+    quantize: bool = False  # Dynamic int8 quantization of linear layers
+    compile_model: bool = False  # Compile the forward pass with torch.compile (slow first replies)
 
 
 class VoiceConfig(BaseModel):
@@ -40,12 +51,19 @@ class UserConfig(BaseModel):
     language: str = "en"
 
 
+class HistoryConfig(BaseModel):
+    """Conversation history retention"""
+    hot_days: int = 90  # Days of conversations kept in the main database; older ones are archived
+    compact_interval: float = 3600.0  # Seconds between archive and vacuum passes
+
+
 class YAANConfig(BaseModel):
     """Main YAAN configuration"""
     server: ServerConfig = ServerConfig()
     ai: AIConfig = AIConfig()
     voice: VoiceConfig = VoiceConfig()
     user: UserConfig = UserConfig()
+    history: HistoryConfig = HistoryConfig()
     data_dir: Path = Path("data")
     models_dir: Path = Path("models")
     logs_dir: Path = Path("logs")
@@ -74,7 +92,11 @@ def load_config(config_path: Optional[str] = None) -> YAANConfig:
         config.server.host = os.getenv("YAAN_HOST")
     if os.getenv("YAAN_PORT"):
         config.server.port = int(os.getenv("YAAN_PORT"))
+    if os.getenv("YAAN_WORKERS"):
+        config.server.workers = int(os.getenv("YAAN_WORKERS"))
     if os.getenv("YAAN_USER_NAME"):
         config.user.name = os.getenv("YAAN_USER_NAME")
+    if os.getenv("YAAN_HISTORY_HOT_DAYS"):
+        config.history.hot_days = int(os.getenv("YAAN_HISTORY_HOT_DAYS"))
     
     return config
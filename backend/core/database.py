@@ -0,0 +1,407 @@
+"""
+Shared SQLite storage layer for YAAN
+Keeps long-lived, per-thread connections instead of reconnecting per query
+"""
+
+import atexit
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from core.logger import setup_logger
+
+logger = setup_logger("Database")
+
+# Prepared statements kept per connection (sqlite3's LRU statement cache)
+CACHED_STATEMENTS = 256
+
+# Seconds to wait on a locked database before raising
+BUSY_TIMEOUT = 5.0
+
+PRAGMAS = [
+    "PRAGMA auto_vacuum = INCREMENTAL",  # Only takes effect on new files
+    "PRAGMA journal_mode = WAL",    # Readers don't block the writer
+    "PRAGMA synchronous = NORMAL",  # Safe with WAL, far fewer fsyncs
+    "PRAGMA cache_size = -8000",    # 8 MB page cache per connection
+    "PRAGMA temp_store = MEMORY",
+]
+
+# PRAGMA auto_vacuum value for incremental mode
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Full-text index tokenizer: Unicode word splitting plus English stemming
+FTS_TOKENIZER = "porter unicode61"
+
+# Write-behind defaults: flush every N rows or after T seconds, whichever first
+WRITE_BATCH_SIZE = 50
+WRITE_FLUSH_INTERVAL = 0.25
+WRITE_MAX_PENDING = 1000
+
+
+class Database:
+    """Thread-safe handle to one SQLite file with a connection per thread"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._writers: List["WriteBehindQueue"] = []
+
+    def connection(self) -> sqlite3.Connection:
+        """Get (or open) the calling thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=BUSY_TIMEOUT,
+                cached_statements=CACHED_STATEMENTS,
+                # Only this thread uses it, but close() may run from another
+                check_same_thread=False
+            )
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+
+        return conn
+
+    @contextmanager
+    def transaction(self, immediate: bool = False) -> Iterator[sqlite3.Cursor]:
+        """
+        Run statements in one transaction on the thread's connection
+
+        Commits on success and rolls back if the block raises. A transaction
+        opened inside another one on the same thread joins the outer one.
+
+        Args:
+            immediate: Take the write lock up front (BEGIN IMMEDIATE), which
+                serializes read-modify-write blocks across processes
+
+        Yields:
+            Cursor for the calling thread's connection
+        """
+        conn = self.connection()
+        nested = conn.in_transaction
+        if immediate and not nested:
+            conn.execute("BEGIN IMMEDIATE")
+
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            if not nested:
+                conn.commit()
+        except Exception:
+            if not nested:
+                conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def changed_elsewhere(self) -> bool:
+        """
+        Whether another connection has committed since this thread last asked
+
+        Uses PRAGMA data_version, which changes when any other connection
+        (another thread, a write-behind queue or another process) commits.
+        Commits made on the calling thread's own connection don't count.
+        The first call on each thread returns True.
+        """
+        version = self.connection().execute("PRAGMA data_version").fetchone()[0]
+        last = getattr(self._local, "data_version", None)
+        self._local.data_version = version
+        return version != last
+
+    def migrate(self, migrations: Sequence[Sequence[str]]):
+        """
+        Bring the schema up to date
+
+        The schema version is kept in PRAGMA user_version. Migration N (1-based)
+        runs when the stored version is below N, in its own write-locked
+        transaction, so concurrent processes apply each migration only once.
+
+        Args:
+            migrations: Ordered list of migrations, each a list of SQL statements.
+                Only ever append to it; released migrations must not change.
+        """
+        for version, statements in enumerate(migrations, start=1):
+            with self.transaction(immediate=True) as cursor:
+                cursor.execute("PRAGMA user_version")
+                if cursor.fetchone()[0] >= version:
+                    continue
+
+                for statement in statements:
+                    cursor.execute(statement)
+                # PRAGMA arguments can't be bound parameters
+                cursor.execute(f"PRAGMA user_version = {int(version)}")
+
+            logger.info(f"Migrated {self.db_path.name} to schema version {version}")
+
+    def reclaim_space(self, max_pages: Optional[int] = None) -> int:
+        """
+        Give free pages back to the filesystem and truncate the WAL
+
+        Files created before auto_vacuum was enabled are rebuilt with one full
+        VACUUM to switch them to incremental mode; after that only free pages
+        are moved, which is cheap. Call it outside any transaction.
+
+        Args:
+            max_pages: Free at most this many pages (None: all of them)
+
+        Returns:
+            Number of pages freed
+        """
+        conn = self.connection()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            before = conn.execute("PRAGMA page_count").fetchone()[0]
+            conn.execute("VACUUM")
+            freed = before - conn.execute("PRAGMA page_count").fetchone()[0]
+            logger.info(f"Switched {self.db_path.name} to incremental vacuum")
+        else:
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            # The pragma frees one page per step; execute() would only step it once
+            conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages or 0)})")
+            freed = before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return freed
+
+    def write_behind(self, sql: str, batch_size: int = WRITE_BATCH_SIZE,
+                     flush_interval: float = WRITE_FLUSH_INTERVAL,
+                     max_pending: int = WRITE_MAX_PENDING) -> "WriteBehindQueue":
+        """
+        Create a background batch writer for one INSERT/UPDATE statement
+
+        The writer is flushed and stopped when this database is closed.
+
+        Args:
+            sql: Parameterized statement executed for each queued row
+            batch_size: Rows written per transaction at most
+            flush_interval: Seconds a row may wait before its batch is written
+            max_pending: Queue bound; past it, put() writes the row itself
+
+        Returns:
+            WriteBehindQueue instance
+        """
+        writer = WriteBehindQueue(self, sql, batch_size, flush_interval, max_pending)
+        with self._lock:
+            self._writers.append(writer)
+        return writer
+
+    def close(self):
+        """Flush pending writes and close every connection opened for this database"""
+        with self._lock:
+            writers = list(self._writers)
+            self._writers.clear()
+        for writer in writers:
+            writer.close()
+
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    logger.warning(f"Error closing connection to {self.db_path}: {e}")
+            self._connections.clear()
+
+        # Connections are closed; drop this thread's stale reference too
+        self._local = threading.local()
+
+
+class WriteBehindQueue:
+    """Buffer rows in memory and write them in batched transactions from a background thread"""
+
+    _STOP = object()
+
+    def __init__(self, db: Database, sql: str, batch_size: int,
+                 flush_interval: float, max_pending: int):
+        self.db = db
+        self.sql = sql
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._overflowing = False
+        # Held while queueing so nothing lands behind _STOP, where the writer never sees it
+        self._lock = threading.Lock()
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"write-behind:{self.db.db_path.name}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def put(self, row: Sequence):
+        """
+        Queue a row for writing (never waits for room in the queue)
+
+        When the queue is full the disk isn't keeping up, so the row is
+        written by the caller instead: memory stays bounded and only that
+        caller pays for the slow write (it may commit ahead of rows still
+        queued). Async code should call this through an executor.
+        """
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._queue.put_nowait(row)
+                    self._overflowing = False
+                    return
+                except queue.Full:
+                    if not self._overflowing:
+                        self._overflowing = True
+                        logger.warning(f"Write-behind queue for {self.db.db_path.name} is full; writing directly")
+        self._write([row])
+
+    def flush(self):
+        """Block until every row queued so far has been committed"""
+        done = threading.Event()
+        with self._lock:
+            if self._closed:
+                return
+            # May wait for room; the writer keeps draining meanwhile
+            self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        """Write everything still queued and stop the background thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self):
+        """Writer loop: collect rows until the batch is full or its deadline passes"""
+        batch = []
+        deadline = 0.0
+
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._write(batch)
+                batch = []
+                continue
+
+            if item is self._STOP:
+                self._write(batch)
+                return
+
+            if isinstance(item, threading.Event):
+                self._write(batch)
+                batch = []
+                item.set()
+                continue
+
+            batch.append(item)
+            if len(batch) == 1:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+
+    def _write(self, rows: List[Sequence]):
+        """Write rows in a single transaction"""
+        if not rows:
+            return
+        try:
+            with self.db.transaction() as cursor:
+                cursor.executemany(self.sql, rows)
+        except sqlite3.Error as e:
+            logger.error(f"Write-behind flush to {self.db.db_path} failed ({len(rows)} rows lost): {e}")
+
+
+_databases: Dict[Path, Database] = {}
+_registry_lock = threading.Lock()
+
+
+def get_database(db_path: Path) -> Database:
+    """
+    Get the shared Database for a file, creating it on first use
+
+    Args:
+        db_path: Path to the SQLite file
+
+    Returns:
+        Database instance shared by everyone using that file
+    """
+    key = Path(db_path).resolve()
+    with _registry_lock:
+        db = _databases.get(key)
+        if db is None:
+            db = Database(db_path)
+            _databases[key] = db
+        return db
+
+
+@atexit.register
+def close_all():
+    """Flush and close all shared databases (runs at shutdown)"""
+    with _registry_lock:
+        for db in _databases.values():
+            db.close()
+        _databases.clear()
+    logger.info("Database connections closed")
+
+
+def fts_index_statements(table: str, columns: Sequence[str]) -> List[str]:
+    """
+    SQL for an FTS5 index over some of a table's text columns
+
+    The index is an external-content table named <table>_fts (rowid = the
+    table's id) kept in sync by triggers, and is filled from the existing
+    rows. Updates that don't touch the indexed columns (e.g. status
+    changes) leave it alone. Use the result as a schema migration.
+
+    Args:
+        table: Table to index
+        columns: Text columns to index
+
+    Returns:
+        List of SQL statements
+    """
+    fts = f"{table}_fts"
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+
+    insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values});"
+    delete = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {names}, content='{table}', content_rowid='id', tokenize='{FTS_TOKENIZER}'
+        )""",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {table} BEGIN {delete} {insert} END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def fts_match_query(text: str) -> Optional[str]:
+    """
+    Turn free text into a safe FTS5 MATCH expression
+
+    Every word must appear, in any order. Words are stemmed (see
+    FTS_TOKENIZER), so "decorator" also finds "decorators". FTS5 operators
+    in the text are treated as plain words.
+
+    Returns:
+        MATCH expression, or None if the text has no searchable words
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words)
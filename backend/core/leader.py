@@ -0,0 +1,82 @@
+"""
+Leader election for worker processes
+One worker holds an exclusive lock file and runs the background jobs that
+must not run once per process (reminder scheduling, history compaction)
+"""
+
+import os
+from pathlib import Path
+from typing import IO, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from core.logger import setup_logger
+
+logger = setup_logger("Leader")
+
+# Seconds between attempts to take over from a leader that may have exited
+LEADER_RETRY_INTERVAL = 10.0
+
+
+class LeaderLock:
+    """
+    Non-blocking exclusive lock on a file, held for the life of the process
+
+    The operating system releases the lock when the holder exits, even if it
+    crashes, so a waiting worker can take over on its next attempt.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file: Optional[IO] = None
+
+    @property
+    def held(self) -> bool:
+        """Whether this process is the leader"""
+        return self._file is not None
+
+    def try_acquire(self) -> bool:
+        """
+        Take the lock if no other process holds it
+
+        Returns:
+            Whether this process holds the lock now
+        """
+        if self._file is not None:
+            return True
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.path, "a+")
+        try:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        logger.info(f"Process {os.getpid()} is the leader ({self.path.name})")
+        return True
+
+    def release(self):
+        """Give up the lock"""
+        if self._file is None:
+            return
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
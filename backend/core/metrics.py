@@ -0,0 +1,136 @@
+"""
+System metrics sampler for YAAN
+Samples CPU, memory, disk and process stats in the background so readers
+never block on psutil
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import psutil
+
+from core.logger import setup_logger
+
+logger = setup_logger("Metrics")
+
+# Averaging windows reported alongside the latest snapshot (label -> seconds)
+AVERAGE_WINDOWS = {"1m": 60, "5m": 300, "15m": 900}
+
+
+class MetricsSampler:
+    """Keeps a rolling window of system metrics snapshots"""
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        # Enough snapshots to cover the longest averaging window
+        max_window = max(AVERAGE_WINDOWS.values())
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=int(max_window / interval) + 1)
+
+        self.process = psutil.Process(os.getpid())
+        self._task: Optional[asyncio.Task] = None
+        # Snapshot for latest() when no background sampler was started
+        self._on_demand: Optional[Dict[str, Any]] = None
+
+        # Prime the CPU counters: non-blocking cpu_percent() reports usage
+        # since the previous call
+        psutil.cpu_percent(interval=None)
+        self.process.cpu_percent(interval=None)
+
+    def sample(self) -> Dict[str, Any]:
+        """Take a snapshot now and add it to the history"""
+        snapshot = self._snapshot()
+        self.history.append(snapshot)
+        return snapshot
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """Read the current system and process stats"""
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+
+        with self.process.oneshot():
+            process = {
+                "cpu_percent": self.process.cpu_percent(interval=None),
+                "memory_rss": self.process.memory_info().rss,
+                "threads": self.process.num_threads(),
+            }
+
+        snapshot = {
+            "timestamp": time.time(),
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory": {
+                "percent": memory.percent,
+                "used": memory.used,
+                "total": memory.total,
+            },
+            "disk": {
+                "percent": disk.percent,
+                "used": disk.used,
+                "total": disk.total,
+            },
+            "process": process,
+        }
+        return snapshot
+
+    def latest(self) -> Dict[str, Any]:
+        """
+        Get the most recent snapshot
+
+        With the background sampler running this only reads its newest
+        snapshot. Without it, a snapshot is taken on demand at most once per
+        interval; those stay out of the history, so averages() only ever
+        covers evenly spaced samples.
+        """
+        if self._task is not None:
+            return self.history[-1]
+
+        if self._on_demand is None or time.time() - self._on_demand["timestamp"] >= self.interval:
+            self._on_demand = self._snapshot()
+        return self._on_demand
+
+    def averages(self) -> Dict[str, Dict[str, float]]:
+        """Average CPU and memory usage over the 1, 5 and 15 minute windows"""
+        now = time.time()
+        result = {}
+
+        for label, seconds in AVERAGE_WINDOWS.items():
+            window = [s for s in list(self.history) if now - s["timestamp"] <= seconds]
+            if not window:
+                continue
+            result[label] = {
+                "cpu_percent": round(sum(s["cpu_percent"] for s in window) / len(window), 1),
+                "memory_percent": round(sum(s["memory"]["percent"] for s in window) / len(window), 1),
+            }
+
+        return result
+
+    def start(self):
+        """Start sampling in the background on the running event loop"""
+        if self._task is None:
+            # The first snapshot is taken here, so latest() always has one
+            self.sample()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Metrics sampler started (every {self.interval}s)")
+
+    async def stop(self):
+        """Stop the background sampler"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """Sampling loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # psutil does (brief) system calls; keep them off the event loop
+                await loop.run_in_executor(None, self.sample)
+            except Exception as e:
+                logger.error(f"Metrics sampling error: {e}")
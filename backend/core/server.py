@@ -3,24 +3,72 @@ YAAN FastAPI Server
 Handles REST API and WebSocket connections
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
 from pathlib import Path
-from typing import List
+from typing import List, Literal, Optional
+import asyncio
+import os
+import time
+import uuid
 import uvicorn
 
-from core.config import YAANConfig
+from core.config import YAANConfig, load_config
 from core.logger import setup_logger
+from core.database import close_all as close_databases
+from core.metrics import MetricsSampler
+from core.leader import LeaderLock, LEADER_RETRY_INTERVAL
 # Voice modules will be lazy-loaded
 # from voice.speech_recognition import SpeechRecognizer
 # from voice.text_to_speech import TextToSpeech
 from nlp.command_processor import CommandProcessor
+from nlp.session import DEFAULT_SESSION
+from nlp.reminder_system import LIST_PAGE_SIZE, MAX_PAGE_SIZE, MAX_BULK_IDS
+from nlp.reminder_scheduler import ReminderScheduler, ReminderOutbox, ReminderRelay, RESYNC_INTERVAL
+from nlp.search import SEARCH_PAGE_SIZE, SEARCH_SOURCES
+from user.archive import HistoryCompactor
+from user.profile import HISTORY_PAGE_SIZE
 
 logger = setup_logger("Server")
 
 
+class BulkTaskRequest(BaseModel):
+    """Complete or delete many tasks: by IDs, or (completing todos) by tag/category"""
+    kind: Literal["reminders", "todos"]
+    action: Literal["complete", "delete"]
+    ids: List[int] = Field(default_factory=list, max_length=MAX_BULK_IDS)
+    tag: Optional[str] = None
+    category: Optional[str] = None
+
+
+class ReminderImport(BaseModel):
+    title: str
+    description: str = ""
+    due_date: Optional[str] = None
+    due_time: Optional[str] = None
+    priority: str = "medium"
+    recurring: Optional[str] = None
+
+
+class TodoImport(BaseModel):
+    title: str
+    description: str = ""
+    priority: str = "medium"
+    category: str = ""
+    due_date: Optional[str] = None
+    tags: List[str] = Field(default_factory=list)
+
+
+class TaskImportRequest(BaseModel):
+    """Reminders and todos to create in one go"""
+    reminders: List[ReminderImport] = Field(default_factory=list)
+    todos: List[TodoImport] = Field(default_factory=list)
+
+
 class YAANServer:
     """Main YAAN server handling all client connections"""
     
@@ -29,7 +77,8 @@ class YAANServer:
         self.app = FastAPI(
             title="YAAN Backend",
             description="Your AI Assistant Network API",
-            version="0.1.0"
+            version="0.1.0",
+            lifespan=self._lifespan
         )
         
         # Active WebSocket connections
@@ -52,8 +101,41 @@ class YAANServer:
             # Text to speech
             self.tts = None  # TextToSpeech(self.config.voice)
             
+            # System metrics, sampled in the background once the server starts
+            self.metrics = MetricsSampler(self.config.server.metrics_interval)
+            
             # Command processor
-            self.command_processor = CommandProcessor(self.config)
+            self.command_processor = CommandProcessor(self.config, metrics=self.metrics)
+            
+            # With several workers, jobs that must run once (scheduling
+            # reminders, compacting history) run in whichever holds this lock
+            shared = self.command_processor.shared_state
+            self.leader = LeaderLock(Path("data") / "leader.lock") if shared else None
+            self._leader_task: Optional[asyncio.Task] = None
+            
+            reminder_system = self.command_processor.reminder_system
+            if shared:
+                # The leader publishes due reminders; every worker relays them to its clients
+                self.reminder_outbox = ReminderOutbox(reminder_system)
+                self.reminder_relay = ReminderRelay(self.reminder_outbox, self.broadcast_reminder)
+            else:
+                self.reminder_outbox = None
+                self.reminder_relay = None
+            
+            # Pushes due reminders to connected clients once the server starts
+            self.reminder_scheduler = ReminderScheduler(
+                reminder_system,
+                self.publish_reminder if shared else self.broadcast_reminder,
+                resync_interval=RESYNC_INTERVAL if shared else None,
+                record=not shared
+            )
+            
+            # Moves old conversations to the archive once the server starts
+            self.history_compactor = HistoryCompactor(
+                self.command_processor.profile,
+                self.config.history.hot_days,
+                self.config.history.compact_interval
+            )
             
             logger.info("Components initialized successfully")
         except Exception as e:
@@ -98,29 +180,157 @@ class YAANServer:
         @self.app.get("/api/status")
         async def get_status():
             """Get system status"""
+            # Counted in the shared database in multi-worker mode
+            loop = asyncio.get_running_loop()
+            sessions = await loop.run_in_executor(None, len, self.command_processor.sessions)
             return {
                 "status": "online",
                 "service": "YAAN",
                 "version": "0.1.0",
                 "user": self.config.user.name,
                 "connections": len(self.active_connections),
+                "sessions": sessions,
                 "components": {
                     "speech_recognition": self.speech_recognizer is not None,
                     "tts": self.tts is not None,
-                    "command_processor": True
-                }
+                    "command_processor": True,
+                    "ai_model": self.command_processor.ai_engine.ready
+                },
+                "ai": self.command_processor.ai_engine.status()
+            }
+        
+        @self.app.get("/api/metrics")
+        async def get_metrics():
+            """Get the latest system metrics snapshot and rolling averages"""
+            return {
+                "interval": self.metrics.interval,
+                "latest": self.metrics.latest(),
+                "averages": self.metrics.averages()
             }
         
         @self.app.post("/api/command")
-        async def process_command(text: str):
+        async def process_command(text: str, session_id: Optional[str] = None):
             """Process text command"""
             try:
-                response = await self.command_processor.process(text)
+                response = await self.command_processor.process(text, session_id or DEFAULT_SESSION)
                 return {"success": True, "response": response}
             except Exception as e:
                 logger.error(f"Command processing error: {e}")
                 return {"success": False, "error": str(e)}
         
+        # Plain (sync) handlers: FastAPI runs them in its thread pool, off the event loop
+        @self.app.get("/api/reminders")
+        def list_reminders(status: str = "pending",
+                           limit: int = Query(LIST_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                           cursor: Optional[str] = None):
+            """Get a page of reminders; pass next_cursor back for the following page"""
+            try:
+                return self.command_processor.reminder_system.get_reminders_page(status, limit, cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        @self.app.get("/api/todos")
+        def list_todos(status: str = "pending", category: Optional[str] = None,
+                       limit: int = Query(LIST_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                       cursor: Optional[str] = None):
+            """Get a page of todos; pass next_cursor back for the following page"""
+            try:
+                return self.command_processor.reminder_system.get_todos_page(status, category, limit, cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        @self.app.get("/api/history")
+        def conversation_history(limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                 cursor: Optional[str] = None):
+            """Get a page of conversation history, newest first, including archived exchanges"""
+            try:
+                return self.command_processor.profile.get_conversation_page(limit, cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        @self.app.get("/api/history/stats")
+        def history_stats():
+            """Exchanges kept in the main database and in the archive"""
+            return self.command_processor.profile.get_history_stats()
+        
+        @self.app.get("/api/due")
+        def list_due(kind: str = "reminders", status: str = "pending",
+                     after: Optional[float] = None, before: Optional[float] = None,
+                     within: Optional[float] = Query(None, gt=0), overdue: bool = False,
+                     limit: int = Query(LIST_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+            """
+            Get reminders or todos by due time, soonest first
+            
+            Either a range of Unix times (after/before), the next `within`
+            seconds, or everything overdue.
+            """
+            now = time.time()
+            if overdue:
+                after, before = None, now
+            elif within is not None:
+                after, before = now, now + within
+            
+            try:
+                items = self.command_processor.reminder_system.get_due_between(kind, after, before, status, limit)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return {"items": items}
+        
+        @self.app.get("/api/search")
+        def search(q: str = Query(..., min_length=1), sources: str = ",".join(SEARCH_SOURCES),
+                   limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                   offset: int = Query(0, ge=0)):
+            """
+            Full-text search of conversations, reminders and todos, best first
+            
+            sources is a comma-separated subset of conversations,reminders,todos;
+            pass next_offset back as offset for the following page.
+            """
+            try:
+                return self.command_processor.search.search(
+                    q, [source.strip() for source in sources.split(",") if source.strip()], limit, offset
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        @self.app.post("/api/tasks/bulk")
+        def bulk_tasks(request: BulkTaskRequest):
+            """Complete or delete many reminders/todos in one transaction"""
+            reminder_system = self.command_processor.reminder_system
+            
+            if request.tag or request.category:
+                if request.kind != "todos" or request.action != "complete" or request.ids:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="tag/category only select todos to complete, without ids"
+                    )
+                count = reminder_system.complete_todos_where(request.tag, request.category)
+                return {"success": True, "count": count}
+            
+            operations = {
+                ("reminders", "complete"): reminder_system.complete_reminders,
+                ("reminders", "delete"): reminder_system.delete_reminders,
+                ("todos", "complete"): reminder_system.complete_todos,
+                ("todos", "delete"): reminder_system.delete_todos,
+            }
+            done = operations[(request.kind, request.action)](request.ids)
+            done_ids = set(done)
+            return {
+                "success": True,
+                "ids": done,
+                "missing": [task_id for task_id in request.ids if task_id not in done_ids]
+            }
+        
+        @self.app.post("/api/tasks/import")
+        def import_tasks(request: TaskImportRequest):
+            """Create many reminders and todos, one transaction per kind"""
+            reminder_system = self.command_processor.reminder_system
+            return {
+                "success": True,
+                "reminders": reminder_system.import_reminders([item.model_dump() for item in request.reminders]),
+                "todos": reminder_system.import_todos([item.model_dump() for item in request.todos])
+            }
+        
         @self.app.websocket("/ws")
         async def websocket_endpoint(websocket: WebSocket):
             """WebSocket endpoint for real-time communication"""
@@ -130,13 +340,27 @@ class YAANServer:
         """Handle WebSocket connection"""
         await websocket.accept()
         self.active_connections.append(websocket)
+        
+        # Each connection gets its own conversation state; clients may pass
+        # ?session_id= to resume theirs after reconnecting
+        session_id = websocket.query_params.get("session_id") or f"ws-{uuid.uuid4().hex}"
+        resumable = "session_id" in websocket.query_params
+        # Held in this worker for the life of the connection
+        sessions = self.command_processor.sessions
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, sessions.attach, session_id)
         logger.info(f"Client connected. Active connections: {len(self.active_connections)}")
         
         try:
             await websocket.send_json({
                 "type": "welcome",
-                "message": f"Hello! I'm YAAN, your AI assistant. How can I help you today?"
+                "message": f"Hello! I'm YAAN, your AI assistant. How can I help you today?",
+                "session_id": session_id
             })
+            # Reminders that came due while nobody was connected
+            self.reminder_scheduler.client_connected()
+            if self.reminder_relay:
+                self.reminder_relay.client_connected()
             
             while True:
                 # Receive message from client
@@ -145,7 +369,27 @@ class YAANServer:
                 # Process command
                 if data.get("type") == "command":
                     text = data.get("text", "")
-                    response = await self.command_processor.process(text)
+                    
+                    # Long listings arrive as several response frames; all
+                    # but the last are flagged with "more"
+                    async def send_chunk(chunk: str):
+                        await websocket.send_json({
+                            "type": "response",
+                            "text": chunk,
+                            "more": True
+                        })
+                    
+                    # Model replies arrive piece by piece as they're generated;
+                    # the response frame that follows carries the whole text
+                    async def send_partial(piece: str):
+                        await websocket.send_json({
+                            "type": "partial",
+                            "text": piece
+                        })
+                    
+                    response = await self.command_processor.process(
+                        text, session_id, on_chunk=send_chunk, on_partial=send_partial
+                    )
                     
                     await websocket.send_json({
                         "type": "response",
@@ -159,6 +403,74 @@ class YAANServer:
             logger.error(f"WebSocket error: {e}")
             if websocket in self.active_connections:
                 self.active_connections.remove(websocket)
+        finally:
+            # Generated ids can't be resumed, so free their state right away;
+            # others are written back for whichever worker serves them next
+            await loop.run_in_executor(None, sessions.detach, session_id, resumable)
+    
+    async def publish_reminder(self, reminder: dict) -> int:
+        """Hand a due reminder to every worker's relay (leader only); counts as passed on"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.reminder_outbox.publish, reminder)
+        self.reminder_relay.wake()
+        return 1
+    
+    async def broadcast_reminder(self, reminder: dict) -> int:
+        """Send a due reminder to every connected client; returns how many received it"""
+        text = f"⏰ Reminder: {reminder['title']}"
+        if reminder.get("description"):
+            text += f"\n📝 {reminder['description']}"
+        
+        delivered = 0
+        for websocket in list(self.active_connections):
+            try:
+                await websocket.send_json({
+                    "type": "reminder",
+                    "text": text,
+                    "reminder": reminder
+                })
+                delivered += 1
+            except Exception as e:
+                logger.warning(f"Could not deliver reminder to a client: {e}")
+        return delivered
+    
+    @asynccontextmanager
+    async def _lifespan(self, app: FastAPI):
+        """Start background work with the app and clean up when it stops"""
+        self.metrics.start()
+        if self.leader is None:
+            self._start_leader_jobs()
+        else:
+            self.reminder_relay.start()
+            self._leader_task = asyncio.get_running_loop().create_task(self._lead())
+        try:
+            yield
+        finally:
+            if self._leader_task is not None:
+                self._leader_task.cancel()
+            if self.reminder_relay:
+                await self.reminder_relay.stop()
+            await self.history_compactor.stop()
+            await self.reminder_scheduler.stop()
+            await self.metrics.stop()
+            self.command_processor.shutdown()
+            close_databases()
+            if self.leader:
+                self.leader.release()
+    
+    async def _lead(self):
+        """Wait to become the leader (taking over if it exits), then start its jobs"""
+        while not self.leader.try_acquire():
+            await asyncio.sleep(LEADER_RETRY_INTERVAL)
+        self._start_leader_jobs()
+    
+    def _start_leader_jobs(self):
+        """Start the background work that runs in one process only"""
+        self.reminder_scheduler.start()
+        self.history_compactor.start()
+        # Load the language model without holding up startup (other workers
+        # load theirs when their first chat arrives)
+        self.command_processor.ai_engine.start_warm_up()
     
     async def start(self):
         """Start the server"""
@@ -173,3 +485,37 @@ class YAANServer:
         
         server = uvicorn.Server(config)
         await server.serve()
+
+
+def create_app() -> FastAPI:
+    """App factory used by each uvicorn worker process"""
+    return YAANServer(load_config()).app
+
+
+def run_workers(config: YAANConfig):
+    """
+    Serve with several worker processes sharing one port
+    
+    Each worker builds its own server through create_app(); sessions and
+    user memory are kept in SQLite so every worker sees the same state, and
+    one worker (the leader) runs the reminder scheduler and history compactor.
+    
+    Args:
+        config: Server configuration (config.server.workers > 1)
+    """
+    logger.info(
+        f"Starting {config.server.workers} workers on "
+        f"{config.server.host}:{config.server.port}"
+    )
+    
+    # Workers load their own config; make sure they know they're shared
+    os.environ["YAAN_WORKERS"] = str(config.server.workers)
+    
+    uvicorn.run(
+        "core.server:create_app",
+        factory=True,
+        host=config.server.host,
+        port=config.server.port,
+        workers=config.server.workers,
+        log_level="info" if config.server.debug else "warning"
+    )
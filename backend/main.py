@@ -10,7 +10,7 @@ from pathlib import Path
 # Add project root to path
 sys.path.append(str(Path(__file__).parent))
 
-from core.server import YAANServer
+from core.server import YAANServer, run_workers
 from core.config import load_config
 from core.logger import setup_logger
 
@@ -38,7 +38,7 @@ def print_banner():
     print(banner)
 
 
-async def main():
+def main():
     """Main entry point for YAAN backend"""
     try:
         print_banner()
@@ -48,11 +48,15 @@ async def main():
         config = load_config()
         logger.info(f"Configuration loaded: {config.server.host}:{config.server.port}")
         
-        # Initialize server
-        server = YAANServer(config)
-        
-        # Start server
-        await server.start()
+        if config.server.workers > 1:
+            # Multiple processes; each worker builds its own server
+            run_workers(config)
+        else:
+            # Initialize server
+            server = YAANServer(config)
+            
+            # Start server
+            asyncio.run(server.start())
         
     except KeyboardInterrupt:
         logger.info("Shutdown requested by user")
@@ -62,4 +66,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
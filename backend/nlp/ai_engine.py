@@ -3,20 +3,53 @@ AI Engine - Local LLM Integration and Smart Response Generation
 For conversational AI using transformers or fallback to rule-based responses
 """
 
-from typing import Optional, List, Dict
+from contextlib import contextmanager
+from typing import AsyncIterator, Optional, List, Dict, Any
+import asyncio
 import re
+import threading
+import time
 
 try:
     import torch
-    from transformers import AutoTokenizer, AutoModelForCausalLM
+    from transformers import AutoTokenizer, AutoModelForCausalLM, StoppingCriteria, StoppingCriteriaList
     TRANSFORMERS_AVAILABLE = True
 except ImportError:
     TRANSFORMERS_AVAILABLE = False
 
 from core.logger import setup_logger
+from nlp.cpu_inference import configure_threads, quantize_linear_layers, compile_forward
+from nlp.inference_batcher import BatchStreamer, GenerationRequest, InferenceBatcher
+from nlp.prefix_cache import PrefixCache, cache_length
 
 logger = setup_logger("AIEngine")
 
+# Stages of getting the model ready, reported with their load times
+WARM_UP_STAGES = ("tokenizer", "model", "warm_up")
+
+# Tokens generated by the warm-up run
+WARM_UP_TOKENS = 4
+
+
+if TRANSFORMERS_AVAILABLE:
+    class RequestsFinished(StoppingCriteria):
+        """
+        Stopping criterion that reports, row by row, which requests of a batch are done
+        
+        generate() pads a row from the step its flag is set (it has ended,
+        hit its own token limit or been cancelled) and stops once all are.
+        """
+        
+        def __init__(self, requests: List[GenerationRequest]):
+            self.requests = requests
+        
+        def __call__(self, input_ids: "torch.LongTensor", scores: "torch.FloatTensor",
+                     **kwargs) -> "torch.BoolTensor":
+            return torch.tensor(
+                [request.finished or request.cancelled.is_set() for request in self.requests],
+                dtype=torch.bool, device=input_ids.device
+            )
+
 
 class AIEngine:
     """Local LLM for conversational AI with smart fallback"""
@@ -34,6 +67,30 @@ class AIEngine:
         
         self.context_memory: List[Dict[str, str]] = []
         self.knowledge_base = self._init_knowledge_base()
+        
+        # Every generation goes through one batching thread, so concurrent
+        # requests share forward passes
+        self.batcher = InferenceBatcher(self._generate_batch, config.batch_size, config.batch_window)
+        
+        # Each chat session's attention cache for its conversation so far
+        # (only touched on the batcher thread)
+        self.prefix_cache = (
+            PrefixCache(config.prefix_cache_mb * 1024 * 1024) if config.prefix_cache_mb > 0 else None
+        )
+        
+        # Loading runs off the request path (see start_warm_up); until it
+        # finishes, responses are rule-based
+        self._ready = threading.Event()
+        self._warm_up_thread: Optional[threading.Thread] = None
+        self.components: Dict[str, Dict[str, Any]] = {
+            stage: {"status": "pending" if TRANSFORMERS_AVAILABLE else "unavailable", "seconds": None}
+            for stage in WARM_UP_STAGES
+        }
+    
+    @property
+    def ready(self) -> bool:
+        """Whether the model is loaded and warmed up (otherwise responses are rule-based)"""
+        return self._ready.is_set()
     
     def _init_knowledge_base(self) -> Dict[str, List[str]]:
         """Initialize knowledge base for fallback responses"""
@@ -55,8 +112,24 @@ class AIEngine:
             ],
         }
     
+    @contextmanager
+    def _stage(self, name: str):
+        """Record a warm-up stage's status and how long it took"""
+        component = self.components[name]
+        component["status"] = "loading"
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            component["status"] = "failed"
+            component["error"] = str(e)
+            raise
+        finally:
+            component["seconds"] = round(time.perf_counter() - start, 3)
+        component["status"] = "ready"
+    
     def load_model(self):
-        """Load language model (lazy loading)"""
+        """Load the tokenizer and language model (blocking; see warm_up)"""
         if not TRANSFORMERS_AVAILABLE:
             logger.warning("Cannot load model: transformers library not installed")
             return
@@ -66,64 +139,238 @@ class AIEngine:
             logger.info(f"Using device: {self.device}")
             
             try:
-                self.tokenizer = AutoTokenizer.from_pretrained(self.config.model_name)
-                self.model = AutoModelForCausalLM.from_pretrained(
-                    self.config.model_name,
-                    torch_dtype=torch.float16 if self.device == "cuda" else torch.float32
-                )
-                self.model.to(self.device)
-                self.model.eval()
+                if self.device == "cpu":
+                    configure_threads(self.config.cpu_threads, self.config.cpu_interop_threads)
+                
+                with self._stage("tokenizer"):
+                    self.tokenizer = AutoTokenizer.from_pretrained(self.config.model_name)
+                    # Batched prompts are padded on the left, so every row's
+                    # new tokens start at the same position
+                    self.tokenizer.padding_side = "left"
+                    if self.tokenizer.pad_token is None:
+                        self.tokenizer.pad_token = self.tokenizer.eos_token
+                with self._stage("model"):
+                    self.model = AutoModelForCausalLM.from_pretrained(
+                        self.config.model_name,
+                        torch_dtype=torch.float16 if self.device == "cuda" else torch.float32
+                    )
+                    self.model.to(self.device)
+                    self.model.eval()
+                    
+                    if self.config.quantize:
+                        if self.device == "cpu":
+                            self.model = quantize_linear_layers(self.model)
+                            logger.info("Linear layers quantized to int8")
+                        else:
+                            logger.warning("int8 quantization only applies on CPU; skipping")
+                    if self.config.compile_model:
+                        self.model = compile_forward(self.model)
                 
                 logger.info("AI model loaded successfully")
             except Exception as e:
                 logger.error(f"Failed to load model: {e}")
                 raise
     
-    def generate_response(self, prompt: str, max_length: Optional[int] = None) -> str:
+    def warm_up(self):
+        """
+        Load the model and run a short generation, then start serving with it
+        
+        The first generate() call allocates buffers and picks kernels, which
+        would otherwise land on the first real request.
+        """
+        if not TRANSFORMERS_AVAILABLE or self.ready:
+            return
+        
+        self.load_model()
+        with self._stage("warm_up"):
+            # Nothing else generates before ready is set, so this runs the
+            # batch path directly rather than through the batcher thread
+            self._generate_batch([GenerationRequest(
+                "Hello", WARM_UP_TOKENS, lambda text: None, lambda error: None
+            )])
+        self._ready.set()
+        logger.info(f"AI model ready ({self.components['warm_up']['seconds']}s warm-up)")
+    
+    def start_warm_up(self):
+        """Warm up in a background thread; requests get rule-based responses meanwhile"""
+        if not TRANSFORMERS_AVAILABLE or self._warm_up_thread is not None:
+            return
+        
+        def run():
+            try:
+                self.warm_up()
+            except Exception as e:
+                logger.error(f"Model warm-up failed, staying with rule-based responses: {e}")
+        
+        self._warm_up_thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+        self._warm_up_thread.start()
+    
+    def status(self) -> Dict[str, Any]:
+        """Readiness, per-stage load status and timings, and prefix cache usage"""
+        return {
+            "ready": self.ready,
+            "model": self.config.model_name,
+            "device": self.device,
+            "quantized": self.config.quantize and self.device == "cpu",
+            "compiled": self.config.compile_model,
+            "components": {name: dict(component) for name, component in self.components.items()},
+            "prefix_cache": self.prefix_cache.stats() if self.prefix_cache is not None else None
+        }
+
+    def _generation_kwargs(self, max_new_tokens: Optional[int] = None) -> Dict:
+        """Sampling settings shared by every generate() call"""
+        return {
+            "max_new_tokens": max_new_tokens or self.config.max_tokens,
+            "temperature": self.config.temperature,
+            "do_sample": True,
+            "top_p": 0.9,
+            "pad_token_id": self.tokenizer.eos_token_id
+        }
+    
+    def generate_response(self, prompt: str, max_length: Optional[int] = None,
+                          cache_key: Optional[str] = None) -> str:
         """
-        Generate AI response to prompt
+        Generate AI response to prompt (blocks until the whole response is ready)
         
         Args:
             prompt: Input prompt
-            max_length: Maximum response length
+            max_length: Maximum number of tokens to generate
+            cache_key: Conversation the prompt continues, to reuse its cached prefix
         
         Returns:
             Generated response text
         """
         # Use fallback if transformers not available or model not loaded
-        if not TRANSFORMERS_AVAILABLE or self.model is None:
+        if not self.ready:
             return self._generate_fallback_response(prompt)
         
-        max_length = max_length or self.config.max_tokens
+        pieces = []
+        done = threading.Event()
+        errors = []
+        
+        def finish(error: Optional[BaseException]):
+            if error:
+                errors.append(error)
+            done.set()
+        
+        self.batcher.submit(GenerationRequest(
+            prompt, max_length or self.config.max_tokens, pieces.append, finish, cache_key
+        ))
+        done.wait()
+        
+        if errors:
+            logger.error(f"Generation error: {errors[0]}")
+            return self._generate_fallback_response(prompt)
+        return "".join(pieces).strip()
+    
+    async def stream_response(self, prompt: str, max_length: Optional[int] = None,
+                              cache_key: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Generate AI response to prompt, yielding text as the model produces it
+        
+        The prompt joins the next batch on the batcher thread, which hands
+        over each run of complete words, so the first words arrive after a
+        few forward passes instead of after the whole generation. Closing
+        the iterator early (say, the client went away) drops the request
+        from its batch.
+        
+        Args:
+            prompt: Input prompt
+            max_length: Maximum number of tokens to generate
+            cache_key: Conversation the prompt continues, to reuse its cached prefix
+        
+        Yields:
+            Successive pieces of the response; joined, they are the full text
+        """
+        if not self.ready:
+            yield self._generate_fallback_response(prompt)
+            return
+        
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        # Text pieces, then None when done or the error if generation failed
+        request = GenerationRequest(
+            prompt,
+            max_length or self.config.max_tokens,
+            lambda text: loop.call_soon_threadsafe(queue.put_nowait, text),
+            lambda error: loop.call_soon_threadsafe(queue.put_nowait, error),
+            cache_key
+        )
+        self.batcher.submit(request)
         
+        produced = False
         try:
-            # Tokenize input
-            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-            
-            # Generate response
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    **inputs,
-                    max_length=max_length,
-                    temperature=self.config.temperature,
-                    do_sample=True,
-                    top_p=0.9,
-                    pad_token_id=self.tokenizer.eos_token_id
-                )
-            
-            # Decode response
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            
-            # Remove the prompt from response
-            if prompt in response:
-                response = response.replace(prompt, "").strip()
-            
-            return response
-            
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                produced = True
+                yield item
         except Exception as e:
             logger.error(f"Generation error: {e}")
-            return self._generate_fallback_response(prompt)
+            if not produced:
+                yield self._generate_fallback_response(prompt)
+        finally:
+            request.cancelled.set()
+    
+    def _generate_batch(self, requests: List[GenerationRequest]):
+        """Generate for a batch of requests together (runs on the batcher thread)"""
+        if len(requests) == 1 and requests[0].cache_key is not None and self.prefix_cache is not None:
+            self._generate_cached(requests[0])
+            return
+        
+        # Rows' cached prefixes differ in length, so a shared batch encodes
+        # every prompt in full
+        inputs = self.tokenizer(
+            [request.prompt for request in requests], return_tensors="pt", padding=True
+        ).to(self.device)
+        streamer = BatchStreamer(self.tokenizer, requests)
+        
+        with torch.inference_mode():
+            self.model.generate(
+                **inputs,
+                **self._generation_kwargs(max(request.max_new_tokens for request in requests)),
+                streamer=streamer,
+                stopping_criteria=self._stop_when_finished(streamer)
+            )
+    
+    def _generate_cached(self, request: GenerationRequest):
+        """
+        Generate for a request alone, continuing from its conversation's cached prefix
+        
+        Only the tokens after the longest prefix the prompt shares with the
+        cached conversation are encoded; the attention cache the generation
+        ends with (prompt and reply) replaces the old one for the next turn.
+        """
+        token_ids = self.tokenizer(request.prompt)["input_ids"]
+        input_ids = torch.tensor([token_ids], device=self.device)
+        streamer = BatchStreamer(self.tokenizer, [request])
+        
+        # Cached tensors were made under inference mode, so crop them under it too
+        with torch.inference_mode():
+            past, reused = self.prefix_cache.take(request.cache_key, token_ids)
+            output = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=past,
+                return_dict_in_generate=True,
+                **self._generation_kwargs(request.max_new_tokens),
+                streamer=streamer,
+                stopping_criteria=self._stop_when_finished(streamer)
+            )
+        
+        # The cache ends one token short: the last sampled token is never fed back
+        past = output.past_key_values
+        self.prefix_cache.put(request.cache_key, output.sequences[0].tolist()[:cache_length(past)], past)
+        logger.debug(f"Reused {reused} of {len(token_ids)} prompt tokens")
     
+    @staticmethod
+    def _stop_when_finished(streamer: BatchStreamer) -> "StoppingCriteriaList":
+        """Stop each row once it's done (ended, at its limit or cancelled), and the batch when all are"""
+        return StoppingCriteriaList([RequestsFinished(streamer.requests)])
+
     def _generate_fallback_response(self, prompt: str) -> str:
         """Generate smart fallback response when model is unavailable"""
         import random
@@ -154,22 +401,43 @@ class AIEngine:
         
         return random.choice(default_responses)
     
-    def chat(self, messages: list) -> str:
+    def _chat_prompt(self, messages: list) -> str:
+        """Build a "Role: content" conversation prompt ending with the assistant's turn"""
+        prompt = ""
+        for msg in messages:
+            role = msg.get("role", "user")
+            content = msg.get("content", "")
+            prompt += f"{role.capitalize()}: {content}\n"
+        prompt += "Assistant:"
+        return prompt
+    
+    def chat(self, messages: list, session_id: Optional[str] = None) -> str:
         """
         Chat with context (conversation history)
         
         Args:
             messages: List of message dicts with 'role' and 'content'
+            session_id: Conversation the messages belong to; its earlier turns'
+                attention cache is reused instead of encoding the history again
         
         Returns:
             AI response
         """
-        # Build conversation prompt
-        prompt = ""
-        for msg in messages:
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            prompt += f"{role.capitalize()}: {content}\n"
-        prompt += "Assistant:"
+        return self.generate_response(self._chat_prompt(messages), cache_key=session_id)
+    
+    def stream_chat(self, messages: list, session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Chat with context, yielding the response as it is generated
         
-        return self.generate_response(prompt)
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            session_id: Conversation the messages belong to (see chat)
+        
+        Returns:
+            Async iterator of response pieces (see stream_response)
+        """
+        return self.stream_response(self._chat_prompt(messages), cache_key=session_id)
+    
+    def shutdown(self):
+        """Stop the batcher once the running batch finishes"""
+        self.batcher.close()
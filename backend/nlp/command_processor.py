@@ -3,37 +3,97 @@ Command Processor - NLP and Intent Recognition
 """
 
 import re
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
 import platform
-import psutil
 from pathlib import Path
 
 from core.logger import setup_logger
+from core.metrics import MetricsSampler
 from user.profile import UserProfile
 from user.memory import UserMemory
+from nlp.ai_engine import AIEngine
 from nlp.coding_assistant import CodingAssistant
-from nlp.reminder_system import ReminderSystem
+from nlp.reminder_system import ReminderSystem, LIST_PAGE_SIZE, parse_task_ids
 from nlp.proactive_learning import ProactiveLearning
+from nlp.search import HistorySearch, SEARCH_PAGE_SIZE, parse_search_request
+from nlp.intent_matcher import IntentMatcher
+from nlp.session import Session, SessionManager, SessionStore, DEFAULT_SESSION
 
 logger = setup_logger("CommandProcessor")
 
+# How each intent's handler is dispatched. Handlers not listed are "instant"
+# and run inline on the event loop; "io" (SQLite, system calls) and "cpu"
+# (heavy text analysis) handlers block, so they run on a bounded thread pool.
+INTENT_KINDS = {
+    "create_reminder": "io",
+    "create_todo": "io",
+    "show_reminders": "io",
+    "show_todos": "io",
+    "complete_task": "io",
+    "delete_task": "io",
+    "task_summary": "io",
+    "search_history": "io",
+    "toggle_questions": "io",
+    "learning_summary": "io",
+    "forget_me": "io",
+    "code_help": "cpu",
+    "code_explain": "cpu",
+    "debug_error": "cpu",
+}
+
+# Worker threads per handler pool
+EXECUTOR_WORKERS = {"io": 8, "cpu": 2}
+
+# Seconds a blocking handler may run before the user gets a timeout reply
+KIND_TIMEOUTS = {"io": 10.0, "cpu": 5.0}
+INTENT_TIMEOUTS: Dict[str, float] = {}
+
+# Listing intents that can stream every page to clients that accept chunks
+STREAM_INTENTS = {"show_reminders", "show_todos"}
+
+# Intents whose exchanges aren't saved to conversation history: search
+# results quote history back, and later searches would keep finding them
+UNLOGGED_INTENTS = {"search_history"}
+
+# "complete todos tagged work" / "complete all todos in shopping"
+TASK_FILTER_PATTERN = re.compile(r"\b(tagged|with tag|in) #?([\w-]+)")
+
 
 class CommandProcessor:
     """Process natural language commands and execute actions"""
     
-    def __init__(self, config):
+    def __init__(self, config, metrics: Optional[MetricsSampler] = None):
         self.config = config
+        # Shared background sampler (the server runs it); otherwise sample on demand
+        self.metrics = metrics or MetricsSampler(config.server.metrics_interval)
         self.command_patterns = self._init_command_patterns()
-        self.conversation_history = []
-        self.context = {}
-        self.last_intent = None
+        self.intent_matcher = IntentMatcher(self.command_patterns)
+        self.intent_handlers = self._init_intent_handlers()
+        
+        # With several worker processes, sessions and memory live in SQLite
+        # so every worker sees the same state
+        self.shared_state = config.server.workers > 1
+        
+        # Thread pools for blocking handlers
+        self.executors = {
+            kind: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"handler-{kind}")
+            for kind, workers in EXECUTOR_WORKERS.items()
+        }
         
         # Initialize user memory system
         data_dir = Path("data")
         data_dir.mkdir(exist_ok=True)
         self.profile = UserProfile(data_dir, config.user.name)
-        self.memory = UserMemory(self.profile)
+        self.memory = UserMemory(self.profile, shared=self.shared_state)
+        
+        # Per-client conversation state; everything else here is shared
+        session_store = SessionStore(data_dir / "sessions.db") if self.shared_state else None
+        self.sessions = SessionManager(
+            config.server.max_sessions, config.server.session_ttl, store=session_store
+        )
         
         # Initialize coding assistant
         self.coding_assistant = CodingAssistant()
@@ -41,16 +101,27 @@ class CommandProcessor:
         # Initialize reminder system
         self.reminder_system = ReminderSystem(data_dir / "reminders.db")
         
+        # Full-text search over conversations, reminders and todos
+        self.search = HistorySearch(self.profile, self.reminder_system)
+        
+        # Language model for open-ended chat (rule-based replies until it's loaded)
+        self.ai_engine = AIEngine(config.ai)
+        
         # Initialize proactive learning
-        self.proactive_learning = ProactiveLearning(data_dir / "learning.db")
-        self.pending_question = None
-        self.message_count = 0
+        self.proactive_learning = ProactiveLearning(data_dir / "learning.db", shared=self.shared_state)
         
         logger.info("Command processor initialized with user memory, coding assistant, reminder system, and proactive learning")
     
     def _init_command_patterns(self) -> Dict[str, list]:
         """Initialize command patterns for intent recognition"""
         return {
+            # First: search words may contain any other intent's keywords
+            "search_history": [
+                r"(search|find|look up) (in |through )?(my |the )?(history|everything|conversations?|chats?|reminders|todos|tasks) for ",
+                r"(search|find|look up) (for )?.+ in (my |the )?(history|everything|conversations?|chats?|reminders|todos|tasks)\W*$",
+                r"what did (i|we) (say|talk about|discuss|mention) about ",
+                r"^(show )?more (search )?results",
+            ],
             "greeting": [
                 r"^(hello|hi|hey|greetings|sup|yo)\b",
                 r"good (morning|afternoon|evening|night)",
@@ -119,6 +190,14 @@ class CommandProcessor:
                 r"(set|create|add) (a )?reminder",
                 r"remind me (to|about)",
             ],
+            # Ahead of calculation, so ID ranges like "8-12" aren't read as arithmetic
+            "complete_task": [
+                r"(complete|finish|done|mark) (all )?(reminders?|todos?|tasks?) (\d+|tagged|with tag|in )",
+                r"(reminder|todo|task) (\d+) (complete|done|finished)",
+            ],
+            "delete_task": [
+                r"(delete|remove|clear) (reminders?|todos?|tasks?) (\d+)",
+            ],
             "calculation": [
                 r"(calculate|compute) (.+)",
                 r"\d+\s*[+\-*/]\s*\d+",
@@ -169,18 +248,13 @@ class CommandProcessor:
                 r"(show|list|get|display|view) (my |all )?reminders?",
                 r"what are my reminders?",
                 r"any reminders?",
+                r"(show )?more reminders",
             ],
             "show_todos": [
                 r"(show|list|get|display|view) (my |all )?todos?",
                 r"(show|list|get|display|view) (my |all )?tasks?",
                 r"what are my (todos|tasks)?",
-            ],
-            "complete_task": [
-                r"(complete|finish|done|mark) (reminder|todo|task) (\d+)",
-                r"(reminder|todo|task) (\d+) (complete|done|finished)",
-            ],
-            "delete_task": [
-                r"(delete|remove|clear) (reminder|todo|task) (\d+)",
+                r"(show )?more (todos|tasks)",
             ],
             "task_summary": [
                 r"(task|todo|reminder) summary",
@@ -210,41 +284,32 @@ class CommandProcessor:
         """
         text_lower = text.lower().strip()
         
-        for intent, patterns in self.command_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, text_lower):
-                    return intent
-        
-        return None
+        return self.intent_matcher.match(text_lower)
     
-    async def process(self, text: str) -> str:
+    async def process(self, text: str, session_id: str = DEFAULT_SESSION,
+                      on_chunk: Optional[Callable[[str], Awaitable[None]]] = None,
+                      on_partial: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
         """
         Process user command and return response
         
         Args:
             text: User command text
+            session_id: Client session whose conversation state to use
+            on_chunk: Coroutine accepting partial output. When given, long
+                listings are streamed through it page by page instead of
+                being paginated, and the returned text closes the listing.
+            on_partial: Coroutine accepting each piece of a model-generated
+                reply as it is produced; the returned text is the whole reply
         
         Returns:
             Response text
         """
         logger.info(f"Processing command: {text}")
-        
-        # Learn from user message
-        self.memory.analyze_message(text)
-        
-        # Add to conversation history
-        self.conversation_history.append({"role": "user", "content": text})
-        
-        # Keep only last 10 messages for context
-        if len(self.conversation_history) > 20:
-            self.conversation_history = self.conversation_history[-20:]
-        
-        # Check if memory can answer the query
-        memory_response = self.memory.get_relevant_memory(text)
+        # Session, memory and learning state live in SQLite (or behind its
+        # locks), so the bookkeeping around the handler runs on the io pool
+        session, memory_response = await self._run_io(self._begin_turn, session_id, text)
         if memory_response:
             logger.info("Responding from memory")
-            self.conversation_history.append({"role": "assistant", "content": memory_response})
-            self._save_interaction(text, memory_response)
             return memory_response
         
         # Match intent
@@ -252,87 +317,156 @@ class CommandProcessor:
         
         if intent:
             logger.info(f"Intent matched: {intent}")
-            response = await self._execute_intent(intent, text)
-            self.last_intent = intent
+            if on_chunk and intent in STREAM_INTENTS:
+                response = await self._stream_listing(intent, on_chunk)
+            else:
+                response = await self._execute_intent(intent, text, session)
+            session.last_intent = intent
+        elif self.ai_engine.ready:
+            response = await self._handle_ai_chat(session, on_partial)
         else:
+            if self.shared_state:
+                # Only the leader worker loads the model at startup; the
+                # others load theirs once chat reaches them
+                self.ai_engine.start_warm_up()
             # Fallback to general response
             response = await self._handle_general_query(text)
         
+        return await self._run_io(self._end_turn, session, text, response, intent)
+    
+    async def _run_io(self, func: Callable, *args):
+        """Run blocking bookkeeping (SQLite reads and writes) on the io pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executors["io"], func, *args)
+    
+    def _begin_turn(self, session_id: str, text: str) -> Tuple[Session, Optional[str]]:
+        """
+        Load the session, learn from the message and try answering from memory
+        
+        Returns:
+            (session, reply from memory or None); a memory reply is already recorded
+        """
+        session = self.sessions.get(session_id)
+        
+        # Learn from user message
+        with self.memory.synchronized():
+            self.memory.analyze_message(text)
+        
+        # Add to conversation history
+        session.add_message("user", text)
+        
+        # Check if memory can answer the query
+        memory_response = self.memory.get_relevant_memory(text)
+        if memory_response:
+            session.add_message("assistant", memory_response)
+            self._save_interaction(text, memory_response)
+            self.sessions.save(session)
+        return session, memory_response
+    
+    def _end_turn(self, session: Session, text: str, response: str, intent: Optional[str]) -> str:
+        """Record the reply, maybe add a proactive question, and save the session"""
         # Add response to history
-        self.conversation_history.append({"role": "assistant", "content": response})
+        session.add_message("assistant", response)
         
         # Save interaction and memory
-        self._save_interaction(text, response)
+        self._save_interaction(text, response, log=intent not in UNLOGGED_INTENTS)
         
         # Increment message count for proactive learning
-        self.message_count += 1
+        session.message_count += 1
         
         # Check if we should ask a proactive question
-        if self.proactive_learning.should_ask_question(self.message_count):
+        if self.proactive_learning.should_ask_question(session.message_count):
             question_data = self.proactive_learning.get_next_question()
             if question_data:
-                self.pending_question = question_data['question']
+                session.pending_question = question_data['question']
                 # Append question to response
                 response = f"{response}\n\n{question_data['formatted']}"
                 logger.info(f"Added proactive question: {question_data['question']}")
         
         # Check if user's message is answering a pending question
-        if self.pending_question:
+        if session.pending_question:
             # Simple heuristic: if response is not a command, treat as answer
             if not intent or intent in ['greeting', 'thanks', 'affirmation']:
-                self.proactive_learning.record_answer(self.pending_question, text)
-                self.pending_question = None
+                self.proactive_learning.record_answer(session.pending_question, text)
+                session.pending_question = None
                 logger.info("Recorded answer to pending question")
         
+        self.sessions.save(session)
         return response
     
-    def _save_interaction(self, user_input: str, response: str):
-        """Save interaction to profile and update memory"""
-        self.profile.save_conversation(user_input, response)
+    def _save_interaction(self, user_input: str, response: str, log: bool = True):
+        """Save interaction to profile (unless log is False) and checkpoint memory if due"""
+        if log:
+            self.profile.save_conversation(user_input, response)
+        self.memory.checkpoint()
+    
+    def shutdown(self):
+        """Finish running handlers and persist in-process state before the server stops"""
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
+        self.ai_engine.shutdown()
         self.memory.save_memory()
+        self.profile.flush()
+        logger.info("Command processor state saved")
     
-    async def _execute_intent(self, intent: str, text: str) -> str:
-        """Execute specific intent and return response"""
-        
-        intent_handlers = {
-            "greeting": lambda: self._handle_greeting(),
-            "farewell": lambda: self._handle_farewell(),
-            "time": lambda: self._handle_time(),
-            "date": lambda: self._handle_date(),
-            "weather": lambda: self._handle_weather(),
-            "system_info": lambda: self._handle_system_info(),
-            "open_app": lambda: self._handle_open_app(text),
-            "capabilities": lambda: self._handle_capabilities(),
-            "name_query": lambda: self._handle_name_query(),
-            "thanks": lambda: self._handle_thanks(),
-            "affirmation": lambda: self._handle_affirmation(),
-            "negation": lambda: self._handle_negation(),
-            "joke": lambda: self._handle_joke(),
-            "reminder": lambda: self._handle_reminder(text),
-            "calculation": lambda: self._handle_calculation(text),
-            "memory_query": lambda: self._handle_memory_query(text),
-            "forget_me": lambda: self._handle_forget(),
-            "code_help": lambda: self._handle_code_help(text),
-            "code_explain": lambda: self._handle_code_explain(text),
-            "debug_error": lambda: self._handle_debug_error(text),
-            "create_reminder": lambda: self._handle_create_reminder(text),
-            "create_todo": lambda: self._handle_create_todo(text),
-            "show_reminders": lambda: self._handle_show_reminders(),
-            "show_todos": lambda: self._handle_show_todos(),
-            "complete_task": lambda: self._handle_complete_task(text),
-            "delete_task": lambda: self._handle_delete_task(text),
-            "task_summary": lambda: self._handle_task_summary(),
-            "toggle_questions": lambda: self._handle_toggle_questions(text),
-            "learning_summary": lambda: self._handle_learning_summary(),
+    def _init_intent_handlers(self) -> Dict[str, Callable[[str, Session], str]]:
+        """Map each intent to its handler (called with the user's text and session)"""
+        return {
+            "greeting": lambda text, session: self._handle_greeting(session),
+            "farewell": lambda text, session: self._handle_farewell(),
+            "time": lambda text, session: self._handle_time(),
+            "date": lambda text, session: self._handle_date(),
+            "weather": lambda text, session: self._handle_weather(),
+            "system_info": lambda text, session: self._handle_system_info(),
+            "open_app": lambda text, session: self._handle_open_app(text),
+            "capabilities": lambda text, session: self._handle_capabilities(),
+            "name_query": lambda text, session: self._handle_name_query(),
+            "thanks": lambda text, session: self._handle_thanks(),
+            "affirmation": lambda text, session: self._handle_affirmation(session),
+            "negation": lambda text, session: self._handle_negation(),
+            "joke": lambda text, session: self._handle_joke(),
+            "reminder": lambda text, session: self._handle_reminder(text, session),
+            "calculation": lambda text, session: self._handle_calculation(text),
+            "memory_query": lambda text, session: self._handle_memory_query(text),
+            "forget_me": lambda text, session: self._handle_forget(),
+            "code_help": lambda text, session: self._handle_code_help(text),
+            "code_explain": lambda text, session: self._handle_code_explain(text),
+            "debug_error": lambda text, session: self._handle_debug_error(text),
+            "create_reminder": lambda text, session: self._handle_create_reminder(text),
+            "create_todo": lambda text, session: self._handle_create_todo(text),
+            "search_history": lambda text, session: self._handle_search_history(text, session),
+            "show_reminders": lambda text, session: self._handle_show_reminders(text, session),
+            "show_todos": lambda text, session: self._handle_show_todos(text, session),
+            "complete_task": lambda text, session: self._handle_complete_task(text),
+            "delete_task": lambda text, session: self._handle_delete_task(text),
+            "task_summary": lambda text, session: self._handle_task_summary(),
+            "toggle_questions": lambda text, session: self._handle_toggle_questions(text),
+            "learning_summary": lambda text, session: self._handle_learning_summary(),
         }
+    
+    async def _execute_intent(self, intent: str, text: str, session: Session) -> str:
+        """Execute specific intent and return response"""
+        handler = self.intent_handlers.get(intent)
+        if not handler:
+            return "I'm not sure how to help with that yet."
         
-        handler = intent_handlers.get(intent)
-        if handler:
-            return handler()
+        kind = INTENT_KINDS.get(intent, "instant")
+        if kind == "instant":
+            return handler(text, session)
         
-        return "I'm not sure how to help with that yet."
+        # Blocking handler: run it off the event loop so other clients aren't stalled
+        timeout = INTENT_TIMEOUTS.get(intent, KIND_TIMEOUTS[kind])
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self.executors[kind], handler, text, session),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Handler for '{intent}' timed out after {timeout}s")
+            return "Sorry, that's taking longer than expected. Please try again in a moment."
     
-    def _handle_greeting(self) -> str:
+    def _handle_greeting(self, session: Session) -> str:
         """Handle greeting with personalization"""
         import random
         
@@ -349,7 +483,7 @@ class CommandProcessor:
             time_greeting = "Good evening"
         
         # Check conversation history for repeated greetings
-        recent_greetings = sum(1 for msg in self.conversation_history[-6:] 
+        recent_greetings = sum(1 for msg in session.conversation_history[-6:] 
                               if msg.get("role") == "user" and "hello" in msg.get("content", "").lower())
         
         if recent_greetings > 1:
@@ -390,15 +524,20 @@ class CommandProcessor:
     def _handle_system_info(self) -> str:
         """Handle system information query"""
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
+            snapshot = self.metrics.latest()
+            memory = snapshot["memory"]
+            disk = snapshot["disk"]
             
             info = f"""System Status:
 - OS: {platform.system()} {platform.release()}
-- CPU Usage: {cpu_percent}%
-- Memory: {memory.percent}% used ({memory.used // (1024**3)}GB / {memory.total // (1024**3)}GB)
-- Disk: {disk.percent}% used ({disk.used // (1024**3)}GB / {disk.total // (1024**3)}GB)"""
+- CPU Usage: {snapshot['cpu_percent']}%
+- Memory: {memory['percent']}% used ({memory['used'] // (1024**3)}GB / {memory['total'] // (1024**3)}GB)
+- Disk: {disk['percent']}% used ({disk['used'] // (1024**3)}GB / {disk['total'] // (1024**3)}GB)"""
+            
+            averages = self.metrics.averages()
+            if averages:
+                cpu_averages = " / ".join(f"{avg['cpu_percent']}%" for avg in averages.values())
+                info += f"\n- CPU Average ({' / '.join(averages)}): {cpu_averages}"
             
             return info
         except Exception as e:
@@ -434,6 +573,7 @@ class CommandProcessor:
 ⏰ Reminders - "Remind me to call John tomorrow at 3pm"
 ✅ Todos - "Add todo: finish project #work" or "Create task: review code [high]"
 📋 Task Management - "Show my reminders", "Complete todo 1", "Task summary"
+🔎 Search - "Search my history for python decorators" or "Find groceries in my todos"
 
 🧠 Memory - I learn about you! Ask "What do you know about me?"
 🎓 Proactive Learning - I'll ask questions to understand you better (max 2/day)
@@ -460,9 +600,9 @@ Just speak naturally, and I'll do my best to understand and help!"""
         ]
         return random.choice(responses)
     
-    def _handle_affirmation(self) -> str:
+    def _handle_affirmation(self, session: Session) -> str:
         """Handle yes/affirmation"""
-        if self.last_intent:
+        if session.last_intent:
             return "Great! What would you like to do next?"
         return "Alright! How can I help you?"
     
@@ -482,13 +622,13 @@ Just speak naturally, and I'll do my best to understand and help!"""
         ]
         return random.choice(jokes)
     
-    def _handle_reminder(self, text: str) -> str:
+    def _handle_reminder(self, text: str, session: Session) -> str:
         """Handle reminder creation"""
         # Extract what to remind about
         match = re.search(r"remind me (to|about) (.+)", text.lower())
         if match:
             reminder_text = match.group(2).strip()
-            self.context['pending_reminder'] = reminder_text
+            session.context['pending_reminder'] = reminder_text
             return f"I'll note that down: '{reminder_text}'. Reminder functionality is coming soon!"
         return "What would you like me to remind you about?"
     
@@ -533,6 +673,17 @@ Just speak naturally, and I'll do my best to understand and help!"""
         self.memory.forget_user_data()
         return "I've cleared all my memories about you. We can start fresh! Feel free to tell me about yourself again."
     
+    async def _handle_ai_chat(self, session: Session,
+                              on_partial: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+        """Answer with the language model, passing each piece to on_partial as it is generated"""
+        pieces = []
+        async for piece in self.ai_engine.stream_chat(
+                session.conversation_history, session.session_id):
+            pieces.append(piece)
+            if on_partial:
+                await on_partial(piece)
+        return "".join(pieces).strip()
+    
     async def _handle_general_query(self, text: str) -> str:
         """Handle general queries (fallback with smarter responses)"""
         import random
@@ -704,7 +855,8 @@ I'll analyze it and help you fix it!"""
                     description=reminder_data.get('description', ''),
                     due_date=reminder_data.get('due_date'),
                     due_time=reminder_data.get('due_time'),
-                    priority=reminder_data.get('priority', 'medium')
+                    priority=reminder_data.get('priority', 'medium'),
+                    recurring=reminder_data.get('recurring')
                 )
                 
                 if reminder_id:
@@ -713,6 +865,8 @@ I'll analyze it and help you fix it!"""
                         due_info = f" for {reminder_data['due_date']}"
                         if reminder_data.get('due_time'):
                             due_info += f" at {reminder_data['due_time']}"
+                    if reminder_data.get('recurring'):
+                        due_info += f", repeating {reminder_data['recurring']}"
                     
                     priority_emoji = {"high": "🔴", "medium": "🟡", "low": "🟢"}.get(reminder_data.get('priority', 'medium'), "🟡")
                     
@@ -754,14 +908,58 @@ I'll analyze it and help you fix it!"""
             logger.error(f"Error creating todo: {e}")
             return "I encountered an issue creating the todo. Please try again."
     
-    def _handle_show_reminders(self) -> str:
-        """Handle displaying reminders"""
+    def _handle_search_history(self, text: str, session: Session) -> str:
+        """Handle searching conversations, reminders and todos ('more results' continues)"""
         try:
-            reminders = self.reminder_system.get_reminders(status='pending')
+            text_lower = text.lower().strip()
+            request = parse_search_request(text_lower)
+            
+            if request:
+                query, sources = request
+                search = {"query": query, "sources": list(sources), "offset": 0}
+            elif re.match(r"(show )?more (search )?results", text_lower):
+                # Continue the session's last search
+                search = session.context.get("search")
+                if not search or search["offset"] is None:
+                    return "There are no more results. Try 'search my history for [words]'."
+            else:
+                return "What should I look for? Try 'search my history for [words]' or 'find [words] in my todos'."
+            
+            start = search["offset"]
+            page = self.search.search(search["query"], search["sources"], SEARCH_PAGE_SIZE, start)
+            session.context["search"] = dict(search, offset=page["next_offset"])
+            
+            if not page["items"]:
+                if start:
+                    return "That's all of the results."
+                return f"I couldn't find anything matching \"{search['query']}\"."
+            
+            formatted = self.search.format_results(page["items"], start + 1)
+            if page["next_offset"] is not None:
+                formatted += "\n\nSay 'more results' to see the next page."
+            if start:
+                return formatted
+            return f"🔍 Results for \"{search['query']}\":\n\n{formatted}"
+                
+        except Exception as e:
+            logger.error(f"Error searching history: {e}")
+            return "I encountered an issue searching your history. Please try again."
+    
+    def _handle_show_reminders(self, text: str, session: Session) -> str:
+        """Handle displaying a page of reminders ('more reminders' continues)"""
+        try:
+            cursor = session.context.get("reminders_cursor") if "more" in text.lower() else None
+            page = self.reminder_system.get_reminders_page("pending", LIST_PAGE_SIZE, cursor)
+            session.context["reminders_cursor"] = page["next_cursor"]
+            reminders = page["items"]
             
             if reminders:
-                formatted = self.reminder_system.format_reminders_list(reminders)
-                return f"📋 Your Reminders:\n\n{formatted}"
+                formatted = self.reminder_system.format_reminders_list(reminders, header=cursor is None)
+                if page["next_cursor"]:
+                    formatted += "Say 'more reminders' to see the next page."
+                return f"📋 Your Reminders:\n\n{formatted}" if cursor is None else formatted
+            elif cursor:
+                return "That's all of your pending reminders."
             else:
                 return "You have no pending reminders. Add one with 'remind me to [task]'!"
                 
@@ -769,14 +967,21 @@ I'll analyze it and help you fix it!"""
             logger.error(f"Error showing reminders: {e}")
             return "I encountered an issue retrieving your reminders. Please try again."
     
-    def _handle_show_todos(self) -> str:
-        """Handle displaying todos"""
+    def _handle_show_todos(self, text: str, session: Session) -> str:
+        """Handle displaying a page of todos ('more todos' continues)"""
         try:
-            todos = self.reminder_system.get_todos(status='pending')
+            cursor = session.context.get("todos_cursor") if "more" in text.lower() else None
+            page = self.reminder_system.get_todos_page("pending", None, LIST_PAGE_SIZE, cursor)
+            session.context["todos_cursor"] = page["next_cursor"]
+            todos = page["items"]
             
             if todos:
-                formatted = self.reminder_system.format_todos_list(todos)
-                return f"✅ Your Todos:\n\n{formatted}"
+                formatted = self.reminder_system.format_todos_list(todos, header=cursor is None)
+                if page["next_cursor"]:
+                    formatted += "Say 'more todos' to see the next page."
+                return f"✅ Your Todos:\n\n{formatted}" if cursor is None else formatted
+            elif cursor:
+                return "That's all of your pending todos."
             else:
                 return "You have no pending todos. Add one with 'add todo: [task]'!"
                 
@@ -784,78 +989,154 @@ I'll analyze it and help you fix it!"""
             logger.error(f"Error showing todos: {e}")
             return "I encountered an issue retrieving your todos. Please try again."
     
+    async def _stream_listing(self, intent: str, on_chunk: Callable[[str], Awaitable[None]]) -> str:
+        """
+        Send every page of a listing through on_chunk as it is read
+        
+        Only one page is in memory at a time, and each send is awaited, so a
+        slow client slows the reads down instead of piling up output.
+        
+        Returns:
+            Closing message for the listing
+        """
+        if intent == "show_reminders":
+            pages = self.reminder_system.iter_reminder_pages("pending")
+            format_page = self.reminder_system.format_reminders_list
+            title, noun = "📋 Your Reminders:", "reminders"
+            empty = "You have no pending reminders. Add one with 'remind me to [task]'!"
+        else:
+            pages = self.reminder_system.iter_todo_pages("pending")
+            format_page = self.reminder_system.format_todos_list
+            title, noun = "✅ Your Todos:", "todos"
+            empty = "You have no pending todos. Add one with 'add todo: [task]'!"
+        
+        loop = asyncio.get_running_loop()
+        timeout = INTENT_TIMEOUTS.get(intent, KIND_TIMEOUTS["io"])
+        total = 0
+        
+        try:
+            while True:
+                page = await asyncio.wait_for(
+                    loop.run_in_executor(self.executors["io"], next, pages, None),
+                    timeout
+                )
+                if page is None:
+                    break
+                
+                formatted = format_page(page, header=total == 0)
+                await on_chunk(f"{title}\n\n{formatted}" if total == 0 else formatted)
+                total += len(page)
+        except asyncio.TimeoutError:
+            logger.warning(f"Streaming {noun} timed out after {total} items")
+            return "Sorry, that's taking longer than expected. Please try again."
+        except Exception as e:
+            logger.error(f"Error streaming {noun}: {e}")
+            return f"I encountered an issue retrieving your {noun}. Please try again."
+        
+        if total == 0:
+            return empty
+        return f"That's all {total} pending {noun}."
+    
     def _handle_complete_task(self, text: str) -> str:
-        """Handle marking tasks as complete"""
+        """Handle marking tasks as complete ('complete todos 3, 5, 8-12', 'complete todos tagged work')"""
         try:
-            import re
+            text_lower = text.lower()
             
-            # Extract task type (reminder or todo) and ID
-            is_reminder = 'reminder' in text.lower()
-            is_todo = 'todo' in text.lower() or 'task' in text.lower()
+            # Extract task type (reminder or todo)
+            is_reminder = 'reminder' in text_lower
+            is_todo = 'todo' in text_lower or 'task' in text_lower
             
-            # Extract numeric ID
-            numbers = re.findall(r'\d+', text)
+            task_ids = parse_task_ids(text)
             
-            if not numbers:
-                return "Please specify which task to complete. Example: 'complete reminder 1' or 'complete todo 3'"
+            # No IDs: every pending todo with a tag or in a category
+            task_filter = TASK_FILTER_PATTERN.search(text_lower)
+            if is_todo and not is_reminder and not task_ids and task_filter:
+                by_tag = task_filter.group(1) in ("tagged", "with tag")
+                name = task_filter.group(2)
+                if by_tag:
+                    count = self.reminder_system.complete_todos_where(tag=name)
+                    where = f"tagged #{name}"
+                else:
+                    count = self.reminder_system.complete_todos_where(category=name)
+                    where = f"in {name}"
+                if count:
+                    return f"✅ Completed {count} todo{'s' if count != 1 else ''} {where}!"
+                return f"You have no pending todos {where}."
             
-            task_id = int(numbers[0])
+            if not task_ids:
+                return "Please specify which task to complete. Example: 'complete reminder 1' or 'complete todos 3, 5, 8-12'"
             
             if is_reminder:
-                success = self.reminder_system.complete_reminder(task_id)
-                if success:
-                    return f"✅ Reminder #{task_id} marked as complete!"
-                else:
-                    return f"Couldn't find reminder #{task_id}. Check your list with 'show reminders'."
+                completed = self.reminder_system.complete_reminders(task_ids)
+                return self._format_bulk_result("reminder", task_ids, completed, "✅", "marked as complete!")
             elif is_todo:
-                success = self.reminder_system.complete_todo(task_id)
-                if success:
-                    return f"✅ Todo #{task_id} marked as complete!"
-                else:
-                    return f"Couldn't find todo #{task_id}. Check your list with 'show todos'."
+                completed = self.reminder_system.complete_todos(task_ids)
+                return self._format_bulk_result("todo", task_ids, completed, "✅", "marked as complete!")
             else:
                 return "Please specify 'reminder' or 'todo'. Example: 'complete reminder 1' or 'complete todo 3'"
-                
+        
+        except ValueError as e:
+            return f"{e}. Please split it into smaller batches."
         except Exception as e:
             logger.error(f"Error completing task: {e}")
             return "I encountered an issue completing the task. Please try again."
     
     def _handle_delete_task(self, text: str) -> str:
-        """Handle deleting tasks"""
+        """Handle deleting tasks ('delete todos 3, 5, 8-12')"""
         try:
-            import re
-            
-            # Extract task type (reminder or todo) and ID
-            is_reminder = 'reminder' in text.lower()
-            is_todo = 'todo' in text.lower() or 'task' in text.lower()
+            text_lower = text.lower()
             
-            # Extract numeric ID
-            numbers = re.findall(r'\d+', text)
+            # Extract task type (reminder or todo) and IDs
+            is_reminder = 'reminder' in text_lower
+            is_todo = 'todo' in text_lower or 'task' in text_lower
             
-            if not numbers:
-                return "Please specify which task to delete. Example: 'delete reminder 1' or 'delete todo 3'"
+            task_ids = parse_task_ids(text)
             
-            task_id = int(numbers[0])
+            if not task_ids:
+                return "Please specify which task to delete. Example: 'delete reminder 1' or 'delete todos 3, 5, 8-12'"
             
             if is_reminder:
-                success = self.reminder_system.delete_reminder(task_id)
-                if success:
-                    return f"🗑️ Reminder #{task_id} deleted."
-                else:
-                    return f"Couldn't find reminder #{task_id}. Check your list with 'show reminders'."
+                deleted = self.reminder_system.delete_reminders(task_ids)
+                return self._format_bulk_result("reminder", task_ids, deleted, "🗑️", "deleted.")
             elif is_todo:
-                success = self.reminder_system.delete_todo(task_id)
-                if success:
-                    return f"🗑️ Todo #{task_id} deleted."
-                else:
-                    return f"Couldn't find todo #{task_id}. Check your list with 'show todos'."
+                deleted = self.reminder_system.delete_todos(task_ids)
+                return self._format_bulk_result("todo", task_ids, deleted, "🗑️", "deleted.")
             else:
                 return "Please specify 'reminder' or 'todo'. Example: 'delete reminder 1' or 'delete todo 3'"
-                
+        
+        except ValueError as e:
+            return f"{e}. Please split it into smaller batches."
         except Exception as e:
             logger.error(f"Error deleting task: {e}")
             return "I encountered an issue deleting the task. Please try again."
     
+    def _format_bulk_result(self, noun: str, requested: list, done: list, emoji: str, outcome: str) -> str:
+        """Describe which of the requested tasks were found and changed"""
+        done_ids = set(done)
+        missing = [task_id for task_id in requested if task_id not in done_ids]
+        
+        lines = []
+        if done:
+            label = noun.capitalize() + ("s" if len(done) > 1 else "")
+            lines.append(f"{emoji} {label} {self._format_id_list(done)} {outcome}")
+        if missing:
+            label = noun + ("s" if len(missing) > 1 else "")
+            lines.append(f"Couldn't find {label} {self._format_id_list(missing)}. Check your list with 'show {noun}s'.")
+        return "\n".join(lines)
+    
+    def _format_id_list(self, ids: list) -> str:
+        """Format IDs as '#3, #5, #8-12', collapsing consecutive runs"""
+        parts = []
+        run_start = previous = None
+        for task_id in sorted(ids) + [None]:
+            if previous is not None and task_id == previous + 1:
+                previous = task_id
+                continue
+            if run_start is not None:
+                parts.append(f"#{run_start}" if run_start == previous else f"#{run_start}-{previous}")
+            run_start = previous = task_id
+        return ", ".join(parts)
+    
     def _handle_task_summary(self) -> str:
         """Handle showing task summary"""
         try:
@@ -899,13 +1180,13 @@ I'll analyze it and help you fix it!"""
             
             response = "📊 **Learning Summary**\n\n"
             response += f"**Questions Asked:** {summary['total_asked']}\n"
-            response += f"**Questions Answered:** {summary['answered']}\n"
+            response += f"**Questions Answered:** {summary['total_answered']}\n"
             response += f"**Today's Questions:** {summary['asked_today']}/{summary['max_per_day']}\n\n"
             
-            if summary['by_category']:
+            if summary['categories']:
                 response += "**By Category:**\n"
-                for category, count in summary['by_category'].items():
-                    response += f"- {category.title()}: {count} questions\n"
+                for category, counts in summary['categories'].items():
+                    response += f"- {category.title()}: {counts['asked']} questions\n"
             
             if recent:
                 response += "\n**Recent Questions:**\n"
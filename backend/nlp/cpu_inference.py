@@ -0,0 +1,104 @@
+"""
+CPU Inference
+Thread settings, int8 quantization and graph compilation for running the
+language model on CPU
+"""
+
+try:
+    import torch
+    from torch import nn
+    from transformers.pytorch_utils import Conv1D
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+from core.logger import setup_logger
+
+logger = setup_logger("CPUInference")
+
+
+def configure_threads(intra_op: int, inter_op: int):
+    """
+    Set torch's CPU thread pools (process-wide; 0 keeps torch's default)
+
+    Args:
+        intra_op: Threads used inside one operation (matrix multiplies)
+        inter_op: Threads running independent operations in parallel
+    """
+    if intra_op <= 0 and inter_op <= 0:
+        return
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0 and torch.get_num_interop_threads() != inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            # Only allowed before the pool has done any work
+            logger.warning(f"Could not set inter-op threads to {inter_op}: {e}")
+    logger.info(f"CPU threads: {torch.get_num_threads()} intra-op, "
+                f"{torch.get_num_interop_threads()} inter-op")
+
+
+def _linear_from_conv1d(module: "Conv1D") -> "nn.Linear":
+    """The nn.Linear computing the same as a GPT-2 style Conv1D (which stores its weight transposed)"""
+    in_features, out_features = module.weight.shape
+    linear = nn.Linear(in_features, out_features)
+    linear.weight.data = module.weight.data.t().contiguous()
+    linear.bias.data = module.bias.data
+    return linear
+
+
+def _replace_conv1d(module: "nn.Module"):
+    """Swap every Conv1D under module for an equivalent nn.Linear, in place"""
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            setattr(module, name, _linear_from_conv1d(child))
+        else:
+            _replace_conv1d(child)
+
+
+def quantize_linear_layers(model: "nn.Module") -> "nn.Module":
+    """
+    Dynamically quantize a model's linear layers to int8
+
+    Weights are stored as int8 and activations quantized on the fly, which
+    shrinks the layers about 4x and speeds up their matrix multiplies on
+    CPU. GPT-2 family models implement their projections as Conv1D, so
+    those become nn.Linear first. The output layer is left in float: its
+    weight is shared with the input embeddings, so a quantized copy would
+    add memory rather than save it, and it decides every sampled token.
+
+    Args:
+        model: A loaded causal language model in eval mode
+
+    Returns:
+        The quantized model
+    """
+    _replace_conv1d(model)
+    output = model.get_output_embeddings()
+    layers = {
+        name for name, module in model.named_modules()
+        if isinstance(module, nn.Linear) and module is not output
+    }
+    # In place: a copy would briefly double the memory this is meant to save
+    return torch.ao.quantization.quantize_dynamic(model, layers, dtype=torch.qint8, inplace=True)
+
+
+def compile_forward(model: "nn.Module") -> "nn.Module":
+    """
+    Compile the model's forward pass into an optimized graph
+
+    Prompt and cache lengths change every step, so the graph is compiled
+    for dynamic shapes; the first generations are slow while it compiles.
+
+    Args:
+        model: A loaded causal language model
+
+    Returns:
+        The same model, with its forward pass compiled
+    """
+    if not hasattr(torch, "compile"):
+        logger.warning("torch.compile needs torch 2.0 or later; running uncompiled")
+        return model
+    model.forward = torch.compile(model.forward, dynamic=True)
+    return model
@@ -0,0 +1,215 @@
+"""
+Inference Batcher
+Coalesces concurrent generation requests into batches run on one model
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+from core.logger import setup_logger
+
+logger = setup_logger("InferenceBatcher")
+
+
+class GenerationRequest:
+    """One prompt to generate from, and where its text goes"""
+
+    def __init__(self, prompt: str, max_new_tokens: int,
+                 on_text: Callable[[str], None],
+                 on_done: Callable[[Optional[BaseException]], None],
+                 cache_key: Optional[str] = None):
+        """
+        Args:
+            prompt: Input prompt
+            max_new_tokens: Tokens to generate at most
+            on_text: Called (from the generating thread) with each new piece of text
+            on_done: Called once at the end, with the error if generation failed
+            cache_key: Conversation the prompt continues, if its prefix may be cached
+        """
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.on_text = on_text
+        self.on_done = on_done
+        self.cache_key = cache_key
+        self.submitted_at = time.monotonic()
+        # Set by the caller when it no longer wants the text
+        self.cancelled = threading.Event()
+
+        # Generation state
+        self.token_ids: List[int] = []
+        self.emitted = 0
+        self.finished = False
+
+
+class BatchStreamer:
+    """
+    Streamer for model.generate over a batch: routes each row's new tokens
+    to its request as text
+
+    A row finishes at its end-of-sequence token, at its own token limit or
+    when its request is cancelled; tokens generated for it after that (the
+    batch runs until its longest row is done) are dropped.
+    """
+
+    def __init__(self, tokenizer, requests: List[GenerationRequest]):
+        self.tokenizer = tokenizer
+        self.requests = requests
+        self._prompt_seen = False
+
+    @property
+    def all_finished(self) -> bool:
+        """Whether every row is done (generation can stop)"""
+        return all(request.finished for request in self.requests)
+
+    def put(self, value):
+        """Take one step's tokens for the batch (generate passes the prompt first)"""
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            return
+
+        for request, token in zip(self.requests, value.reshape(-1).tolist()):
+            if request.finished:
+                continue
+            if request.cancelled.is_set():
+                request.finished = True
+                continue
+            if token == self.tokenizer.eos_token_id:
+                request.finished = True
+            else:
+                request.token_ids.append(token)
+                request.finished = len(request.token_ids) >= request.max_new_tokens
+            self._flush(request)
+
+    def end(self):
+        """Hand out whatever text every row still holds back"""
+        for request in self.requests:
+            request.finished = True
+            self._flush(request)
+
+    def _flush(self, request: GenerationRequest):
+        """Pass on the row's new text, holding back a word that may not be complete yet"""
+        if request.cancelled.is_set():
+            return
+        text = self.tokenizer.decode(request.token_ids, skip_special_tokens=True)
+        end = len(text) if request.finished else max(text.rfind(" "), text.rfind("\n")) + 1
+        if end <= request.emitted:
+            return
+        try:
+            request.on_text(text[request.emitted:end])
+        except Exception as e:
+            # A caller that can't take text any more mustn't stop the rest of the batch
+            logger.warning(f"Dropping a request whose text can't be delivered: {e}")
+            request.cancelled.set()
+        request.emitted = end
+
+
+class InferenceBatcher:
+    """
+    Runs generation requests on one background thread, in batches
+
+    A batch is formed from the first waiting request plus any that arrive
+    within `window` seconds of it (requests that waited out the previous
+    batch join at once), up to `max_batch_size`. The model computes a
+    batch's rows together, so concurrent users share each forward pass
+    instead of queueing for whole generations or fighting over cores.
+    """
+
+    _STOP = object()
+
+    def __init__(self, run_batch: Callable[[List[GenerationRequest]], None],
+                 max_batch_size: int, window: float):
+        """
+        Args:
+            run_batch: Generates a batch, streaming text to each request
+            max_batch_size: Requests generated together at most
+            window: Seconds a request waits for others to join its batch
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, request: GenerationRequest):
+        """Queue a request; its callbacks run on the batcher thread"""
+        if self._closed:
+            request.on_done(RuntimeError("Inference batcher is closed"))
+            return
+        self._queue.put(request)
+
+    def close(self):
+        """Stop after the running batch; requests still waiting are failed"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+
+    def _next_batch(self) -> Optional[List[GenerationRequest]]:
+        """Wait for a request, then gather the rest of its batch (None once closed)"""
+        first = self._queue.get()
+        if first is self._STOP:
+            return None
+
+        batch = [first]
+        deadline = first.submitted_at + self.window
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                # Left for the loop, which fails this batch and the rest
+                self._queue.put(item)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        """Batcher loop"""
+        while not self._closed:
+            batch = self._next_batch()
+            if batch is None:
+                break
+
+            live = []
+            for request in batch:
+                if request.cancelled.is_set():
+                    self._finish(request, None)
+                elif self._closed:
+                    # Closed while the batch was gathering: it never started
+                    self._finish(request, RuntimeError("Inference batcher is closed"))
+                else:
+                    live.append(request)
+            if not live:
+                continue
+
+            error = None
+            try:
+                self.run_batch(live)
+            except Exception as e:
+                logger.error(f"Batch of {len(live)} failed: {e}")
+                error = e
+            for request in live:
+                self._finish(request, error)
+
+        # Closed: fail anything still waiting
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if request is not self._STOP:
+                self._finish(request, RuntimeError("Inference batcher is closed"))
+
+    @staticmethod
+    def _finish(request: GenerationRequest, error: Optional[BaseException]):
+        """Tell a request it's done (a failing callback is logged, not raised)"""
+        try:
+            request.on_done(error)
+        except Exception as e:
+            logger.warning(f"Could not complete a generation request: {e}")
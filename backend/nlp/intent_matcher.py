@@ -0,0 +1,163 @@
+"""
+Intent Matcher - Compiled intent recognition engine
+Indexes command patterns by their literal prefixes so each message only runs
+the regexes that can possibly match it
+"""
+
+import re
+from typing import Dict, List, Optional, Set
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from core.logger import setup_logger
+
+logger = setup_logger("IntentMatcher")
+
+# Length of the literal prefixes used as index keys
+PREFIX_LENGTH = 3
+
+# Give up indexing a pattern that expands to more prefixes than this
+MAX_PREFIXES = 64
+
+
+class IntentMatcher:
+    """Match text to the first intent (in declared order) with a matching pattern"""
+
+    def __init__(self, command_patterns: Dict[str, List[str]]):
+        self.intents = list(command_patterns.keys())
+
+        # One compiled regex per intent, all of its patterns alternated
+        self.compiled = [
+            re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+            for patterns in command_patterns.values()
+        ]
+
+        # Literal prefix -> intent ranks that may match when it occurs
+        self.prefix_index: Dict[str, Set[int]] = {}
+        # Intents with a pattern we couldn't index; always checked
+        self.unindexed: Set[int] = set()
+
+        for rank, patterns in enumerate(command_patterns.values()):
+            for pattern in patterns:
+                prefixes = self._literal_prefixes(pattern)
+                if not prefixes:
+                    self.unindexed.add(rank)
+                    continue
+                for prefix in prefixes:
+                    self.prefix_index.setdefault(prefix, set()).add(rank)
+
+        # Literals shorter than the key length (e.g. "hi") are checked directly
+        self.short_prefixes = [p for p in self.prefix_index if len(p) < PREFIX_LENGTH]
+
+        logger.info(
+            f"Intent matcher compiled: {len(self.intents)} intents, "
+            f"{len(self.prefix_index)} prefixes, {len(self.unindexed)} unindexed"
+        )
+
+    def match(self, text: str) -> Optional[str]:
+        """
+        Match text to an intent
+
+        Args:
+            text: Normalized (lowercased, stripped) user input
+
+        Returns:
+            First matching intent in declared order, or None
+        """
+        keys = {text[i:i + PREFIX_LENGTH] for i in range(len(text) - PREFIX_LENGTH + 1)}
+        keys.update(p for p in self.short_prefixes if p in text)
+
+        candidates = set(self.unindexed)
+        for key in self.prefix_index.keys() & keys:
+            candidates |= self.prefix_index[key]
+
+        for rank in sorted(candidates):
+            if self.compiled[rank].search(text):
+                return self.intents[rank]
+
+        return None
+
+    @classmethod
+    def _literal_prefixes(cls, pattern: str) -> Optional[Set[str]]:
+        """
+        Compute the literal prefixes every match of a pattern must start with
+
+        Args:
+            pattern: Regex pattern string
+
+        Returns:
+            Set of prefixes (each at most PREFIX_LENGTH long), or None if the
+            pattern can start with something that isn't a known literal
+        """
+        try:
+            parsed = sre_parse.parse(pattern)
+        except Exception:
+            return None
+
+        prefixes = cls._expand(list(parsed), {""})
+        if not prefixes or "" in prefixes:
+            return None
+        return prefixes
+
+    @classmethod
+    def _expand(cls, items: list, prefixes: Set[str]) -> Optional[Set[str]]:
+        """Extend partial prefixes with a sequence of parsed regex items"""
+        done = {p for p in prefixes if len(p) >= PREFIX_LENGTH}
+        open_ = prefixes - done
+
+        for index, (op, av) in enumerate(items):
+            if not open_:
+                break
+
+            rest = items[index + 1:]
+
+            if op == sre_parse.LITERAL:
+                open_ = {p + chr(av) for p in open_}
+            elif op == sre_parse.AT:
+                # Anchors are zero-width
+                continue
+            elif op == sre_parse.IN and all(o == sre_parse.LITERAL for o, _ in av):
+                open_ = {p + chr(c) for p in open_ for _, c in av}
+            elif op == sre_parse.SUBPATTERN:
+                return cls._merge(done, cls._expand(list(av[-1]) + rest, open_))
+            elif op == sre_parse.BRANCH:
+                result = set()
+                for branch in av[1]:
+                    expanded = cls._expand(list(branch) + rest, open_)
+                    if expanded is None:
+                        return None
+                    result |= expanded
+                return cls._merge(done, result)
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+                low, _, body = av
+                once = cls._expand(list(body), open_)
+                if once is None:
+                    return None
+                if low == 0:
+                    # Optional: the match may skip it entirely
+                    skipped = cls._expand(rest, open_)
+                    if skipped is None:
+                        return None
+                    return cls._merge(done, once | skipped)
+                # Required at least once: the prefix is fixed up to here
+                return cls._merge(done, once)
+            else:
+                # Anything else (classes, wildcards, ...) ends the prefix
+                return cls._merge(done, open_)
+
+            if len(open_) > MAX_PREFIXES:
+                return None
+            done |= {p for p in open_ if len(p) >= PREFIX_LENGTH}
+            open_ = {p for p in open_ if len(p) < PREFIX_LENGTH}
+
+        return cls._merge(done, open_)
+
+    @staticmethod
+    def _merge(done: Set[str], expanded: Optional[Set[str]]) -> Optional[Set[str]]:
+        """Combine finished prefixes with a sub-expansion result"""
+        if expanded is None or len(done) + len(expanded) > MAX_PREFIXES:
+            return None
+        return {p[:PREFIX_LENGTH] for p in done | expanded}
@@ -0,0 +1,165 @@
+"""
+Prefix Cache
+Per-session attention key/value caches, so each chat turn only encodes the
+tokens added since the last one
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from core.logger import setup_logger
+
+logger = setup_logger("PrefixCache")
+
+# Reusing fewer tokens than this isn't worth keeping the entry for
+MIN_REUSED_TOKENS = 16
+
+
+def cache_length(past) -> int:
+    """Number of tokens a past_key_values cache holds"""
+    if hasattr(past, "get_seq_length"):
+        return int(past.get_seq_length())
+    # Legacy format: one (key, value) pair per layer, (batch, heads, tokens, dim)
+    return past[0][0].shape[-2]
+
+
+def crop_cache(past, length: int):
+    """Keep the first `length` tokens of a past_key_values cache"""
+    if hasattr(past, "crop"):
+        past.crop(length)
+        return past
+    return tuple(tuple(tensor[..., :length, :] for tensor in layer) for layer in past)
+
+
+def cache_nbytes(past) -> int:
+    """Memory held by a past_key_values cache"""
+    if hasattr(past, "to_legacy_cache"):
+        past = past.to_legacy_cache()
+
+    total = 0
+    stack = [past]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, (tuple, list)):
+            stack.extend(item)
+        elif hasattr(item, "element_size"):
+            total += item.element_size() * item.nelement()
+    return total
+
+
+def common_prefix_length(a: List[int], b: List[int]) -> int:
+    """Length of the longest common prefix of two token id lists"""
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+class PrefixCache:
+    """
+    Least-recently-used caches of each session's conversation so far
+
+    Each entry is the token ids a session's last generation saw and the
+    model's key/value cache for them. Entries are bounded by total memory,
+    not by count, since a long conversation costs far more than a short one.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[List[int], Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+
+    def take(self, key: str, token_ids: List[int]) -> Tuple[Optional[Any], int]:
+        """
+        Remove a session's cache and crop it to what the new prompt shares
+
+        The cache is taken out while it's in use (generation extends it in
+        place) and should be put back with the result. When old messages
+        have dropped out of the conversation, the prompt no longer starts
+        the same way and the cache is discarded.
+
+        Args:
+            key: Session the prompt belongs to
+            token_ids: The new prompt's token ids
+
+        Returns:
+            (past_key_values, cached tokens), or (None, 0) on a miss
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+        if entry is None:
+            self.misses += 1
+            return None, 0
+
+        cached_ids, past, _ = entry
+        # At least one prompt token must be left to run the model on
+        reused = min(common_prefix_length(cached_ids, token_ids), len(token_ids) - 1)
+        if reused < MIN_REUSED_TOKENS:
+            self.misses += 1
+            return None, 0
+
+        if reused < cache_length(past):
+            past = crop_cache(past, reused)
+        self.hits += 1
+        self.reused_tokens += reused
+        return past, reused
+
+    def put(self, key: str, token_ids: List[int], past):
+        """
+        Store a session's cache, evicting the least recently used if over budget
+
+        Args:
+            key: Session
+            token_ids: Ids of every token the cache holds, in order
+            past: The model's past_key_values for them
+        """
+        nbytes = cache_nbytes(past)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (token_ids, past, nbytes)
+            self._bytes += nbytes
+
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def discard(self, key: str):
+        """Drop a session's cache"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def clear(self):
+        """Drop every cache"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Entries, memory used and hit counts"""
+        with self._lock:
+            return {
+                "sessions": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reused_tokens": self.reused_tokens,
+            }
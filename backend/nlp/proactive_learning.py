@@ -3,21 +3,31 @@ Proactive Learning System - AI asks questions to learn about users
 """
 
 import random
-from datetime import datetime, timedelta
+import threading
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Optional, Dict, Any
-import sqlite3
 
 from core.logger import setup_logger
+from core.database import get_database
 
 logger = setup_logger("ProactiveLearning")
 
+# Minimum time between two questions
+QUESTION_INTERVAL = timedelta(minutes=5)
+
+# Chance of asking once every other condition is met, so it feels natural
+ASK_PROBABILITY = 0.3
+
 
 class ProactiveLearning:
     """System for AI to ask questions and learn about users proactively"""
     
-    def __init__(self, db_path: Path):
+    def __init__(self, db_path: Path, shared: bool = False):
         self.db_path = db_path
+        self.db = get_database(db_path)
+        # Other processes use the same database (multi-worker mode)
+        self.shared = shared
         self._init_database()
         
         # Question categories and templates
@@ -58,170 +68,202 @@ class ProactiveLearning:
                 "Am I asking too many questions?",
             ]
         }
+        self._question_categories = {
+            question: category
+            for category, questions in self.question_templates.items()
+            for question in questions
+        }
+        
+        # Settings, today's question count and the questions not asked yet,
+        # kept in memory so deciding whether to ask (on every message) needs
+        # no queries and picking a question doesn't depend on how many have
+        # been asked; writes here go through to the database, other
+        # processes' writes trigger a reload
+        self._lock = threading.Lock()
+        self._load_state()
         
         logger.info("Proactive learning system initialized")
     
     def _init_database(self):
         """Initialize the learning database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Questions asked history
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS asked_questions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                category TEXT NOT NULL,
-                question TEXT NOT NULL,
-                asked_at TIMESTAMP NOT NULL,
-                answered BOOLEAN DEFAULT FALSE,
-                answer TEXT,
-                answered_at TIMESTAMP
-            )
-        """)
-        
-        # Learning settings
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS learning_settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            )
-        """)
+        with self.db.transaction() as cursor:
+            # Questions asked history
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS asked_questions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    category TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    asked_at TIMESTAMP NOT NULL,
+                    answered BOOLEAN DEFAULT FALSE,
+                    answer TEXT,
+                    answered_at TIMESTAMP
+                )
+            """)
+            
+            # Learning settings
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS learning_settings (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """)
+            
+            # Initialize default settings
+            cursor.execute("""
+                INSERT OR IGNORE INTO learning_settings (key, value)
+                VALUES ('questions_enabled', 'true')
+            """)
+            cursor.execute("""
+                INSERT OR IGNORE INTO learning_settings (key, value)
+                VALUES ('questions_per_session', '2')
+            """)
+            cursor.execute("""
+                INSERT OR IGNORE INTO learning_settings (key, value)
+                VALUES ('min_messages_before_question', '5')
+            """)
+            cursor.execute("""
+                INSERT OR IGNORE INTO learning_settings (key, value)
+                VALUES ('last_question_time', '1970-01-01 00:00:00')
+            """)
+            
+            # Answer lookups by question, recent questions by time
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_asked_questions_question
+                ON asked_questions(question, answered)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_asked_questions_asked_at
+                ON asked_questions(asked_at)
+            """)
         
-        # Initialize default settings
-        cursor.execute("""
-            INSERT OR IGNORE INTO learning_settings (key, value)
-            VALUES ('questions_enabled', 'true')
-        """)
-        cursor.execute("""
-            INSERT OR IGNORE INTO learning_settings (key, value)
-            VALUES ('questions_per_session', '2')
-        """)
-        cursor.execute("""
-            INSERT OR IGNORE INTO learning_settings (key, value)
-            VALUES ('min_messages_before_question', '5')
-        """)
-        cursor.execute("""
-            INSERT OR IGNORE INTO learning_settings (key, value)
-            VALUES ('last_question_time', '1970-01-01 00:00:00')
-        """)
-        
-        conn.commit()
-        conn.close()
         logger.info("Learning database initialized")
     
+    def _load_state(self):
+        """Read settings, today's question count and the unasked questions into memory"""
+        today = date.today()
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT key, value FROM learning_settings")
+            settings = dict(cursor.fetchall())
+            
+            # A range on asked_at (ISO timestamps sort by time) rather than DATE(asked_at)
+            cursor.execute("""
+                SELECT COUNT(*) FROM asked_questions
+                WHERE asked_at >= ? AND asked_at < ?
+            """, (today.isoformat(), (today + timedelta(days=1)).isoformat()))
+            asked_today = cursor.fetchone()[0]
+            
+            cursor.execute("SELECT DISTINCT question FROM asked_questions")
+            asked = {row[0] for row in cursor.fetchall()}
+            
+            cursor.execute("""
+                SELECT category, COUNT(*)
+                FROM asked_questions
+                WHERE answered = TRUE
+                GROUP BY category
+            """)
+            answered_counts = dict(cursor.fetchall())
+        
+        with self._lock:
+            self.questions_enabled = settings['questions_enabled'] == 'true'
+            self.min_messages = int(settings['min_messages_before_question'])
+            self.questions_per_session = int(settings['questions_per_session'])
+            self.last_question_time = datetime.fromisoformat(settings['last_question_time'])
+            self._today = today
+            self._asked_today = asked_today
+            # category -> unasked questions (unordered: taken by swap-and-pop)
+            self._unasked = {
+                category: [question for question in questions if question not in asked]
+                for category, questions in self.question_templates.items()
+            }
+            self._answered_counts = answered_counts
+    
+    def _refresh(self):
+        """Reload the cached state if another process has written to the database"""
+        if self.shared and self.db.changed_elsewhere():
+            self._load_state()
+    
+    def questions_asked_today(self) -> int:
+        """Number of questions asked since midnight"""
+        with self._lock:
+            self._roll_over(date.today())
+            return self._asked_today
+    
+    def _too_soon(self, message_count: int) -> bool:
+        """Too few messages this session, or too little time since the last question"""
+        return (message_count < self.min_messages
+                or datetime.now() - self.last_question_time < QUESTION_INTERVAL)
+    
+    def _count_question(self, asked_at: datetime):
+        """Update the cached state for a question just asked"""
+        with self._lock:
+            self.last_question_time = asked_at
+            self._roll_over(asked_at.date())
+            self._asked_today += 1
+    
+    def _take_question(self, category: str) -> str:
+        """Remove and return a random unasked question in O(1) (call with the lock held)"""
+        available = self._unasked[category]
+        index = random.randrange(len(available))
+        available[index], available[-1] = available[-1], available[index]
+        return available.pop()
+    
+    def _roll_over(self, today: date):
+        """Start a new daily count at midnight (call with the lock held)"""
+        if self._today != today:
+            self._today = today
+            self._asked_today = 0
+    
     def should_ask_question(self, message_count: int) -> bool:
-        """Determine if AI should ask a question now"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Check if questions are enabled
-        cursor.execute("SELECT value FROM learning_settings WHERE key = 'questions_enabled'")
-        enabled = cursor.fetchone()[0] == 'true'
-        
-        if not enabled:
-            conn.close()
-            return False
-        
-        # Check minimum messages threshold
-        cursor.execute("SELECT value FROM learning_settings WHERE key = 'min_messages_before_question'")
-        min_messages = int(cursor.fetchone()[0])
-        
-        if message_count < min_messages:
-            conn.close()
+        """Determine if AI should ask a question now (from cached state, without queries)"""
+        # Other processes can only make these stricter (by asking a question
+        # themselves), so a "not yet" from the cache stands without a refresh
+        if self._too_soon(message_count):
             return False
         
-        # Check last question time (don't ask too frequently)
-        cursor.execute("SELECT value FROM learning_settings WHERE key = 'last_question_time'")
-        last_time_str = cursor.fetchone()[0]
-        last_time = datetime.fromisoformat(last_time_str)
-        
-        # Wait at least 10 messages or 5 minutes before asking another question
-        time_diff = datetime.now() - last_time
-        if time_diff < timedelta(minutes=5):
-            conn.close()
+        self._refresh()
+        if not self.questions_enabled or self._too_soon(message_count):
             return False
         
-        # Check how many questions asked today
-        today = datetime.now().date()
-        cursor.execute("""
-            SELECT COUNT(*) FROM asked_questions 
-            WHERE DATE(asked_at) = ?
-        """, (today,))
-        questions_today = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT value FROM learning_settings WHERE key = 'questions_per_session'")
-        max_per_session = int(cursor.fetchone()[0])
-        
-        conn.close()
-        
-        if questions_today >= max_per_session:
+        if self.questions_asked_today() >= self.questions_per_session:
             return False
         
-        # Random probability to make it feel natural (30% chance when conditions met)
-        return random.random() < 0.3
+        return random.random() < ASK_PROBABILITY
     
     def get_next_question(self) -> Optional[Dict[str, str]]:
         """Get the next appropriate question to ask"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get questions already asked
-        cursor.execute("SELECT question FROM asked_questions")
-        asked = {row[0] for row in cursor.fetchall()}
-        
-        # Find categories with fewest questions answered
-        cursor.execute("""
-            SELECT category, COUNT(*) as count
-            FROM asked_questions
-            WHERE answered = TRUE
-            GROUP BY category
-            ORDER BY count ASC
-        """)
-        category_counts = {row[0]: row[1] for row in cursor.fetchall()}
-        
-        # Choose category with least answered questions
-        all_categories = list(self.question_templates.keys())
-        category = min(all_categories, key=lambda c: category_counts.get(c, 0))
-        
-        # Find unasked question in that category
-        available_questions = [
-            q for q in self.question_templates[category]
-            if q not in asked
-        ]
-        
-        if not available_questions:
-            # All questions in this category asked, try another
-            for cat in all_categories:
-                available_questions = [
-                    q for q in self.question_templates[cat]
-                    if q not in asked
-                ]
-                if available_questions:
-                    category = cat
-                    break
-        
-        if not available_questions:
-            conn.close()
-            return None
-        
-        question = random.choice(available_questions)
+        self._refresh()
+        
+        with self._lock:
+            # Category with the fewest answered questions (there are only a
+            # handful), falling back to any category with questions left
+            category = min(self.question_templates, key=lambda c: self._answered_counts.get(c, 0))
+            if not self._unasked[category]:
+                category = next((c for c in self.question_templates if self._unasked[c]), None)
+            if category is None:
+                return None
+            question = self._take_question(category)
         
         # Record that we're asking this question
         now = datetime.now().isoformat()
-        cursor.execute("""
-            INSERT INTO asked_questions (category, question, asked_at)
-            VALUES (?, ?, ?)
-        """, (category, question, now))
-        
-        # Update last question time
-        cursor.execute("""
-            UPDATE learning_settings
-            SET value = ?
-            WHERE key = 'last_question_time'
-        """, (now,))
-        
-        conn.commit()
-        conn.close()
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("""
+                    INSERT INTO asked_questions (category, question, asked_at)
+                    VALUES (?, ?, ?)
+                """, (category, question, now))
+                
+                # Update last question time
+                cursor.execute("""
+                    UPDATE learning_settings
+                    SET value = ?
+                    WHERE key = 'last_question_time'
+                """, (now,))
+        except Exception:
+            with self._lock:
+                self._unasked[category].append(question)
+            raise
+        
+        self._count_question(datetime.fromisoformat(now))
         
         logger.info(f"Generated question from category '{category}': {question}")
         
@@ -233,111 +275,113 @@ class ProactiveLearning:
     
     def record_answer(self, question: str, answer: str):
         """Record user's answer to a question"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        now = datetime.now().isoformat()
-        cursor.execute("""
-            UPDATE asked_questions
-            SET answered = TRUE,
-                answer = ?,
-                answered_at = ?
-            WHERE question = ?
-            AND answered = FALSE
-        """, (answer, now, question))
-        
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as cursor:
+            now = datetime.now().isoformat()
+            cursor.execute("""
+                UPDATE asked_questions
+                SET answered = TRUE,
+                    answer = ?,
+                    answered_at = ?
+                WHERE question = ?
+                AND answered = FALSE
+            """, (answer, now, question))
+            answered = cursor.rowcount
+        
+        category = self._question_categories.get(question)
+        if answered and category:
+            with self._lock:
+                self._answered_counts[category] = self._answered_counts.get(category, 0) + answered
         
         logger.info(f"Recorded answer to question: {question[:50]}...")
     
     def get_learning_summary(self) -> Dict[str, Any]:
         """Get summary of learning progress"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Total questions asked
-        cursor.execute("SELECT COUNT(*) FROM asked_questions")
-        total_asked = cursor.fetchone()[0]
-        
-        # Questions answered
-        cursor.execute("SELECT COUNT(*) FROM asked_questions WHERE answered = TRUE")
-        total_answered = cursor.fetchone()[0]
-        
-        # By category
-        cursor.execute("""
-            SELECT category, COUNT(*) as total,
-                   SUM(CASE WHEN answered THEN 1 ELSE 0 END) as answered
-            FROM asked_questions
-            GROUP BY category
-        """)
-        categories = {
-            row[0]: {"asked": row[1], "answered": row[2]}
-            for row in cursor.fetchall()
-        }
-        
-        conn.close()
-        
+        with self.db.transaction() as cursor:
+            # Total questions asked
+            cursor.execute("SELECT COUNT(*) FROM asked_questions")
+            total_asked = cursor.fetchone()[0]
+            
+            # Questions answered
+            cursor.execute("SELECT COUNT(*) FROM asked_questions WHERE answered = TRUE")
+            total_answered = cursor.fetchone()[0]
+            
+            # By category
+            cursor.execute("""
+                SELECT category, COUNT(*) as total,
+                       SUM(CASE WHEN answered THEN 1 ELSE 0 END) as answered
+                FROM asked_questions
+                GROUP BY category
+            """)
+            categories = {
+                row[0]: {"asked": row[1], "answered": row[2]}
+                for row in cursor.fetchall()
+            }
+        
+        self._refresh()
         return {
             "total_asked": total_asked,
             "total_answered": total_answered,
             "answer_rate": (total_answered / total_asked * 100) if total_asked > 0 else 0,
-            "categories": categories
+            "categories": categories,
+            "asked_today": self.questions_asked_today(),
+            "max_per_day": self.questions_per_session
         }
     
-    def toggle_questions(self, enabled: bool):
-        """Enable or disable proactive questions"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE learning_settings
-            SET value = ?
-            WHERE key = 'questions_enabled'
-        """, ('true' if enabled else 'false',))
-        
-        conn.commit()
-        conn.close()
+    def toggle_questions(self, enabled: Optional[bool]) -> bool:
+        """
+        Enable or disable proactive questions
+        
+        Args:
+            enabled: New state, or None to leave it unchanged
+        
+        Returns:
+            Whether questions are enabled
+        """
+        if enabled is None:
+            self._refresh()
+            return self.questions_enabled
+        
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                UPDATE learning_settings
+                SET value = ?
+                WHERE key = 'questions_enabled'
+            """, ('true' if enabled else 'false',))
+        self.questions_enabled = enabled
         
         logger.info(f"Proactive questions {'enabled' if enabled else 'disabled'}")
+        return enabled
     
     def set_questions_per_session(self, count: int):
         """Set maximum questions per session"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE learning_settings
-            SET value = ?
-            WHERE key = 'questions_per_session'
-        """, (str(count),))
-        
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                UPDATE learning_settings
+                SET value = ?
+                WHERE key = 'questions_per_session'
+            """, (str(count),))
+        self.questions_per_session = count
         
         logger.info(f"Questions per session set to {count}")
     
     def get_recent_questions(self, limit: int = 10) -> list:
         """Get recently asked questions"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT question, category, asked_at, answered, answer
-            FROM asked_questions
-            ORDER BY asked_at DESC
-            LIMIT ?
-        """, (limit,))
-        
-        questions = []
-        for row in cursor.fetchall():
-            questions.append({
-                "question": row[0],
-                "category": row[1],
-                "asked_at": row[2],
-                "answered": bool(row[3]),
-                "answer": row[4]
-            })
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                SELECT question, category, asked_at, answered, answer
+                FROM asked_questions
+                ORDER BY asked_at DESC
+                LIMIT ?
+            """, (limit,))
+            
+            questions = []
+            for row in cursor.fetchall():
+                questions.append({
+                    "question": row[0],
+                    "category": row[1],
+                    "asked_at": row[2],
+                    "answered": bool(row[3]),
+                    "answer": row[4]
+                })
         
-        conn.close()
         return questions
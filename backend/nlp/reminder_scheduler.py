@@ -0,0 +1,506 @@
+"""
+Reminder Scheduler
+Fires due reminders from a time-ordered heap instead of polling the table
+"""
+
+import asyncio
+import calendar
+import heapq
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.logger import setup_logger
+from nlp.reminder_system import ReminderSystem, DEFAULT_DUE_TIME
+
+logger = setup_logger("ReminderScheduler")
+
+# Seconds between checks for reminders changed by other worker processes
+RESYNC_INTERVAL = 30.0
+
+# Seconds between checks for reminders published by the scheduling worker
+RELAY_INTERVAL = 1.0
+
+# Delivered outbox entries are kept this long (seconds)
+OUTBOX_RETENTION = 7 * 24 * 3600
+
+
+def next_occurrence(due_date: str, due_time: Optional[str], recurring: str,
+                    after: datetime) -> Optional[str]:
+    """
+    Next due date of a repeating reminder that falls after a given time
+
+    Args:
+        due_date: Current due date (YYYY-MM-DD)
+        due_time: Due time (HH:MM) or None for the default time
+        recurring: "daily", "weekly" or "monthly"
+        after: Occurrences up to this time are skipped (e.g. missed while offline)
+
+    Returns:
+        Next due date, or None for an unknown recurrence
+    """
+    current = datetime.strptime(f"{due_date} {due_time or DEFAULT_DUE_TIME}", "%Y-%m-%d %H:%M")
+
+    if recurring in ("daily", "weekly"):
+        step = timedelta(days=1 if recurring == "daily" else 7)
+        current += step
+        if current <= after:
+            # Jump over missed occurrences in one step
+            current += ((after - current) // step + 1) * step
+        return current.strftime("%Y-%m-%d")
+
+    if recurring == "monthly":
+        day = current.day
+        year, month = current.year, current.month
+        while True:
+            month += 1
+            if month > 12:
+                year, month = year + 1, 1
+            # Clamp to the end of shorter months, keeping the original day
+            candidate = current.replace(year=year, month=month, day=min(day, calendar.monthrange(year, month)[1]))
+            if candidate > after:
+                return candidate.strftime("%Y-%m-%d")
+
+    return None
+
+
+def record_delivery(reminder_system: ReminderSystem, reminder: Dict[str, Any]):
+    """Record a delivered reminder: move a repeating one to its next occurrence, else mark it notified"""
+    if reminder.get("recurring"):
+        next_date = next_occurrence(
+            reminder["due_date"], reminder["due_time"], reminder["recurring"], datetime.now()
+        )
+        if next_date:
+            # The "rescheduled" event puts the next occurrence on the heap
+            reminder_system.reschedule_reminder(reminder, next_date, reminder["due_time"])
+            return
+
+    reminder_system.mark_reminder_notified(reminder["id"])
+    logger.info(f"Reminder {reminder['id']} delivered: {reminder['title']}")
+
+
+class ReminderScheduler:
+    """
+    Push reminders to clients when they come due
+
+    Pending reminders sit in a min-heap keyed by due timestamp; the scheduler
+    sleeps until the earliest one. Creating, completing or deleting a reminder
+    updates the heap in O(log n) (replaced entries are skipped when popped).
+    Repeating reminders only ever have their next occurrence scheduled.
+
+    A reminder counts as delivered only once a client has received it; one
+    that comes due while nobody is connected stays pending (it isn't marked
+    notified) and is sent when a client connects.
+
+    With several workers, only one runs the scheduler, with record=False:
+    notify hands due reminders to a ReminderOutbox and the ReminderRelay of
+    whichever worker reaches a client records the delivery.
+    """
+
+    def __init__(self, reminder_system: ReminderSystem,
+                 notify: Callable[[Dict[str, Any]], Awaitable[int]],
+                 resync_interval: Optional[float] = None, record: bool = True):
+        """
+        Args:
+            reminder_system: Where reminders are stored
+            notify: Coroutine called with each reminder as it comes due,
+                returning how many clients received it
+            resync_interval: Seconds between checks for changes made by other
+                processes (multi-worker mode); None when this process is alone
+            record: Record deliveries here; False when notify only hands
+                reminders on and the receiver records them
+        """
+        self.reminder_system = reminder_system
+        self.notify = notify
+        self.resync_interval = resync_interval
+        self.record = record
+
+        # (due timestamp, version, reminder id); stale versions are skipped
+        self._heap: List[Tuple[int, int, int]] = []
+        # reminder id -> (version, reminder) for the live heap entry
+        self._entries: Dict[int, Tuple[int, Dict[str, Any]]] = {}
+        self._version = 0
+        # reminder id -> reminder that came due with no client to receive it
+        self._waiting: Dict[int, Dict[str, Any]] = {}
+        self._retry_waiting = False
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def waiting(self) -> int:
+        """Number of due reminders not delivered to any client yet"""
+        return len(self._waiting)
+
+    def start(self):
+        """Load pending reminders and start firing them on the running event loop"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self.reminder_system.add_listener(self._on_change)
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """Stop the scheduler"""
+        self.reminder_system.remove_listener(self._on_change)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def client_connected(self):
+        """Send reminders that came due while no client was connected (event loop thread only)"""
+        if self._waiting and self._wake is not None:
+            self._retry_waiting = True
+            self._wake.set()
+
+    def schedule(self, reminder: Dict[str, Any]):
+        """Add or move a reminder (event loop thread only)"""
+        self._waiting.pop(reminder["id"], None)
+        due = reminder.get("due_at")
+        if due is None:
+            self.unschedule(reminder["id"])
+            return
+
+        self._version += 1
+        self._entries[reminder["id"]] = (self._version, reminder)
+        heapq.heappush(self._heap, (due, self._version, reminder["id"]))
+
+        # Far-future entries that keep moving leave stale copies behind
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._rebuild()
+        self._wake.set()
+
+    def unschedule(self, reminder_id: int):
+        """Drop a reminder (event loop thread only); its heap entry goes stale"""
+        self._entries.pop(reminder_id, None)
+        self._waiting.pop(reminder_id, None)
+
+    def _on_change(self, event: str, reminder_id: int, reminder: Optional[Dict[str, Any]]):
+        """ReminderSystem listener; may run on any thread"""
+        if event in ("created", "rescheduled"):
+            self._loop.call_soon_threadsafe(self.schedule, reminder)
+        else:
+            self._loop.call_soon_threadsafe(self.unschedule, reminder_id)
+
+    async def _load(self):
+        """Replace the heap with the pending reminders in the database"""
+        loaded_from = self._version
+        reminders = await self._loop.run_in_executor(None, self.reminder_system.get_schedulable_reminders)
+
+        # Changes that arrived while reading may be newer than what was read
+        newer = {rid: entry for rid, entry in self._entries.items() if entry[0] > loaded_from}
+
+        self._entries.clear()
+        waiting = {}
+        for reminder in reminders:
+            if reminder["id"] in newer:
+                continue
+            if reminder["id"] in self._waiting:
+                # Already due, just not delivered yet
+                waiting[reminder["id"]] = reminder
+                continue
+            self._version += 1
+            self._entries[reminder["id"]] = (self._version, reminder)
+        self._entries.update(newer)
+        # Waiting reminders delivered or removed elsewhere are dropped
+        self._waiting = waiting
+        self._rebuild()
+
+        logger.info(f"Reminder scheduler loaded {len(self._entries)} pending reminders")
+
+    def _rebuild(self):
+        """Rebuild the heap from the live entries only"""
+        self._heap = []
+        for reminder_id, (version, reminder) in list(self._entries.items()):
+            due = reminder.get("due_at")
+            if due is None:
+                del self._entries[reminder_id]
+                continue
+            self._heap.append((due, version, reminder_id))
+        heapq.heapify(self._heap)
+
+    def _peek(self) -> Optional[int]:
+        """Timestamp of the next live entry, discarding stale ones"""
+        while self._heap:
+            due, version, reminder_id = self._heap[0]
+            entry = self._entries.get(reminder_id)
+            if entry and entry[0] == version:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    async def _run(self):
+        """Sleep until the next reminder is due (or the heap changes), then fire"""
+        await self._load()
+        next_resync = time.monotonic() + self.resync_interval if self.resync_interval else None
+
+        while True:
+            self._wake.clear()
+            due = self._peek()
+
+            timeout = None if due is None else max(0.0, due - time.time())
+            if next_resync is not None:
+                until_resync = max(0.0, next_resync - time.monotonic())
+                timeout = until_resync if timeout is None else min(timeout, until_resync)
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            await self._fire_due()
+            if self._retry_waiting:
+                self._retry_waiting = False
+                await self._deliver_waiting()
+
+            if next_resync is not None and time.monotonic() >= next_resync:
+                next_resync = time.monotonic() + self.resync_interval
+                if self.reminder_system.db.changed_elsewhere():
+                    await self._load()
+
+    async def _fire_due(self):
+        """Deliver every reminder whose time has come"""
+        now = time.time()
+        while True:
+            due = self._peek()
+            if due is None or due > now:
+                return
+
+            _, version, reminder_id = heapq.heappop(self._heap)
+            _, reminder = self._entries.pop(reminder_id)
+
+            if await self._deliver(reminder):
+                await self._record_delivery(reminder)
+            else:
+                self._waiting[reminder_id] = reminder
+                logger.info(f"Reminder {reminder_id} is due but no client is connected; holding it")
+
+    async def _deliver_waiting(self):
+        """Retry reminders that came due while no client was connected"""
+        for reminder_id, reminder in list(self._waiting.items()):
+            # Completed, deleted or rescheduled while the notification was being sent
+            if self._waiting.get(reminder_id) is not reminder:
+                continue
+            if not await self._deliver(reminder):
+                return
+            if self._waiting.get(reminder_id) is reminder:
+                del self._waiting[reminder_id]
+                await self._record_delivery(reminder)
+
+    async def _deliver(self, reminder: Dict[str, Any]) -> bool:
+        """Send a reminder to the connected clients; whether any received it"""
+        try:
+            return await self.notify(reminder) > 0
+        except Exception as e:
+            logger.error(f"Reminder notification error: {e}")
+            return False
+
+    async def _record_delivery(self, reminder: Dict[str, Any]):
+        """Mark a delivered reminder notified, or move a repeating one on"""
+        if not self.record:
+            return
+        try:
+            await self._loop.run_in_executor(None, record_delivery, self.reminder_system, reminder)
+        except Exception as e:
+            logger.error(f"Error updating fired reminder {reminder['id']}: {e}")
+
+
+class ReminderOutbox:
+    """
+    Due reminders passed from the scheduling worker to every worker
+
+    Each entry is one occurrence of a reminder (publishing it twice is a
+    no-op) and is claimed by the first worker that delivers it to a client.
+    Undelivered entries whose reminder was completed, deleted or moved
+    meanwhile are skipped when read.
+    """
+
+    def __init__(self, reminder_system: ReminderSystem):
+        self.reminder_system = reminder_system
+        self.db = reminder_system.db
+
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS reminder_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    reminder_id INTEGER NOT NULL,
+                    due_at INTEGER NOT NULL,
+                    reminder TEXT NOT NULL,
+                    published_at REAL NOT NULL,
+                    delivered_at REAL,
+                    UNIQUE (reminder_id, due_at)
+                )
+            """)
+
+    def publish(self, reminder: Dict[str, Any]):
+        """Add a due reminder, dropping delivered entries past the retention period"""
+        now = time.time()
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                INSERT OR IGNORE INTO reminder_outbox (reminder_id, due_at, reminder, published_at)
+                VALUES (?, ?, ?, ?)
+            """, (reminder["id"], reminder["due_at"], json.dumps(reminder), now))
+            cursor.execute("DELETE FROM reminder_outbox WHERE delivered_at < ?", (now - OUTBOX_RETENTION,))
+
+    def last_id(self) -> int:
+        """Id of the newest entry (0 if there are none)"""
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM reminder_outbox")
+            return cursor.fetchone()[0]
+
+    def entries(self, after_id: int = 0, undelivered: bool = False) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Entries that were delivered or are still due, oldest first
+
+        Args:
+            after_id: Only entries newer than this id
+            undelivered: Only entries no worker has delivered yet
+
+        Returns:
+            List of (entry id, reminder)
+        """
+        still_due = "r.status = 'pending' AND r.notified_at IS NULL AND r.due_at = o.due_at"
+        # Delivered entries still go to other workers' clients, whatever happened since
+        condition = f"o.delivered_at IS NULL AND {still_due}" if undelivered else f"(o.delivered_at IS NOT NULL OR ({still_due}))"
+        with self.db.transaction() as cursor:
+            cursor.execute(f"""
+                SELECT o.id, o.reminder FROM reminder_outbox o
+                LEFT JOIN reminders r ON r.id = o.reminder_id
+                WHERE o.id > ? AND {condition}
+                ORDER BY o.id
+            """, (after_id,))
+            return [(entry_id, json.loads(reminder)) for entry_id, reminder in cursor.fetchall()]
+
+    def claim(self, entry_id: int) -> bool:
+        """Mark an entry delivered; True only for the first worker to do so"""
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                UPDATE reminder_outbox SET delivered_at = ?
+                WHERE id = ? AND delivered_at IS NULL
+            """, (time.time(), entry_id))
+            return cursor.rowcount == 1
+
+
+class ReminderRelay:
+    """
+    Push reminders from the outbox to this worker's clients
+
+    Runs in every worker. New entries are broadcast as they appear; the
+    worker that first reaches a client claims the entry and records the
+    delivery. Entries nobody received are retried when a client connects.
+    """
+
+    def __init__(self, outbox: ReminderOutbox,
+                 notify: Callable[[Dict[str, Any]], Awaitable[int]],
+                 poll_interval: float = RELAY_INTERVAL):
+        """
+        Args:
+            outbox: Where the scheduling worker publishes due reminders
+            notify: Coroutine sending a reminder to this worker's clients,
+                returning how many received it
+            poll_interval: Seconds between checks for new entries
+        """
+        self.outbox = outbox
+        self.notify = notify
+        self.poll_interval = poll_interval
+
+        self._last_id = 0
+        self._retry_undelivered = False
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start relaying on the running event loop"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """Stop relaying"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Check for new entries now (event loop thread only)"""
+        if self._wake is not None:
+            self._wake.set()
+
+    def client_connected(self):
+        """Send entries no client has received yet (event loop thread only)"""
+        self._retry_undelivered = True
+        self.wake()
+
+    async def _run(self):
+        """Wait for new entries (or a connecting client) and deliver them"""
+        # Older entries are only retried for a connecting client
+        self._last_id = await self._loop.run_in_executor(None, self.outbox.last_id)
+
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            try:
+                await self._relay()
+            except Exception as e:
+                logger.error(f"Reminder relay error: {e}")
+
+    async def _relay(self):
+        """Deliver new entries, then undelivered ones if a client connected"""
+        retry, self._retry_undelivered = self._retry_undelivered, False
+        entries = await self._loop.run_in_executor(None, self._pending, self._last_id, retry)
+
+        for entry_id, reminder in entries:
+            self._last_id = max(self._last_id, entry_id)
+            try:
+                delivered = await self.notify(reminder) > 0
+            except Exception as e:
+                logger.error(f"Reminder notification error: {e}")
+                delivered = False
+            if delivered:
+                await self._loop.run_in_executor(None, self._claim, entry_id, reminder)
+
+    def _pending(self, last_id: int, retry: bool) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Entries to deliver, oldest first
+
+        Args:
+            last_id: Newest entry already relayed
+            retry: Also include older entries no worker has delivered yet
+
+        Returns:
+            List of (entry id, reminder)
+        """
+        # New entries go out even if another worker claimed them meanwhile
+        entries = self.outbox.entries(last_id)
+        if retry:
+            older = [(entry_id, reminder) for entry_id, reminder in self.outbox.entries(undelivered=True)
+                     if entry_id <= last_id]
+            entries = older + entries
+        return entries
+
+    def _claim(self, entry_id: int, reminder: Dict[str, Any]):
+        """Record the delivery unless another worker already has"""
+        if self.outbox.claim(entry_id):
+            record_delivery(self.outbox.reminder_system, reminder)
@@ -4,298 +4,965 @@ Helps users create, manage, and track reminders and tasks
 """
 
 import json
-import sqlite3
+import base64
+import math
+import threading
+import time
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterator, Callable
 from datetime import datetime, timedelta
 import re
 
 from core.logger import setup_logger
+from core.database import get_database, fts_index_statements, fts_match_query
 
 logger = setup_logger("ReminderSystem")
 
+# Listing order: priority, then due date (undated last), then id. The same
+# expressions are indexed, so keyset pages seek straight to their cursor.
+PRIORITY_RANK_SQL = "(CASE priority WHEN 'high' THEN 1 WHEN 'medium' THEN 2 WHEN 'low' THEN 3 ELSE 4 END)"
+DUE_KEY_SQL = "COALESCE(due_date, '9999-12-31')"
+PRIORITY_RANKS = {"high": 1, "medium": 2, "low": 3}
+NO_DUE_DATE = "9999-12-31"
+
+# Time of day a reminder with a date but no time goes off
+DEFAULT_DUE_TIME = "09:00"
+
+# Todos are due by the end of their due date
+TODO_DUE_TIME = "23:59"
+
+# Recurrence keywords accepted when parsing reminders
+RECURRENCE_PATTERNS = {
+    "daily": r"\b(every ?day|daily)\b",
+    "weekly": r"\b(every ?week|weekly)\b",
+    "monthly": r"\b(every ?month|monthly)\b",
+}
+
+# Items per page for paginated and streamed listings
+LIST_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Most task IDs a single bulk operation may name
+MAX_BULK_IDS = 1000
+
+# Seconds cached task stats stay valid without writes (overdue counts
+# change with the clock, not just with writes)
+STATS_CACHE_TTL = 60.0
+
+# Schema changes applied after the base tables exist (see Database.migrate).
+# Append new migrations; never edit released ones.
+SCHEMA_MIGRATIONS = [
+    # 1: indexes for tag lookups and the status-filtered listings
+    [
+        "CREATE INDEX IF NOT EXISTS idx_tags_todo_id ON tags(todo_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags(tag)",
+        "CREATE INDEX IF NOT EXISTS idx_todos_status ON todos(status, priority, due_date)",
+        "CREATE INDEX IF NOT EXISTS idx_reminders_status ON reminders(status, due_date)",
+    ],
+    # 2: listing order, for keyset pagination
+    [
+        f"CREATE INDEX IF NOT EXISTS idx_todos_listing ON todos(status, {PRIORITY_RANK_SQL}, {DUE_KEY_SQL}, id)",
+        f"CREATE INDEX IF NOT EXISTS idx_reminders_listing ON reminders(status, {PRIORITY_RANK_SQL}, {DUE_KEY_SQL}, id)",
+    ],
+    # 3: when a reminder's current occurrence was delivered
+    [
+        "ALTER TABLE reminders ADD COLUMN notified_at TIMESTAMP",
+    ],
+    # 4: due date and time as one indexed Unix timestamp, for time-range queries
+    # ('utc' reads the stored local time and converts it, like compute_due_at)
+    [
+        "ALTER TABLE reminders ADD COLUMN due_at INTEGER",
+        "ALTER TABLE todos ADD COLUMN due_at INTEGER",
+        f"""UPDATE reminders SET due_at = CAST(strftime('%s', due_date || ' ' ||
+            COALESCE(due_time, '{DEFAULT_DUE_TIME}'), 'utc') AS INTEGER)
+            WHERE due_date IS NOT NULL""",
+        f"""UPDATE todos SET due_at = CAST(strftime('%s', due_date || ' {TODO_DUE_TIME}', 'utc') AS INTEGER)
+            WHERE due_date IS NOT NULL""",
+        "CREATE INDEX IF NOT EXISTS idx_reminders_due_at ON reminders(status, due_at)",
+        "CREATE INDEX IF NOT EXISTS idx_todos_due_at ON todos(status, due_at)",
+    ],
+    # 5: full-text indexes for search
+    fts_index_statements("reminders", ["title"]) + fts_index_statements("todos", ["title", "description"]),
+]
+
+# Words of context around each match in search snippets
+SNIPPET_WORDS = 12
+
+# Columns read for reminder and todo rows (see _reminder_from_row/_todo_from_row).
+# Todo tags come back with each row as a JSON array (one query, no N+1).
+REMINDER_SELECT = """
+    SELECT id, title, description, due_date, due_time, priority, status, created_at, due_at
+    FROM reminders
+"""
+TODO_SELECT = """
+    SELECT id, title, description, priority, status, category, due_date, created_at,
+        (SELECT json_group_array(tag)
+         FROM (SELECT tag FROM tags WHERE todo_id = todos.id ORDER BY id)) AS tags,
+        due_at
+    FROM todos
+"""
+
+
+def compute_due_at(due_date: Optional[str], due_time: Optional[str] = None,
+                   default_time: str = DEFAULT_DUE_TIME) -> Optional[int]:
+    """
+    Convert a due date and time (local) to a Unix timestamp
+    
+    Args:
+        due_date: Due date (YYYY-MM-DD) or None
+        due_time: Due time (HH:MM) or None for default_time
+        default_time: Time of day used when there is no due time
+    
+    Returns:
+        Timestamp, or None if there is no usable due date
+    """
+    if not due_date:
+        return None
+    try:
+        due = datetime.strptime(f"{due_date} {due_time or default_time}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+    return int(due.timestamp())
+
+
+def encode_cursor(item: Dict[str, Any]) -> str:
+    """
+    Build the cursor that continues a listing after this item
+    
+    Args:
+        item: Last reminder or todo of a page
+    
+    Returns:
+        Opaque URL-safe cursor string
+    """
+    due_key = item["due_date"] if item["due_date"] is not None else NO_DUE_DATE
+    key = [PRIORITY_RANKS.get(item["priority"], 4), due_key, item["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Parse a cursor from encode_cursor()
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        rank, due_key, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    
+    if not (isinstance(rank, int) and isinstance(due_key, str) and isinstance(item_id, int)):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return rank, due_key, item_id
+
+
+def parse_task_ids(text: str) -> List[int]:
+    """
+    Extract task IDs from text like "complete todos 3, 5, 8-12"
+    
+    Ranges may be written "8-12", "8 to 12" or "8 through 12".
+    
+    Returns:
+        IDs in the order written, without duplicates
+    
+    Raises:
+        ValueError: If the IDs add up to more than MAX_BULK_IDS
+    """
+    ids: Dict[int, None] = {}
+    for match in re.finditer(r'(\d+)(?:\s*(?:-|to|through)\s*(\d+))?', text):
+        first = int(match.group(1))
+        last = int(match.group(2)) if match.group(2) else first
+        if first > last:
+            first, last = last, first
+        if last - first + len(ids) >= MAX_BULK_IDS:
+            raise ValueError(f"Too many task IDs (at most {MAX_BULK_IDS} at once)")
+        ids.update(dict.fromkeys(range(first, last + 1)))
+    return list(ids)
+
 
 class ReminderSystem:
     """Manage reminders and todo lists"""
     
     def __init__(self, db_path: Path):
         self.db_path = db_path
+        self.db = get_database(db_path)
         self._init_database()
+        
+        # Cached get_stats() result: (generation, computed at, stats)
+        self._stats_cache: Optional[tuple] = None
+        self._stats_generation = 0
+        self._stats_lock = threading.Lock()
+        
+        # Callbacks told about reminder changes: callback(event, reminder_id, reminder)
+        self._listeners: List[Callable[[str, int, Optional[Dict[str, Any]]], None]] = []
     
     def _init_database(self):
         """Initialize database for reminders and todos"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Reminders table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS reminders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT,
-                due_date TEXT,
-                due_time TEXT,
-                priority TEXT DEFAULT 'medium',
-                status TEXT DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                completed_at TIMESTAMP,
-                recurring TEXT
-            )
-        """)
-        
-        # Todos table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS todos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT,
-                priority TEXT DEFAULT 'medium',
-                status TEXT DEFAULT 'pending',
-                category TEXT,
-                due_date TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                completed_at TIMESTAMP
-            )
-        """)
-        
-        # Tags table for categorization
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS tags (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                todo_id INTEGER,
-                tag TEXT,
-                FOREIGN KEY (todo_id) REFERENCES todos(id)
-            )
-        """)
+        with self.db.transaction() as cursor:
+            # Reminders table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS reminders (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    description TEXT,
+                    due_date TEXT,
+                    due_time TEXT,
+                    priority TEXT DEFAULT 'medium',
+                    status TEXT DEFAULT 'pending',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    completed_at TIMESTAMP,
+                    recurring TEXT
+                )
+            """)
+            
+            # Todos table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS todos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    description TEXT,
+                    priority TEXT DEFAULT 'medium',
+                    status TEXT DEFAULT 'pending',
+                    category TEXT,
+                    due_date TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    completed_at TIMESTAMP
+                )
+            """)
+            
+            # Tags table for categorization
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS tags (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    todo_id INTEGER,
+                    tag TEXT,
+                    FOREIGN KEY (todo_id) REFERENCES todos(id)
+                )
+            """)
+        
+        self.db.migrate(SCHEMA_MIGRATIONS)
         
-        conn.commit()
-        conn.close()
         logger.info("Reminder system database initialized")
     
+    def add_listener(self, callback: Callable[[str, int, Optional[Dict[str, Any]]], None]):
+        """
+        Get told about reminder changes
+        
+        The callback runs on the thread that made the change, as
+        callback(event, reminder_id, reminder). Events are "created" and
+        "rescheduled" (with the reminder's schedule fields), "completed"
+        and "deleted" (with None).
+        """
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback: Callable[[str, int, Optional[Dict[str, Any]]], None]):
+        """Stop telling a callback about reminder changes"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _notify_listeners(self, event: str, reminder_id: int, reminder: Optional[Dict[str, Any]] = None):
+        """Tell listeners about a reminder change"""
+        for callback in list(self._listeners):
+            try:
+                callback(event, reminder_id, reminder)
+            except Exception as e:
+                logger.error(f"Reminder listener error: {e}")
+    
     def create_reminder(self, title: str, description: str = "", 
                        due_date: Optional[str] = None, due_time: Optional[str] = None,
-                       priority: str = "medium") -> int:
+                       priority: str = "medium", recurring: Optional[str] = None) -> int:
         """Create a new reminder"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO reminders (title, description, due_date, due_time, priority)
-            VALUES (?, ?, ?, ?, ?)
-        """, (title, description, due_date, due_time, priority))
-        
-        reminder_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        due_at = compute_due_at(due_date, due_time)
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO reminders (title, description, due_date, due_time, priority, recurring, due_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (title, description, due_date, due_time, priority, recurring, due_at))
+            
+            reminder_id = cursor.lastrowid
         
+        self._invalidate_stats()
+        self._notify_listeners("created", reminder_id, {
+            "id": reminder_id,
+            "title": title,
+            "description": description,
+            "due_date": due_date,
+            "due_time": due_time,
+            "priority": priority,
+            "recurring": recurring,
+            "due_at": due_at,
+        })
         logger.info(f"Created reminder: {title} (ID: {reminder_id})")
         return reminder_id
     
+    def get_schedulable_reminders(self) -> List[Dict[str, Any]]:
+        """Get pending, dated reminders whose current occurrence hasn't been delivered"""
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                SELECT id, title, description, due_date, due_time, priority, recurring, due_at
+                FROM reminders
+                WHERE status = 'pending' AND due_at IS NOT NULL AND notified_at IS NULL
+            """)
+            rows = cursor.fetchall()
+        
+        return [
+            {
+                "id": row[0],
+                "title": row[1],
+                "description": row[2],
+                "due_date": row[3],
+                "due_time": row[4],
+                "priority": row[5],
+                "recurring": row[6],
+                "due_at": row[7],
+            }
+            for row in rows
+        ]
+    
+    def mark_reminder_notified(self, reminder_id: int):
+        """Record that a reminder's current occurrence was delivered"""
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                UPDATE reminders SET notified_at = ?
+                WHERE id = ? AND notified_at IS NULL
+            """, (datetime.now(), reminder_id))
+    
+    def reschedule_reminder(self, reminder: Dict[str, Any], due_date: str, due_time: Optional[str]) -> bool:
+        """
+        Move a reminder to its next occurrence
+        
+        Only applies if the reminder is still at the occurrence in `reminder`,
+        so when several processes fire the same reminder only one moves it.
+        
+        Args:
+            reminder: Reminder as it was scheduled (id, due_date, due_time)
+            due_date: New due date (YYYY-MM-DD)
+            due_time: New due time (HH:MM) or None
+        
+        Returns:
+            True if this call moved the reminder
+        """
+        due_at = compute_due_at(due_date, due_time)
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                UPDATE reminders SET due_date = ?, due_time = ?, due_at = ?, notified_at = NULL
+                WHERE id = ? AND status = 'pending' AND due_date = ? AND due_time IS ?
+            """, (due_date, due_time, due_at, reminder["id"], reminder["due_date"], reminder["due_time"]))
+            moved = cursor.rowcount > 0
+        
+        if moved:
+            self._invalidate_stats()
+            self._notify_listeners("rescheduled", reminder["id"],
+                                   dict(reminder, due_date=due_date, due_time=due_time, due_at=due_at))
+        return moved
+    
     def create_todo(self, title: str, description: str = "",
                    priority: str = "medium", category: str = "",
                    due_date: Optional[str] = None, tags: List[str] = None) -> int:
         """Create a new todo item"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        due_at = compute_due_at(due_date, None, TODO_DUE_TIME)
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO todos (title, description, priority, category, due_date, due_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (title, description, priority, category, due_date, due_at))
+            
+            todo_id = cursor.lastrowid
+            
+            # Add tags if provided
+            if tags:
+                for tag in tags:
+                    cursor.execute("""
+                        INSERT INTO tags (todo_id, tag)
+                        VALUES (?, ?)
+                    """, (todo_id, tag.strip()))
         
-        cursor.execute("""
-            INSERT INTO todos (title, description, priority, category, due_date)
-            VALUES (?, ?, ?, ?, ?)
-        """, (title, description, priority, category, due_date))
+        self._invalidate_stats()
+        logger.info(f"Created todo: {title} (ID: {todo_id})")
+        return todo_id
+    
+    def get_reminders(self, status: str = "all", limit: Optional[int] = None,
+                      cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get reminders, optionally filtered by status
         
-        todo_id = cursor.lastrowid
+        Args:
+            status: "pending", "completed" or "all"
+            limit: Maximum number of reminders to return
+            cursor: Continue after the item this cursor was made from
         
-        # Add tags if provided
-        if tags:
-            for tag in tags:
-                cursor.execute("""
-                    INSERT INTO tags (todo_id, tag)
-                    VALUES (?, ?)
-                """, (todo_id, tag.strip()))
+        Returns:
+            Reminders in listing order
+        """
+        conditions: List[str] = []
+        params: List[Any] = []
         
-        conn.commit()
-        conn.close()
+        if status != "all":
+            conditions.append("status = ?")
+            params.append(status)
         
-        logger.info(f"Created todo: {title} (ID: {todo_id})")
-        return todo_id
-    
-    def get_reminders(self, status: str = "all") -> List[Dict[str, Any]]:
-        """Get reminders, optionally filtered by status"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        query, params = self._paginate(REMINDER_SELECT, "reminders", conditions, params, limit, cursor)
         
-        if status == "all":
-            cursor.execute("""
-                SELECT id, title, description, due_date, due_time, priority, status, created_at
-                FROM reminders
-                ORDER BY 
-                    CASE priority 
-                        WHEN 'high' THEN 1 
-                        WHEN 'medium' THEN 2 
-                        WHEN 'low' THEN 3 
-                    END,
-                    due_date ASC NULLS LAST
-            """)
-        else:
-            cursor.execute("""
-                SELECT id, title, description, due_date, due_time, priority, status, created_at
-                FROM reminders
-                WHERE status = ?
-                ORDER BY 
-                    CASE priority 
-                        WHEN 'high' THEN 1 
-                        WHEN 'medium' THEN 2 
-                        WHEN 'low' THEN 3 
-                    END,
-                    due_date ASC NULLS LAST
-            """, (status,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        reminders = []
-        for row in rows:
-            reminders.append({
-                "id": row[0],
-                "title": row[1],
-                "description": row[2],
-                "due_date": row[3],
-                "due_time": row[4],
-                "priority": row[5],
-                "status": row[6],
-                "created_at": row[7]
-            })
+        with self.db.transaction() as db_cursor:
+            db_cursor.execute(query, params)
+            rows = db_cursor.fetchall()
         
-        return reminders
+        return [self._reminder_from_row(row) for row in rows]
     
-    def get_todos(self, status: str = "all", category: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get todos, optionally filtered by status and category"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def get_todos(self, status: str = "all", category: Optional[str] = None,
+                  limit: Optional[int] = None, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get todos, optionally filtered by status and category
+        
+        Args:
+            status: "pending", "completed" or "all"
+            category: Only todos in this category
+            limit: Maximum number of todos to return
+            cursor: Continue after the item this cursor was made from
         
-        query = """
-            SELECT id, title, description, priority, status, category, due_date, created_at
-            FROM todos
-            WHERE 1=1
+        Returns:
+            Todos in listing order, each with its tags
         """
-        params = []
+        conditions: List[str] = []
+        params: List[Any] = []
         
         if status != "all":
-            query += " AND status = ?"
+            conditions.append("status = ?")
             params.append(status)
         
         if category:
-            query += " AND category = ?"
+            conditions.append("category = ?")
             params.append(category)
         
-        query += """
-            ORDER BY 
-                CASE priority 
-                    WHEN 'high' THEN 1 
-                    WHEN 'medium' THEN 2 
-                    WHEN 'low' THEN 3 
-                END,
-                due_date ASC NULLS LAST
-        """
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        
-        # Get tags for each todo
-        todos = []
-        for row in rows:
-            todo_id = row[0]
-            cursor.execute("SELECT tag FROM tags WHERE todo_id = ?", (todo_id,))
-            tags = [tag_row[0] for tag_row in cursor.fetchall()]
+        query, params = self._paginate(TODO_SELECT, "todos", conditions, params, limit, cursor)
+        
+        with self.db.transaction() as db_cursor:
+            db_cursor.execute(query, params)
+            rows = db_cursor.fetchall()
+        
+        return [self._todo_from_row(row) for row in rows]
+    
+    def _reminder_from_row(self, row: tuple) -> Dict[str, Any]:
+        """Build a reminder dict from a REMINDER_SELECT row"""
+        return {
+            "id": row[0],
+            "title": row[1],
+            "description": row[2],
+            "due_date": row[3],
+            "due_time": row[4],
+            "priority": row[5],
+            "status": row[6],
+            "created_at": row[7],
+            "due_at": row[8]
+        }
+    
+    def _todo_from_row(self, row: tuple) -> Dict[str, Any]:
+        """Build a todo dict from a TODO_SELECT row"""
+        return {
+            "id": row[0],
+            "title": row[1],
+            "description": row[2],
+            "priority": row[3],
+            "status": row[4],
+            "category": row[5],
+            "due_date": row[6],
+            "created_at": row[7],
+            "tags": json.loads(row[8]),
+            "due_at": row[9]
+        }
+    
+    def _paginate(self, select: str, table: str, conditions: List[str], params: List[Any],
+                  limit: Optional[int], cursor: Optional[str]) -> tuple:
+        """
+        Build a listing query: filters, keyset condition, listing order and limit
+        
+        SQLite can't seek an expression index with a row-value comparison
+        like (rank, due, id) > (?, ?, ?), so the keyset condition is split
+        into three ranges that each seek the listing index directly:
+        the rest of the cursor's (rank, due) group, the rest of its rank,
+        and the ranks after it. Their first `limit` ids are merged.
+        """
+        order = f"{PRIORITY_RANK_SQL}, {DUE_KEY_SQL}, id"
+        where = " AND ".join(conditions) or "1=1"
+        row_limit = limit if limit is not None else -1
+        
+        if not cursor:
+            return f"{select} WHERE {where} ORDER BY {order} LIMIT ?", params + [row_limit]
+        
+        rank, due_key, item_id = decode_cursor(cursor)
+        # (condition, its values, order within the range) - ordering only by
+        # the columns that aren't fixed lets SQLite read the index in order
+        ranges = [
+            (f"{PRIORITY_RANK_SQL} = ? AND {DUE_KEY_SQL} = ? AND id > ?", [rank, due_key, item_id], "id"),
+            (f"{PRIORITY_RANK_SQL} = ? AND {DUE_KEY_SQL} > ?", [rank, due_key], f"{DUE_KEY_SQL}, id"),
+            (f"{PRIORITY_RANK_SQL} > ?", [rank], order),
+        ]
+        
+        parts = []
+        key_params: List[Any] = []
+        for condition, values, range_order in ranges:
+            parts.append(f"""
+                SELECT * FROM (
+                    SELECT id, {PRIORITY_RANK_SQL} AS rank, {DUE_KEY_SQL} AS due_key
+                    FROM {table}
+                    WHERE {where} AND {condition}
+                    ORDER BY {range_order}
+                    LIMIT ?
+                )
+            """)
+            key_params += params + values + [row_limit]
+        
+        query = f"""
+            {select}
+            WHERE id IN (
+                SELECT id FROM ({" UNION ALL ".join(parts)})
+                ORDER BY rank, due_key, id
+                LIMIT ?
+            )
+            ORDER BY {order}
+        """
+        return query, key_params + [row_limit]
+    
+    def get_reminders_page(self, status: str = "pending", limit: int = LIST_PAGE_SIZE,
+                           cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of reminders
+        
+        Returns:
+            {"items": [...], "next_cursor": cursor for the next page, or None}
+        """
+        return self._page(self.get_reminders(status, limit + 1, cursor), limit)
+    
+    def get_todos_page(self, status: str = "pending", category: Optional[str] = None,
+                       limit: int = LIST_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of todos
+        
+        Returns:
+            {"items": [...], "next_cursor": cursor for the next page, or None}
+        """
+        return self._page(self.get_todos(status, category, limit + 1, cursor), limit)
+    
+    def iter_reminder_pages(self, status: str = "pending",
+                            page_size: int = LIST_PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Yield all reminders a page at a time (one query per page)"""
+        return self._iter_pages(lambda cursor: self.get_reminders_page(status, page_size, cursor))
+    
+    def iter_todo_pages(self, status: str = "pending",
+                        page_size: int = LIST_PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Yield all todos a page at a time (one query per page)"""
+        return self._iter_pages(lambda cursor: self.get_todos_page(status, None, page_size, cursor))
+    
+    def _page(self, items: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+        """Trim a limit + 1 fetch to a page and its next cursor"""
+        if len(items) > limit:
+            items = items[:limit]
+            return {"items": items, "next_cursor": encode_cursor(items[-1])}
+        return {"items": items, "next_cursor": None}
+    
+    def _iter_pages(self, fetch_page) -> Iterator[List[Dict[str, Any]]]:
+        """Follow next cursors until the listing is exhausted"""
+        cursor = None
+        while True:
+            page = fetch_page(cursor)
+            if page["items"]:
+                yield page["items"]
+            cursor = page["next_cursor"]
+            if not cursor:
+                return
+    
+    def get_due_between(self, kind: str = "reminders", after: Optional[float] = None,
+                        before: Optional[float] = None, status: str = "pending",
+                        limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get reminders or todos due in a time range, soonest first
+        
+        Runs as a seek on the (status, due_at) index. Items without a due
+        date are never included.
+        
+        Args:
+            kind: "reminders" or "todos"
+            after: Only items due at or after this Unix time
+            before: Only items due before this Unix time
+            status: "pending", "completed" or "all"
+            limit: Maximum number of items to return
+        
+        Returns:
+            Matching items ordered by due time
+        
+        Raises:
+            ValueError: If kind is unknown
+        """
+        if kind == "reminders":
+            select, from_row = REMINDER_SELECT, self._reminder_from_row
+        elif kind == "todos":
+            select, from_row = TODO_SELECT, self._todo_from_row
+        else:
+            raise ValueError(f"Unknown kind: {kind!r}")
+        
+        # Listing each status keeps the index's leading column fixed
+        statuses = ["pending", "completed"] if status == "all" else [status]
+        conditions = [f"status IN ({', '.join('?' * len(statuses))})"]
+        params: List[Any] = list(statuses)
+        
+        if after is not None:
+            conditions.append("due_at >= ?")
+            params.append(math.ceil(after))
+        else:
+            conditions.append("due_at IS NOT NULL")
+        if before is not None:
+            conditions.append("due_at < ?")
+            params.append(math.ceil(before))
+        
+        query = f"{select} WHERE {' AND '.join(conditions)} ORDER BY due_at, id LIMIT ?"
+        params.append(limit if limit is not None else -1)
+        
+        with self.db.transaction() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        
+        return [from_row(row) for row in rows]
+    
+    def get_due_before(self, before: float, kind: str = "reminders",
+                       limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get pending items due before a Unix time"""
+        return self.get_due_between(kind, None, before, limit=limit)
+    
+    def get_due_after(self, after: float, kind: str = "reminders",
+                      limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get pending items due at or after a Unix time"""
+        return self.get_due_between(kind, after, None, limit=limit)
+    
+    def get_overdue(self, kind: str = "reminders", limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get pending items whose due time has passed"""
+        return self.get_due_before(time.time(), kind, limit)
+    
+    def get_due_within(self, seconds: float, kind: str = "reminders",
+                       limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get pending items due in the next `seconds` (e.g. 3600 for the next hour)"""
+        now = time.time()
+        return self.get_due_between(kind, now, now + seconds, limit=limit)
+    
+    def search(self, query: str, kind: str = "todos", limit: int = 20,
+               offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Full-text search of reminder or todo text, best matches first
+        
+        Args:
+            query: Words to look for (all must appear)
+            kind: "reminders" (titles) or "todos" (titles and descriptions)
+            limit: Maximum number of results
+            offset: Number of results to skip (for paging)
+        
+        Returns:
+            Matching items, each with "source", a highlighted "snippet" and a
+            relevance "score" (higher is better)
+        
+        Raises:
+            ValueError: If kind is unknown
+        """
+        if kind == "reminders":
+            select, from_row = REMINDER_SELECT, self._reminder_from_row
+        elif kind == "todos":
+            select, from_row = TODO_SELECT, self._todo_from_row
+        else:
+            raise ValueError(f"Unknown kind: {kind!r}")
+        
+        match = fts_match_query(query)
+        if not match:
+            return []
+        
+        # Snippets are only built for this page's matches (see UserProfile.search_conversations)
+        with self.db.transaction() as cursor:
+            cursor.execute(f"""
+                WITH ranked AS (
+                    SELECT rowid AS id, rank
+                    FROM {kind}_fts
+                    WHERE {kind}_fts MATCH ?1
+                    ORDER BY rank, rowid DESC
+                    LIMIT ?2 OFFSET ?3
+                )
+                SELECT r.id, snippet({kind}_fts, -1, '**', '**', '…', {SNIPPET_WORDS}), r.rank
+                FROM ranked r
+                JOIN {kind}_fts f ON f.rowid = r.id
+                WHERE {kind}_fts MATCH ?1
+                ORDER BY r.rank, r.id DESC
+            """, (match, limit, offset))
+            hits = cursor.fetchall()
             
-            todos.append({
-                "id": todo_id,
-                "title": row[1],
-                "description": row[2],
-                "priority": row[3],
-                "status": row[4],
-                "category": row[5],
-                "due_date": row[6],
-                "created_at": row[7],
-                "tags": tags
-            })
+            if not hits:
+                return []
+            cursor.execute(
+                f"{select} WHERE id IN ({', '.join('?' * len(hits))})",
+                [hit[0] for hit in hits]
+            )
+            items = {item["id"]: item for item in map(from_row, cursor.fetchall())}
         
-        conn.close()
-        return todos
+        results = []
+        for item_id, snippet, rank in hits:
+            if item_id in items:
+                results.append(dict(items[item_id], source=kind, snippet=snippet, score=-rank))
+        return results
     
     def complete_reminder(self, reminder_id: int) -> bool:
         """Mark a reminder as completed"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        return bool(self.complete_reminders([reminder_id]))
+    
+    def complete_todo(self, todo_id: int) -> bool:
+        """Mark a todo as completed"""
+        return bool(self.complete_todos([todo_id]))
+    
+    def delete_reminder(self, reminder_id: int) -> bool:
+        """Delete a reminder"""
+        return bool(self.delete_reminders([reminder_id]))
+    
+    def delete_todo(self, todo_id: int) -> bool:
+        """Delete a todo"""
+        return bool(self.delete_todos([todo_id]))
+    
+    def complete_reminders(self, reminder_ids: List[int]) -> List[int]:
+        """
+        Mark several reminders as completed in one transaction
+        
+        Returns:
+            IDs that existed and were completed, in the order given
+        """
+        completed = self._bulk_update("reminders", reminder_ids, """
+            UPDATE reminders SET status = 'completed', completed_at = ? WHERE id = ?
+        """, (datetime.now(),))
         
-        cursor.execute("""
-            UPDATE reminders
-            SET status = 'completed', completed_at = ?
-            WHERE id = ?
-        """, (datetime.now(), reminder_id))
+        for reminder_id in completed:
+            self._notify_listeners("completed", reminder_id)
+        if completed:
+            logger.info(f"Completed reminder IDs: {completed}")
+        return completed
+    
+    def complete_todos(self, todo_ids: List[int]) -> List[int]:
+        """
+        Mark several todos as completed in one transaction
         
-        affected = cursor.rowcount
-        conn.commit()
-        conn.close()
+        Returns:
+            IDs that existed and were completed, in the order given
+        """
+        completed = self._bulk_update("todos", todo_ids, """
+            UPDATE todos SET status = 'completed', completed_at = ? WHERE id = ?
+        """, (datetime.now(),))
         
-        if affected > 0:
-            logger.info(f"Completed reminder ID: {reminder_id}")
-            return True
-        return False
+        if completed:
+            logger.info(f"Completed todo IDs: {completed}")
+        return completed
     
-    def complete_todo(self, todo_id: int) -> bool:
-        """Mark a todo as completed"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def delete_reminders(self, reminder_ids: List[int]) -> List[int]:
+        """
+        Delete several reminders in one transaction
         
-        cursor.execute("""
-            UPDATE todos
-            SET status = 'completed', completed_at = ?
-            WHERE id = ?
-        """, (datetime.now(), todo_id))
+        Returns:
+            IDs that existed and were deleted, in the order given
+        """
+        deleted = self._bulk_update("reminders", reminder_ids, "DELETE FROM reminders WHERE id = ?")
         
-        affected = cursor.rowcount
-        conn.commit()
-        conn.close()
+        for reminder_id in deleted:
+            self._notify_listeners("deleted", reminder_id)
+        if deleted:
+            logger.info(f"Deleted reminder IDs: {deleted}")
+        return deleted
+    
+    def delete_todos(self, todo_ids: List[int]) -> List[int]:
+        """
+        Delete several todos and their tags in one transaction
         
-        if affected > 0:
-            logger.info(f"Completed todo ID: {todo_id}")
-            return True
-        return False
+        Returns:
+            IDs that existed and were deleted, in the order given
+        """
+        deleted = self._bulk_update("todos", todo_ids, "DELETE FROM todos WHERE id = ?",
+                                    related=["DELETE FROM tags WHERE todo_id = ?"])
+        
+        if deleted:
+            logger.info(f"Deleted todo IDs: {deleted}")
+        return deleted
     
-    def delete_reminder(self, reminder_id: int) -> bool:
-        """Delete a reminder"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def complete_todos_where(self, tag: Optional[str] = None, category: Optional[str] = None) -> int:
+        """
+        Complete every pending todo with a tag and/or in a category
+        
+        Args:
+            tag: Only todos with this tag
+            category: Only todos in this category
+        
+        Returns:
+            Number of todos completed
+        
+        Raises:
+            ValueError: If neither tag nor category is given
+        """
+        conditions = ["status = 'pending'"]
+        params: List[Any] = [datetime.now()]
         
-        cursor.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
-        affected = cursor.rowcount
-        conn.commit()
-        conn.close()
+        if tag:
+            conditions.append("id IN (SELECT todo_id FROM tags WHERE tag = ?)")
+            params.append(tag)
+        if category:
+            conditions.append("category = ?")
+            params.append(category)
+        if len(conditions) == 1:
+            raise ValueError("A tag or category is required")
+        
+        with self.db.transaction() as cursor:
+            cursor.execute(f"""
+                UPDATE todos SET status = 'completed', completed_at = ?
+                WHERE {' AND '.join(conditions)}
+            """, params)
+            affected = cursor.rowcount
         
         if affected > 0:
-            logger.info(f"Deleted reminder ID: {reminder_id}")
-            return True
-        return False
+            self._invalidate_stats()
+            logger.info(f"Completed {affected} todos (tag={tag!r}, category={category!r})")
+        return affected
     
-    def delete_todo(self, todo_id: int) -> bool:
-        """Delete a todo"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _bulk_update(self, table: str, ids: List[int], sql: str, extra: tuple = (),
+                     related: Optional[List[str]] = None) -> List[int]:
+        """
+        Run a per-id UPDATE/DELETE for many ids in one transaction
         
-        # Delete associated tags
-        cursor.execute("DELETE FROM tags WHERE todo_id = ?", (todo_id,))
+        Args:
+            table: Table the ids belong to
+            ids: Row ids (duplicates are ignored)
+            sql: Statement whose last parameter is the id
+            extra: Parameters bound before the id
+            related: Statements run first for each id (e.g. deleting child rows)
         
-        # Delete todo
-        cursor.execute("DELETE FROM todos WHERE id = ?", (todo_id,))
-        affected = cursor.rowcount
-        conn.commit()
-        conn.close()
+        Returns:
+            IDs that existed, in the order given
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
         
-        if affected > 0:
-            logger.info(f"Deleted todo ID: {todo_id}")
-            return True
-        return False
+        with self.db.transaction(immediate=True) as cursor:
+            cursor.execute(
+                f"SELECT id FROM {table} WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(ids),)
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            found = [item_id for item_id in ids if item_id in existing]
+            
+            for statement in related or []:
+                cursor.executemany(statement, [(item_id,) for item_id in found])
+            cursor.executemany(sql, [extra + (item_id,) for item_id in found])
+        
+        if found:
+            self._invalidate_stats()
+        return found
+    
+    def import_reminders(self, reminders: List[Dict[str, Any]]) -> List[int]:
+        """
+        Create many reminders in one transaction
+        
+        Args:
+            reminders: Dicts with a title and optionally description,
+                due_date, due_time, priority and recurring
+        
+        Returns:
+            New reminder IDs, in the order given
+        """
+        rows = []
+        for reminder in reminders:
+            due_date, due_time = reminder.get("due_date"), reminder.get("due_time")
+            rows.append((
+                reminder["title"], reminder.get("description", ""), due_date, due_time,
+                reminder.get("priority", "medium"), reminder.get("recurring"),
+                compute_due_at(due_date, due_time),
+            ))
+        
+        reminder_ids = self._bulk_insert("reminders", """
+            INSERT INTO reminders (title, description, due_date, due_time, priority, recurring, due_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        
+        for reminder_id, row in zip(reminder_ids, rows):
+            self._notify_listeners("created", reminder_id, {
+                "id": reminder_id,
+                "title": row[0],
+                "description": row[1],
+                "due_date": row[2],
+                "due_time": row[3],
+                "priority": row[4],
+                "recurring": row[5],
+                "due_at": row[6],
+            })
+        logger.info(f"Imported {len(reminder_ids)} reminders")
+        return reminder_ids
+    
+    def import_todos(self, todos: List[Dict[str, Any]]) -> List[int]:
+        """
+        Create many todos (and their tags) in one transaction
+        
+        Args:
+            todos: Dicts with a title and optionally description, priority,
+                category, due_date and tags
+        
+        Returns:
+            New todo IDs, in the order given
+        """
+        rows = [
+            (
+                todo["title"], todo.get("description", ""), todo.get("priority", "medium"),
+                todo.get("category", ""), todo.get("due_date"),
+                compute_due_at(todo.get("due_date"), None, TODO_DUE_TIME),
+            )
+            for todo in todos
+        ]
+        tags = [todo.get("tags") or [] for todo in todos]
+        
+        todo_ids = self._bulk_insert("todos", """
+            INSERT INTO todos (title, description, priority, category, due_date, due_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows, child_sql="INSERT INTO tags (todo_id, tag) VALUES (?, ?)", children=tags)
+        
+        logger.info(f"Imported {len(todo_ids)} todos")
+        return todo_ids
+    
+    def _bulk_insert(self, table: str, sql: str, rows: List[tuple],
+                     child_sql: Optional[str] = None,
+                     children: Optional[List[List[str]]] = None) -> List[int]:
+        """
+        Insert many rows with one executemany and return their new ids
+        
+        The write lock is held from the start, so the ids above the previous
+        maximum are exactly the inserted rows, in order (AUTOINCREMENT ids
+        only grow).
+        
+        Args:
+            table: Table being inserted into
+            sql: INSERT statement for one row
+            rows: Parameters for each row
+            child_sql: INSERT for child rows, taking (parent id, value)
+            children: Child values for each row (e.g. tags)
+        
+        Returns:
+            New row ids
+        """
+        if not rows:
+            return []
+        
+        with self.db.transaction(immediate=True) as cursor:
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            previous_max = cursor.fetchone()[0]
+            
+            cursor.executemany(sql, rows)
+            cursor.execute(f"SELECT id FROM {table} WHERE id > ? ORDER BY id", (previous_max,))
+            new_ids = [row[0] for row in cursor.fetchall()]
+            
+            if child_sql and children:
+                cursor.executemany(child_sql, [
+                    (new_id, value.strip())
+                    for new_id, values in zip(new_ids, children)
+                    for value in values
+                ])
+        
+        self._invalidate_stats()
+        return new_ids
     
     def parse_reminder_from_text(self, text: str) -> Dict[str, Any]:
         """Parse reminder details from natural language"""
@@ -304,7 +971,9 @@ class ReminderSystem:
             "description": "",
             "due_date": None,
             "due_time": None,
-            "priority": "medium"
+            "priority": "medium",
+            "recurring": None,
+            "due_at": None
         }
         
         # Extract priority
@@ -313,6 +982,12 @@ class ReminderSystem:
         elif re.search(r'\b(low priority|not urgent)\b', text, re.IGNORECASE):
             result["priority"] = "low"
         
+        # Extract recurrence
+        for recurring, pattern in RECURRENCE_PATTERNS.items():
+            if re.search(pattern, text, re.IGNORECASE):
+                result["recurring"] = recurring
+                break
+        
         # Extract time patterns
         time_patterns = {
             "tomorrow": (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d"),
@@ -339,8 +1014,17 @@ class ReminderSystem:
             
             result["due_time"] = f"{hour:02d}:{minute}"
         
+        # Repeating reminders start with the next occurrence of their time
+        if result["recurring"] and not result["due_date"]:
+            start = datetime.now()
+            if (result["due_time"] or DEFAULT_DUE_TIME) <= start.strftime("%H:%M"):
+                start += timedelta(days=1)
+            result["due_date"] = start.strftime("%Y-%m-%d")
+        
+        result["due_at"] = compute_due_at(result["due_date"], result["due_time"])
+        
         # Extract title (after "remind me to" or similar)
-        title_match = re.search(r'remind me (?:to|about) (.+?)(?:\s+(?:tomorrow|today|at|on|next)|$)', text, re.IGNORECASE)
+        title_match = re.search(r'remind me (?:to|about) (.+?)(?:\s+(?:tomorrow|today|at|on|next|every)|$)', text, re.IGNORECASE)
         if title_match:
             result["title"] = title_match.group(1).strip()
         else:
@@ -392,12 +1076,12 @@ class ReminderSystem:
         
         return result
     
-    def format_reminders_list(self, reminders: List[Dict[str, Any]]) -> str:
-        """Format reminders for display"""
+    def format_reminders_list(self, reminders: List[Dict[str, Any]], header: bool = True) -> str:
+        """Format reminders for display (header=False for follow-up pages)"""
         if not reminders:
             return "You have no reminders. Create one by saying 'Remind me to...'"
         
-        output = "**Your Reminders:**\n\n"
+        output = "**Your Reminders:**\n\n" if header else ""
         
         for reminder in reminders:
             priority_emoji = {"high": "🔴", "medium": "🟡", "low": "🟢"}
@@ -419,12 +1103,12 @@ class ReminderSystem:
         
         return output
     
-    def format_todos_list(self, todos: List[Dict[str, Any]]) -> str:
-        """Format todos for display"""
+    def format_todos_list(self, todos: List[Dict[str, Any]], header: bool = True) -> str:
+        """Format todos for display (header=False for follow-up pages)"""
         if not todos:
             return "You have no todos. Create one by saying 'Add todo...'"
         
-        output = "**Your Todos:**\n\n"
+        output = "**Your Todos:**\n\n" if header else ""
         
         for todo in todos:
             priority_emoji = {"high": "🔴", "medium": "🟡", "low": "🟢"}
@@ -449,17 +1133,107 @@ class ReminderSystem:
         
         return output
     
+    def get_stats(self, breakdown: bool = False) -> Dict[str, Any]:
+        """
+        Count reminders and todos by status
+        
+        All counts come from one grouped query, cached until the next write
+        (here or in another process) or for STATS_CACHE_TTL seconds.
+        
+        Args:
+            breakdown: Also include counts by priority, by category (todos)
+                and the number of overdue pending items
+        
+        Returns:
+            {"reminders": {...}, "todos": {...}} with "pending" and
+            "completed" counts, plus "overdue", "by_priority" and
+            "by_category" when breakdown is set
+        """
+        stats = self._cached_stats()
+        if breakdown:
+            return stats
+        
+        return {
+            kind: {"pending": counts["pending"], "completed": counts["completed"]}
+            for kind, counts in stats.items()
+        }
+    
+    def _cached_stats(self) -> Dict[str, Any]:
+        """Full stats from the cache, recomputing them if stale"""
+        if self.db.changed_elsewhere():
+            self._invalidate_stats()
+        
+        with self._stats_lock:
+            generation = self._stats_generation
+            cached = self._stats_cache
+        if cached and cached[0] == generation and time.monotonic() - cached[1] < STATS_CACHE_TTL:
+            return cached[2]
+        
+        stats = self._compute_stats()
+        with self._stats_lock:
+            # Don't cache a result that a write has already made stale
+            if self._stats_generation == generation:
+                self._stats_cache = (generation, time.monotonic(), stats)
+        return stats
+    
+    def _compute_stats(self) -> Dict[str, Any]:
+        """Run the grouped count query"""
+        now = int(time.time())
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                SELECT 'reminders', status, priority, NULL,
+                    status = 'pending' AND due_at < ?,
+                    COUNT(*)
+                FROM reminders
+                GROUP BY 2, 3, 5
+                UNION ALL
+                SELECT 'todos', status, priority, COALESCE(category, ''),
+                    status = 'pending' AND due_at < ?,
+                    COUNT(*)
+                FROM todos
+                GROUP BY 2, 3, 4, 5
+            """, (now, now))
+            rows = cursor.fetchall()
+        
+        stats = {
+            kind: {"pending": 0, "completed": 0, "overdue": 0, "by_priority": {}, "by_category": {}}
+            for kind in ("reminders", "todos")
+        }
+        
+        for kind, status, priority, category, overdue, count in rows:
+            counts = stats[kind]
+            counts[status] = counts.get(status, 0) + count
+            if overdue:
+                counts["overdue"] += count
+            
+            by_priority = counts["by_priority"].setdefault(priority, {})
+            by_priority[status] = by_priority.get(status, 0) + count
+            
+            if category is not None:
+                by_category = counts["by_category"].setdefault(category, {})
+                by_category[status] = by_category.get(status, 0) + count
+        
+        del stats["reminders"]["by_category"]
+        return stats
+    
+    def _invalidate_stats(self):
+        """Drop cached stats after a write"""
+        with self._stats_lock:
+            self._stats_generation += 1
+            self._stats_cache = None
+    
     def get_summary(self) -> str:
         """Get a summary of all reminders and todos"""
-        pending_reminders = len(self.get_reminders("pending"))
-        completed_reminders = len(self.get_reminders("completed"))
-        pending_todos = len(self.get_todos("pending"))
-        completed_todos = len(self.get_todos("completed"))
+        stats = self.get_stats(breakdown=True)
+        reminders, todos = stats["reminders"], stats["todos"]
+        
+        reminder_overdue = f", {reminders['overdue']} overdue" if reminders["overdue"] else ""
+        todo_overdue = f", {todos['overdue']} overdue" if todos["overdue"] else ""
         
         summary = f"""**Task Summary:**
 
-⏰ Reminders: {pending_reminders} pending, {completed_reminders} completed
-☐ Todos: {pending_todos} pending, {completed_todos} completed
+⏰ Reminders: {reminders['pending']} pending, {reminders['completed']} completed{reminder_overdue}
+☐ Todos: {todos['pending']} pending, {todos['completed']} completed{todo_overdue}
 
 Type 'show reminders' or 'show todos' to see details."""
         
@@ -0,0 +1,134 @@
+"""
+History Search
+Ranked full-text search across conversations, reminders and todos
+"""
+
+import re
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from core.logger import setup_logger
+from user.profile import UserProfile
+from nlp.reminder_system import ReminderSystem
+
+logger = setup_logger("HistorySearch")
+
+SEARCH_SOURCES = ("conversations", "reminders", "todos")
+
+# Results per page of chat and API searches
+SEARCH_PAGE_SIZE = 10
+
+# What each scope word in a search request covers
+SCOPE_SOURCES = {
+    "history": SEARCH_SOURCES,
+    "everything": SEARCH_SOURCES,
+    "conversation": ("conversations",),
+    "conversations": ("conversations",),
+    "chat": ("conversations",),
+    "chats": ("conversations",),
+    "reminders": ("reminders",),
+    "todos": ("todos",),
+    "tasks": ("reminders", "todos"),
+}
+
+_SCOPES = "|".join(sorted(SCOPE_SOURCES, key=len, reverse=True))
+
+# "search my history for X", "find X in my todos", "what did I say about X"
+SEARCH_REQUEST_PATTERNS = [
+    re.compile(rf"(?:search|find|look up) (?:in |through )?(?:my |the )?(?P<scope>{_SCOPES}) for (?P<query>.+)"),
+    re.compile(rf"(?:search|find|look up) (?:for )?(?P<query>.+?) in (?:my |the )?(?P<scope>{_SCOPES})\W*$"),
+    re.compile(r"what did (?:i|we) (?:say|talk about|discuss|mention) about (?P<query>.+)"),
+]
+
+
+def parse_search_request(text: str) -> Optional[Tuple[str, Sequence[str]]]:
+    """
+    Pull the search words and sources out of a chat request
+
+    Args:
+        text: Lowercased user input
+
+    Returns:
+        (query, sources), or None if the text isn't a search request
+    """
+    for pattern in SEARCH_REQUEST_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            scope = match.groupdict().get("scope") or "conversations"
+            query = match.group("query").strip(" ?.!\"'")
+            return query, SCOPE_SOURCES[scope]
+    return None
+
+
+class HistorySearch:
+    """
+    Search the user's conversations and tasks together
+
+    Each source has its own FTS5 index; their BM25 rankings are merged by
+    score. Scores from different indexes are only roughly comparable, which
+    is fine for putting the best few matches of each near the top.
+    """
+
+    def __init__(self, profile: UserProfile, reminder_system: ReminderSystem):
+        self.profile = profile
+        self.reminder_system = reminder_system
+
+    def search(self, query: str, sources: Sequence[str] = SEARCH_SOURCES,
+               limit: int = SEARCH_PAGE_SIZE, offset: int = 0) -> Dict[str, Any]:
+        """
+        Get one page of ranked search results
+
+        Args:
+            query: Words to look for (all must appear)
+            sources: Any of "conversations", "reminders" and "todos"
+            limit: Results per page
+            offset: Results to skip (next_offset of the previous page)
+
+        Returns:
+            {"items": [...], "next_offset": offset of the next page, or None}
+            Each item has "source", "id", a highlighted "snippet" and a
+            relevance "score" (higher is better) plus its source's fields.
+
+        Raises:
+            ValueError: If a source is unknown
+        """
+        unknown = set(sources) - set(SEARCH_SOURCES)
+        if unknown:
+            raise ValueError(f"Unknown search source(s): {', '.join(sorted(unknown))}")
+
+        # The merged page can only contain each source's top offset + limit
+        # results; one more tells whether there is a next page
+        wanted = offset + limit + 1
+        results = []
+        for source in dict.fromkeys(sources):
+            if source == "conversations":
+                results += self.profile.search_conversations(query, wanted)
+            else:
+                results += self.reminder_system.search(query, source, wanted)
+
+        # Ties go to the newest item, as within each source, so pages never overlap
+        results.sort(key=lambda result: (-result["score"], result["source"], -result["id"]))
+        return {
+            "items": results[offset:offset + limit],
+            "next_offset": offset + limit if len(results) > offset + limit else None
+        }
+
+    def format_results(self, results: Sequence[Dict[str, Any]], start: int = 1) -> str:
+        """
+        Format search results for chat
+
+        Args:
+            results: Items from search()
+            start: Number of the first result (continues across pages)
+        """
+        lines = []
+        for number, result in enumerate(results, start):
+            source = result["source"]
+            if source == "conversations":
+                lines.append(f"{number}. 💬 {(result['timestamp'] or '')[:10]}: {result['snippet']}")
+            elif source == "reminders":
+                done = " (done)" if result["status"] == "completed" else ""
+                lines.append(f"{number}. ⏰ Reminder #{result['id']}{done}: {result['snippet']}")
+            else:
+                checkbox = "☑" if result["status"] == "completed" else "☐"
+                lines.append(f"{number}. {checkbox} Todo #{result['id']}: {result['snippet']}")
+        return "\n".join(lines)
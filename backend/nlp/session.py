@@ -0,0 +1,255 @@
+"""
+Conversation sessions - per-connection state for the command processor
+Each client gets its own lightweight state; patterns, handlers and knowledge
+stay shared in the CommandProcessor
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from core.logger import setup_logger
+from core.database import get_database
+
+logger = setup_logger("Sessions")
+
+# Session used when a caller doesn't identify itself
+DEFAULT_SESSION = "default"
+
+# Messages of conversation history kept per session: at least MAX_HISTORY.
+# Past MAX_HISTORY + HISTORY_TRIM, the oldest HISTORY_TRIM go at once, so
+# the history (and the model's prompt prefix) only changes at its start
+# every few turns and the session's cached prefix stays usable in between.
+# Even, so whole exchanges are dropped.
+MAX_HISTORY = 20
+HISTORY_TRIM = 10
+
+# Stored sessions are purged of expired rows once every this many saves
+PURGE_EVERY = 100
+
+
+class Session:
+    """Conversation state for a single client"""
+
+    __slots__ = (
+        "session_id", "conversation_history", "context", "last_intent",
+        "pending_question", "message_count", "last_active",
+    )
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.conversation_history: List[Dict[str, str]] = []
+        self.context: Dict[str, Any] = {}
+        self.last_intent: Optional[str] = None
+        self.pending_question: Optional[str] = None
+        self.message_count = 0
+        self.last_active = time.time()
+
+    def add_message(self, role: str, content: str):
+        """Append to the conversation history, dropping old messages a block at a time"""
+        self.conversation_history.append({"role": role, "content": content})
+        if len(self.conversation_history) > MAX_HISTORY + HISTORY_TRIM:
+            del self.conversation_history[:HISTORY_TRIM]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the session state"""
+        return {
+            "conversation_history": self.conversation_history,
+            "context": self.context,
+            "last_intent": self.last_intent,
+            "pending_question": self.pending_question,
+            "message_count": self.message_count,
+        }
+
+    @classmethod
+    def from_dict(cls, session_id: str, data: Dict[str, Any]) -> "Session":
+        """Rebuild a session from to_dict() output"""
+        session = cls(session_id)
+        session.conversation_history = data.get("conversation_history", [])
+        session.context = data.get("context", {})
+        session.last_intent = data.get("last_intent")
+        session.pending_question = data.get("pending_question")
+        session.message_count = data.get("message_count", 0)
+        return session
+
+
+class SessionStore:
+    """SQLite-backed session storage shared by all worker processes"""
+
+    def __init__(self, db_path: Path):
+        self.db = get_database(db_path)
+        self._saves = 0
+
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    last_active REAL NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions(last_active)")
+
+    def load(self, session_id: str) -> Optional[Session]:
+        """Load a stored session, or None if there isn't one"""
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT state FROM sessions WHERE session_id = ?", (session_id,))
+            row = cursor.fetchone()
+
+        if row:
+            return Session.from_dict(session_id, json.loads(row[0]))
+        return None
+
+    def save(self, session: Session, ttl: float):
+        """Store a session, occasionally purging ones idle longer than ttl"""
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                INSERT OR REPLACE INTO sessions (session_id, state, last_active)
+                VALUES (?, ?, ?)
+            """, (session.session_id, json.dumps(session.to_dict()), session.last_active))
+
+            self._saves += 1
+            if self._saves % PURGE_EVERY == 0:
+                cursor.execute("DELETE FROM sessions WHERE last_active < ?", (time.time() - ttl,))
+
+    def delete(self, session_id: str):
+        """Remove a stored session"""
+        with self.db.transaction() as cursor:
+            cursor.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def count(self) -> int:
+        """Number of stored sessions"""
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM sessions")
+            return cursor.fetchone()[0]
+
+
+class SessionManager:
+    """
+    Hands out sessions by id and evicts idle ones (LRU order with a TTL)
+    
+    With a store, sessions live in the shared database instead of this
+    process, so any worker can serve any session. A session attached to a
+    connection (which stays on one worker) is the exception: it's held here
+    until detached, so its messages don't each cost a database write.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 1800.0,
+                 store: Optional[SessionStore] = None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.store = store
+        # Least recently used first
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        # Store mode: sessions held for open connections, with their connection counts
+        self._attached: Dict[str, Session] = {}
+        self._connections: Dict[str, int] = {}
+        # Sessions are looked up from handler threads
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str = DEFAULT_SESSION) -> Session:
+        """Get a session, creating it if needed, and mark it as just used"""
+        if self.store:
+            with self._lock:
+                session = self._attached.get(session_id)
+            if session:
+                session.last_active = time.time()
+                return session
+
+            # Always read through: another worker may have updated it
+            session = self.store.load(session_id) or Session(session_id)
+            session.last_active = time.time()
+            return session
+
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id)
+                self._sessions[session_id] = session
+            else:
+                self._sessions.move_to_end(session_id)
+
+            session.last_active = time.time()
+            self._evict()
+            return session
+
+    def save(self, session: Session):
+        """Persist a session's changes (only needed with a store; attached sessions wait for detach)"""
+        if self.store and session.session_id not in self._attached:
+            self.store.save(session, self.ttl)
+
+    def attach(self, session_id: str) -> Session:
+        """
+        Hold a session in this process while a connection uses it
+
+        Args:
+            session_id: Session to load (or create)
+
+        Returns:
+            The session, also what get() returns until the last detach()
+        """
+        if not self.store:
+            return self.get(session_id)
+
+        with self._lock:
+            session = self._attached.get(session_id)
+        if session is None:
+            session = self.store.load(session_id) or Session(session_id)
+        with self._lock:
+            session = self._attached.setdefault(session_id, session)
+            self._connections[session_id] = self._connections.get(session_id, 0) + 1
+        session.last_active = time.time()
+        return session
+
+    def detach(self, session_id: str, keep: bool = True):
+        """
+        Release a session when its connection closes
+
+        Args:
+            session_id: Session passed to attach()
+            keep: Whether the session can be resumed later; if not it's dropped
+        """
+        if not keep:
+            self.end(session_id)
+            return
+        if not self.store:
+            return
+
+        with self._lock:
+            self._connections[session_id] -= 1
+            if self._connections[session_id] > 0:
+                return
+            del self._connections[session_id]
+            session = self._attached.pop(session_id)
+        self.store.save(session, self.ttl)
+
+    def end(self, session_id: str):
+        """Drop a session (e.g. when its connection closes)"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self._connections.get(session_id, 0) > 1:
+                # Still used by another connection
+                self._connections[session_id] -= 1
+                return
+            attached = self._attached.pop(session_id, None)
+            self._connections.pop(session_id, None)
+        if self.store and not attached:
+            self.store.delete(session_id)
+
+    def __len__(self) -> int:
+        if self.store:
+            return self.store.count()
+        return len(self._sessions)
+
+    def _evict(self):
+        """Drop sessions past the size limit or idle longer than the TTL (call with the lock held)"""
+        now = time.time()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - session.last_active < self.ttl:
+                break
+            del self._sessions[session_id]
+            logger.debug(f"Evicted session {session_id}")
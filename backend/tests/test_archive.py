@@ -0,0 +1,165 @@
+"""Test script for the conversation archive and history paging across it"""
+
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import user.archive as archive_module
+from core.database import close_all
+from user.archive import ConversationArchive
+from user.profile import UserProfile, TIMESTAMP_FORMAT
+
+# Small chunks, so a few dozen rows cross several chunk boundaries
+archive_module.CHUNK_ROWS = 10
+
+
+def make_rows(first_id: int, count: int, month: str = "2023-05", day: int = 1) -> list:
+    """Conversation rows one minute apart (timestamps follow the ids)"""
+    start = datetime.strptime(f"{month}-{day:02d} 08:00:00", TIMESTAMP_FORMAT)
+    return [
+        (first_id + i, f"question {first_id + i}", f"answer {first_id + i}",
+         (start + timedelta(minutes=first_id + i)).strftime(TIMESTAMP_FORMAT))
+        for i in range(count)
+    ]
+
+
+def chunk_sizes(archive: ConversationArchive) -> list:
+    with archive.db.transaction() as cursor:
+        cursor.execute("SELECT rows FROM chunks ORDER BY last_timestamp, last_id")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def all_ids(archive: ConversationArchive) -> list:
+    return [item["id"] for item in archive.history(10_000)]
+
+
+def test_append_in_chunks(tmp: Path):
+    """Batches fill the open chunk and start new ones; duplicates are skipped"""
+    print("Test: archive appends")
+    archive = ConversationArchive(tmp / "append.db")
+
+    for batch in range(5):
+        assert archive.append(make_rows(batch * 7 + 1, 7)) == 7
+    assert chunk_sizes(archive) == [10, 10, 10, 5], chunk_sizes(archive)
+    assert all_ids(archive) == list(range(35, 0, -1))
+
+    # Archiving rows again (after an interrupted pass) stores them once
+    assert archive.append(make_rows(30, 10)) == 4
+    assert archive.stats()["rows"] == 39
+    assert chunk_sizes(archive) == [10, 10, 10, 9]
+    print("✓ bounded chunks, no duplicates\n")
+
+
+def test_late_rows(tmp: Path):
+    """Rows older than archived ones land in order"""
+    print("Test: out-of-order archiving")
+    archive = ConversationArchive(tmp / "late.db")
+    archive.append(make_rows(100, 25, day=10))
+    archive.append(make_rows(1, 3, day=5))
+    archive.append(make_rows(200, 4, month="2023-06"))
+
+    ids = all_ids(archive)
+    assert ids == list(range(203, 199, -1)) + list(range(124, 99, -1)) + [3, 2, 1], ids
+    assert all(size <= 10 for size in chunk_sizes(archive))
+
+    # Paging with a cursor inside a chunk
+    newest = archive.history(6)
+    rest = archive.history(100, (newest[-1]["timestamp"], newest[-1]["id"]))
+    assert [item["id"] for item in newest + rest] == ids
+    print("✓ ordered across chunks and months\n")
+
+
+def test_paging_across_the_archive(tmp: Path):
+    """History pages run from the live table into the archive without gaps or repeats"""
+    print("Test: paging from live history into the archive")
+    profile = UserProfile(tmp / "profile")
+    now = datetime.now(timezone.utc)
+    with profile.db.transaction() as cursor:
+        for day in range(60, 0, -1):
+            timestamp = (now - timedelta(days=day)).strftime(TIMESTAMP_FORMAT)
+            cursor.execute("""
+                INSERT INTO conversations (user_input, assistant_response, timestamp)
+                VALUES (?, ?, ?)
+            """, (f"day {day}", "ok", timestamp))
+
+    result = profile.compact_history(hot_days=20)
+    assert result["archived"] == 40
+    stats = profile.get_history_stats()
+    assert stats["hot"]["rows"] == 20 and stats["archive"]["rows"] == 40
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        # Page size 7: one page holds both live and archived rows
+        page = profile.get_conversation_page(7, cursor)
+        seen += [item["user"] for item in page["items"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"day {day}" for day in range(1, 61)], seen
+    assert pages == 9
+
+    assert [item["user"] for item in profile.get_conversation_history(3)] == ["day 3", "day 2", "day 1"]
+    profile.conversation_writer.close()
+    print("✓ every exchange once, newest first\n")
+
+
+def test_search_after_compaction(tmp: Path):
+    """Archived exchanges stay searchable, merged with the live ones"""
+    print("Test: searching archived history")
+    profile = UserProfile(tmp / "search")
+    now = datetime.now(timezone.utc)
+    with profile.db.transaction() as cursor:
+        for day in range(30, 0, -1):
+            timestamp = (now - timedelta(days=day)).strftime(TIMESTAMP_FORMAT)
+            topic = "decorators" if day % 3 == 0 else "weather"
+            cursor.execute("""
+                INSERT INTO conversations (user_input, assistant_response, timestamp)
+                VALUES (?, ?, ?)
+            """, (f"day {day}: tell me about {topic}", "sure", timestamp))
+
+    assert profile.compact_history(hot_days=10)["archived"] == 20
+    found = profile.search_conversations("decorator", limit=20)
+    assert sorted(int(item["user"].split(":")[0][4:]) for item in found) == [3, 6, 9, 12, 15, 18, 21, 24, 27, 30]
+    assert all("**decorators**" in item["snippet"] and item["timestamp"] for item in found)
+
+    # Pages across both indexes don't overlap
+    pages = [profile.search_conversations("weather", 6, offset) for offset in range(0, 24, 6)]
+    ids = [item["id"] for page in pages for item in page]
+    assert len(ids) == len(set(ids)) == 20, ids
+
+    # Archived again before the live rows were deleted: still listed once
+    with profile.db.transaction() as cursor:
+        cursor.execute("SELECT id, user_input, assistant_response, timestamp FROM conversations")
+        profile.archive.append(cursor.fetchall())
+    assert len(profile.search_conversations("decorator", limit=20)) == 10
+    profile.conversation_writer.close()
+    print("✓ found in the archive\n")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            test_append_in_chunks(Path(tmp))
+            test_late_rows(Path(tmp))
+            test_paging_across_the_archive(Path(tmp))
+            test_search_after_compaction(Path(tmp))
+        except Exception as e:
+            print(f"\n❌ Test failed with error: {e}")
+            import traceback
+            traceback.print_exc()
+            return 1
+        finally:
+            close_all()
+
+    print("✅ Archive tests passed")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
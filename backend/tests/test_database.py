@@ -0,0 +1,201 @@
+"""Test script for the shared SQLite layer: write-behind queues and schema migrations"""
+
+import sys
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.database import get_database, close_all
+
+
+def count(db) -> int:
+    with db.transaction() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM log")
+        return cursor.fetchone()[0]
+
+
+def make_log(tmp: Path, name: str):
+    db = get_database(tmp / name)
+    with db.transaction() as cursor:
+        cursor.execute("CREATE TABLE log (id INTEGER PRIMARY KEY, text TEXT)")
+    return db
+
+
+def test_write_behind_flush(tmp: Path):
+    """Rows are committed by the batch deadline or by flush(), whichever is first"""
+    print("Test: write-behind flush")
+    db = make_log(tmp, "flush.db")
+    writer = db.write_behind("INSERT INTO log (text) VALUES (?)", batch_size=100, flush_interval=0.2)
+
+    for i in range(5):
+        writer.put((f"row {i}",))
+    assert count(db) == 0, "rows written before their batch was due"
+    writer.flush()
+    assert count(db) == 5
+
+    writer.put(("late",))
+    time.sleep(0.5)
+    assert count(db) == 6, "batch deadline didn't flush"
+    print("✓ flushed on demand and on deadline\n")
+
+
+def test_write_behind_full_queue(tmp: Path):
+    """A full queue makes put() write the row itself instead of waiting for room"""
+    print("Test: write-behind with a stalled writer")
+    db = make_log(tmp, "full.db")
+    writer = db.write_behind("INSERT INTO log (text) VALUES (?)", batch_size=1,
+                             flush_interval=0.01, max_pending=2)
+
+    # Stall the background thread's writes until released
+    release = threading.Event()
+    write = writer._write
+
+    def stalled_write(rows):
+        if threading.current_thread() is writer._thread:
+            release.wait()
+        write(rows)
+
+    writer._write = stalled_write
+
+    writer.put(("taken by the writer",))
+    time.sleep(0.1)
+    writer.put(("queued 1",))
+    writer.put(("queued 2",))
+
+    start = time.monotonic()
+    writer.put(("overflow",))
+    assert time.monotonic() - start < 1.0, "put() waited for room in the queue"
+    assert count(db) == 1, "the overflowing row should be written directly"
+
+    release.set()
+    writer.flush()
+    assert count(db) == 4
+    print("✓ overflow written directly, nothing lost\n")
+
+
+def test_write_behind_close(tmp: Path):
+    """close() writes what's queued; later rows are written synchronously"""
+    print("Test: write-behind close")
+    db = make_log(tmp, "close.db")
+    writer = db.write_behind("INSERT INTO log (text) VALUES (?)", flush_interval=60.0)
+
+    writer.put(("queued",))
+    writer.close()
+    assert count(db) == 1, "close() dropped queued rows"
+    writer.put(("after close",))
+    assert count(db) == 2
+    writer.flush()  # no-op once closed
+    print("✓ queued rows kept, later rows written directly\n")
+
+
+def test_write_behind_close_race(tmp: Path):
+    """A flush() racing close() still returns, and its rows are written"""
+    print("Test: write-behind close during flush")
+    db = make_log(tmp, "close_race.db")
+    writer = db.write_behind("INSERT INTO log (text) VALUES (?)", flush_interval=60.0)
+
+    # Widen the gap between flush()'s closed check and queueing its marker
+    put = writer._queue.put
+
+    def slow_put(item, *args, **kwargs):
+        if isinstance(item, threading.Event):
+            time.sleep(0.2)
+        return put(item, *args, **kwargs)
+
+    writer._queue.put = slow_put
+    writer.put(("queued",))
+    flusher = threading.Thread(target=writer.flush, daemon=True)
+    flusher.start()
+    time.sleep(0.05)
+    closer = threading.Thread(target=writer.close, daemon=True)
+    closer.start()
+
+    flusher.join(timeout=5)
+    closer.join(timeout=5)
+    assert not flusher.is_alive(), "flush() hung after close()"
+    assert not closer.is_alive() and count(db) == 1
+    print("✓ flush returned, row kept\n")
+
+
+def schema_version(db) -> int:
+    with db.transaction() as cursor:
+        cursor.execute("PRAGMA user_version")
+        return cursor.fetchone()[0]
+
+
+def test_migrate_once(tmp: Path):
+    """Each migration runs once; later runs only apply the new ones"""
+    print("Test: migrations applied once")
+    db = get_database(tmp / "migrate.db")
+    migrations = [
+        ["CREATE TABLE notes (id INTEGER PRIMARY KEY, text TEXT)"],
+        ["ALTER TABLE notes ADD COLUMN pinned INTEGER DEFAULT 0",
+         "INSERT INTO notes (text) VALUES ('welcome')"],
+    ]
+    db.migrate(migrations)
+    db.migrate(migrations)  # already applied: nothing runs twice
+    assert schema_version(db) == 2
+
+    migrations.append(["INSERT INTO notes (text, pinned) VALUES ('pinned', 1)"])
+    db.migrate(migrations)
+    assert schema_version(db) == 3
+    with db.transaction() as cursor:
+        cursor.execute("SELECT text, pinned FROM notes ORDER BY id")
+        assert cursor.fetchall() == [("welcome", 0), ("pinned", 1)]
+    print("✓ applied in order, once\n")
+
+
+def test_migrate_failure(tmp: Path):
+    """A failing migration leaves no partial changes and keeps the version"""
+    print("Test: failed migration")
+    db = get_database(tmp / "migrate_failed.db")
+    migrations = [
+        ["CREATE TABLE notes (id INTEGER PRIMARY KEY, text TEXT)"],
+        ["INSERT INTO notes (text) VALUES ('half done')", "INSERT INTO missing_table VALUES (1)"],
+    ]
+    try:
+        db.migrate(migrations)
+        raise AssertionError("broken migration succeeded")
+    except sqlite3.OperationalError:
+        pass
+    assert schema_version(db) == 1, "version bumped past a failed migration"
+    with db.transaction() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM notes")
+        assert cursor.fetchone()[0] == 0, "failed migration partly applied"
+
+    # Fixed, it runs on the next start
+    migrations[1][1] = "UPDATE notes SET text = 'done'"
+    db.migrate(migrations)
+    assert schema_version(db) == 2
+    print("✓ rolled back, retried later\n")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            test_write_behind_flush(Path(tmp))
+            test_write_behind_full_queue(Path(tmp))
+            test_write_behind_close(Path(tmp))
+            test_write_behind_close_race(Path(tmp))
+            test_migrate_once(Path(tmp))
+            test_migrate_failure(Path(tmp))
+        except Exception as e:
+            print(f"\n❌ Test failed with error: {e}")
+            import traceback
+            traceback.print_exc()
+            return 1
+        finally:
+            close_all()
+
+    print("✅ Database tests passed")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,195 @@
+"""Test script for model generation: streaming, batching and prefix reuse with a stub model"""
+
+import sys
+import asyncio
+import re
+import zlib
+from types import SimpleNamespace
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.config import AIConfig
+from nlp.ai_engine import AIEngine, TRANSFORMERS_AVAILABLE
+from nlp.session import Session, MAX_HISTORY
+
+if TRANSFORMERS_AVAILABLE:
+    import torch
+
+
+class StubTokenizer:
+    """Word "wN" is token N, other words a stable id of their own; token 0 ends a sequence"""
+
+    eos_token_id = 0
+
+    def __call__(self, prompts, return_tensors=None, padding=False):
+        if isinstance(prompts, str):
+            return {"input_ids": self._encode(prompts)}
+        ids = torch.tensor([self._encode(prompt) for prompt in prompts])
+        return StubBatch(input_ids=ids, attention_mask=torch.ones_like(ids))
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(f"w{token}" for token in ids)
+
+    @staticmethod
+    def _encode(prompt: str) -> list:
+        return [int(word[1:]) if re.fullmatch(r"w\d+", word) else 10**6 + zlib.crc32(word.encode()) % 10**6
+                for word in prompt.split()]
+
+
+class StubBatch(dict):
+    def to(self, device):
+        return self
+
+
+class StubCache:
+    """Attention cache stand-in: only its length matters"""
+
+    def __init__(self, length: int):
+        self.length = length
+
+    def get_seq_length(self) -> int:
+        return self.length
+
+    def crop(self, length: int):
+        self.length = length
+
+    def to_legacy_cache(self):
+        return ((torch.zeros(self.length), torch.zeros(self.length)),)
+
+
+class StubModel:
+    """
+    generate() as transformers runs it: each step emits the previous token + 1
+    per row, pads rows the stopping criteria report done, and ends when all are
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.past_lengths = []
+
+    def generate(self, input_ids=None, attention_mask=None, past_key_values=None, max_new_tokens=8,
+                 pad_token_id=0, streamer=None, stopping_criteria=None, return_dict_in_generate=False,
+                 **kwargs):
+        self.batches.append(input_ids.shape[0])
+        self.past_lengths.append(past_key_values.get_seq_length() if past_key_values else 0)
+        streamer.put(input_ids)
+
+        unfinished = torch.ones(input_ids.shape[0], dtype=torch.bool)
+        for _ in range(max_new_tokens):
+            next_tokens = torch.where(unfinished, input_ids[:, -1] + 1, torch.full_like(input_ids[:, -1], pad_token_id))
+            input_ids = torch.cat([input_ids, next_tokens[:, None]], dim=-1)
+            streamer.put(next_tokens)
+
+            for criterion in stopping_criteria:
+                done = criterion(input_ids, None)
+                assert isinstance(done, torch.Tensor) and done.dtype == torch.bool, "criterion must return a bool tensor"
+                assert done.shape == unfinished.shape, "criterion must report every row"
+                unfinished &= ~done
+            if not unfinished.any():
+                break
+        streamer.end()
+
+        if return_dict_in_generate:
+            return SimpleNamespace(sequences=input_ids, past_key_values=StubCache(input_ids.shape[1] - 1))
+        return input_ids
+
+
+def make_engine(**settings) -> AIEngine:
+    """An engine serving the stub model, as if warm-up had loaded it"""
+    engine = AIEngine(AIConfig(**settings))
+    engine.tokenizer, engine.model = StubTokenizer(), StubModel()
+    engine._ready.set()
+    return engine
+
+
+def words(first: int, count: int) -> str:
+    return " ".join(f"w{token}" for token in range(first, first + count))
+
+
+async def test_streaming_batch():
+    """Concurrent prompts share one batch; each row stops at its own limit"""
+    print("Test: streamed batch with per-row limits")
+    engine = make_engine(batch_size=4, batch_window=0.2, prefix_cache_mb=0)
+
+    async def collect(prompt: str, max_tokens: int) -> list:
+        return [piece async for piece in engine.stream_response(prompt, max_tokens)]
+
+    short, long = await asyncio.gather(collect(words(1, 3), 2), collect(words(11, 3), 6))
+    assert engine.model.batches == [2], f"not batched: {engine.model.batches}"
+    assert "".join(short).strip() == words(4, 2), short
+    assert "".join(long).strip() == words(14, 6), long
+    assert len(long) > 1, "reply wasn't streamed"
+    engine.shutdown()
+    print("✓ one batch, rows finished separately\n")
+
+
+def test_cached_prefix():
+    """A session's next turn only runs the model on its new tokens"""
+    print("Test: prefix cache")
+    engine = make_engine(batch_size=4, batch_window=0.0, prefix_cache_mb=1)
+
+    first_prompt = words(100, 20)
+    reply = engine.generate_response(first_prompt, 4, cache_key="s1")
+    assert reply == words(120, 4)
+
+    # The next turn repeats the conversation so far and adds to it
+    engine.generate_response(f"{first_prompt} {reply} w500 w501", 4, cache_key="s1")
+    assert engine.model.past_lengths == [0, 23], engine.model.past_lengths
+    assert engine.prefix_cache.stats()["hits"] == 1
+    engine.shutdown()
+    print("✓ cached prefix reused\n")
+
+
+def test_long_conversation():
+    """Past MAX_HISTORY messages, turns still reuse the cached prefix"""
+    print("Test: prefix cache in a long conversation")
+    engine = make_engine(batch_size=4, batch_window=0.0, prefix_cache_mb=1, max_tokens=3)
+    session = Session("long")
+
+    outcomes = []
+    for turn in range(MAX_HISTORY + 10):
+        oldest = session.conversation_history[:1]
+        session.add_message("user", words(100 * turn + 1, 3))
+        trimmed = bool(oldest) and session.conversation_history[0] is not oldest[0]
+
+        hits = engine.prefix_cache.hits
+        session.add_message("assistant", engine.chat(session.conversation_history, session.session_id))
+        outcomes.append((trimmed, engine.prefix_cache.hits > hits))
+
+    # Once the history is long, only the turn after a block is dropped starts over
+    late = outcomes[MAX_HISTORY // 2:]
+    assert sum(trimmed for trimmed, _ in late) == 3, outcomes
+    assert all(hit != trimmed for trimmed, hit in late), outcomes
+    engine.shutdown()
+    print(f"✓ {sum(hit for _, hit in outcomes)} of {len(outcomes)} turns reused the cache\n")
+
+
+async def main_async():
+    if not TRANSFORMERS_AVAILABLE:
+        print("⚠ torch and transformers are not installed; skipping generation tests")
+        return 0
+
+    try:
+        await test_streaming_batch()
+        test_cached_prefix()
+        test_long_conversation()
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+    print("✅ Generation tests passed")
+    return 0
+
+
+def main():
+    """Run the async main function"""
+    return asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    exit(main())
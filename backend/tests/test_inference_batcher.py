@@ -0,0 +1,250 @@
+"""Test script for request batching and per-row streaming (no model needed)"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from nlp.inference_batcher import BatchStreamer, GenerationRequest, InferenceBatcher
+
+
+class Tokens(list):
+    """One generation step's tokens, shaped like the tensor generate() passes"""
+
+    def reshape(self, *shape):
+        return self
+
+    def tolist(self):
+        return list(self)
+
+
+class WordTokenizer:
+    """Token N decodes to "wN "; token 0 ends a sequence"""
+
+    eos_token_id = 0
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(f"w{token} " for token in ids).rstrip()
+
+
+class Collector:
+    """A request's text and completion"""
+
+    def __init__(self, prompt: str = "hi", max_new_tokens: int = 8):
+        self.pieces = []
+        self.error = None
+        self.done = threading.Event()
+        self.request = GenerationRequest(prompt, max_new_tokens, self.pieces.append, self._on_done)
+
+    def _on_done(self, error):
+        assert not self.done.is_set(), "on_done called twice"
+        self.error = error
+        self.done.set()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.pieces)
+
+
+class RecordingRun:
+    """run_batch stand-in: records the prompts of each batch, optionally held until released"""
+
+    def __init__(self, hold: bool = False, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def __call__(self, requests):
+        self.batches.append([request.prompt for request in requests])
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("model exploded")
+
+
+def submit_all(batcher: InferenceBatcher, prompts) -> list:
+    collectors = [Collector(prompt) for prompt in prompts]
+    for collector in collectors:
+        batcher.submit(collector.request)
+    for collector in collectors:
+        assert collector.done.wait(5), f"{collector.request.prompt} never finished"
+    return collectors
+
+
+def test_batch_window():
+    """Requests arriving within the window share a batch; later ones start the next"""
+    print("Test: batching window")
+    run = RecordingRun()
+    batcher = InferenceBatcher(run, max_batch_size=4, window=0.2)
+
+    submit_all(batcher, ["a", "b", "c"])
+    assert run.batches == [["a", "b", "c"]], run.batches
+
+    first = Collector("d")
+    batcher.submit(first.request)
+    assert first.done.wait(5)
+    time.sleep(0.05)
+    submit_all(batcher, ["e"])
+    assert run.batches[1:] == [["d"], ["e"]]
+    batcher.close()
+    print("✓ batched within the window\n")
+
+
+def test_max_batch_size():
+    """Batches never exceed max_batch_size; requests that waited go next, in order"""
+    print("Test: max batch size")
+    run = RecordingRun()
+    batcher = InferenceBatcher(run, max_batch_size=2, window=0.2)
+    submit_all(batcher, ["a", "b", "c", "d", "e"])
+    assert run.batches == [["a", "b"], ["c", "d"], ["e"]], run.batches
+    batcher.close()
+    print("✓ split into full batches\n")
+
+
+def test_cancelled_before_running():
+    """A request cancelled while waiting completes without reaching the model"""
+    print("Test: cancelled while queued")
+    run = RecordingRun(hold=True)
+    batcher = InferenceBatcher(run, max_batch_size=1, window=0.0)
+
+    running, cancelled, kept = Collector("running"), Collector("cancelled"), Collector("kept")
+    batcher.submit(running.request)
+    assert run.started.wait(5)
+    batcher.submit(cancelled.request)
+    batcher.submit(kept.request)
+    cancelled.request.cancelled.set()
+    run.release.set()
+
+    for collector in (running, cancelled, kept):
+        assert collector.done.wait(5) and collector.error is None
+    assert run.batches == [["running"], ["kept"]], run.batches
+    batcher.close()
+    print("✓ skipped\n")
+
+
+def test_failed_batch():
+    """A failing batch fails its requests; the batcher goes on"""
+    print("Test: failed batch")
+    run = RecordingRun(fail=True)
+    batcher = InferenceBatcher(run, max_batch_size=4, window=0.1)
+    collectors = submit_all(batcher, ["a", "b"])
+    assert all(isinstance(collector.error, RuntimeError) for collector in collectors)
+
+    run.fail = False
+    assert submit_all(batcher, ["c"])[0].error is None
+    batcher.close()
+    print("✓ errors reported per request\n")
+
+
+def test_closed_batcher():
+    """close() lets the running batch finish and fails waiting and later requests"""
+    print("Test: closing")
+    run = RecordingRun(hold=True)
+    batcher = InferenceBatcher(run, max_batch_size=1, window=0.0)
+
+    running, waiting = Collector("running"), Collector("waiting")
+    batcher.submit(running.request)
+    assert run.started.wait(5)
+    batcher.submit(waiting.request)
+    batcher.close()
+    batcher.close()  # idempotent
+    run.release.set()
+
+    assert running.done.wait(5) and running.error is None
+    assert waiting.done.wait(5) and isinstance(waiting.error, RuntimeError)
+    late = Collector("late")
+    batcher.submit(late.request)
+    assert late.done.is_set() and isinstance(late.error, RuntimeError)
+    assert run.batches == [["running"]]
+    print("✓ running batch finished, the rest failed\n")
+
+
+def test_streamer_rows():
+    """Each row stops at its own end-of-sequence token or token limit"""
+    print("Test: per-row streaming")
+    short, ends, long = Collector(max_new_tokens=2), Collector(max_new_tokens=8), Collector(max_new_tokens=4)
+    streamer = BatchStreamer(WordTokenizer(), [short.request, ends.request, long.request])
+
+    streamer.put(Tokens([9, 9, 9]))  # the prompt: ignored
+    streamer.put(Tokens([1, 11, 21]))
+    streamer.put(Tokens([2, 0, 22]))
+    assert short.request.finished and ends.request.finished and not long.request.finished
+    assert not streamer.all_finished
+    streamer.put(Tokens([3, 12, 23]))  # padding for finished rows
+    streamer.put(Tokens([4, 13, 24]))
+    assert streamer.all_finished
+    streamer.end()
+
+    assert short.text == "w1 w2" and ends.text == "w11" and long.text == "w21 w22 w23 w24"
+    print("✓ rows finished separately\n")
+
+
+def test_streamer_holds_back_words():
+    """Text is passed on a whole word at a time; the rest comes at the end"""
+    print("Test: word hold-back")
+    collector = Collector(max_new_tokens=10)
+    streamer = BatchStreamer(WordTokenizer(), [collector.request])
+    streamer.put(Tokens([0]))
+    streamer.put(Tokens([5]))
+    assert collector.pieces == [], "partial word passed on"
+    streamer.put(Tokens([6]))
+    assert collector.pieces == ["w5 "]
+    streamer.put(Tokens([7]))
+    streamer.end()
+    assert collector.pieces == ["w5 ", "w6 ", "w7"]
+    print("✓ held back\n")
+
+
+def test_streamer_cancellation():
+    """Cancelled rows and rows whose callback fails stop getting text; the others don't"""
+    print("Test: cancelled rows")
+    cancelled, broken, fine = Collector(), Collector(), Collector()
+
+    def refuse(text):
+        raise ConnectionError("client went away")
+
+    broken.request.on_text = refuse
+    streamer = BatchStreamer(WordTokenizer(), [cancelled.request, broken.request, fine.request])
+    streamer.put(Tokens([0, 0, 0]))
+    streamer.put(Tokens([1, 1, 1]))
+    cancelled.request.cancelled.set()
+    streamer.put(Tokens([2, 2, 2]))
+    assert cancelled.request.finished
+    assert broken.request.cancelled.is_set(), "failing row not cancelled"
+    streamer.put(Tokens([3, 3, 3]))
+    streamer.end()
+
+    assert cancelled.text == "" and fine.text == "w1 w2 w3"
+    assert broken.request.token_ids == [1, 2], "tokens kept after the row was dropped"
+    print("✓ dropped without stopping the batch\n")
+
+
+def main():
+    try:
+        test_batch_window()
+        test_max_batch_size()
+        test_cancelled_before_running()
+        test_failed_batch()
+        test_closed_batcher()
+        test_streamer_rows()
+        test_streamer_holds_back_words()
+        test_streamer_cancellation()
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+    print("✅ Inference batcher tests passed")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -20,21 +20,33 @@ async def main():
         ("show my todos", "show_todos"),
         ("show my reminders", "show_reminders"),
         ("complete todo 1", "complete_task"),
+        ("complete todos 3, 5, 8-12", "complete_task"),
+        ("complete todos tagged work", "complete_task"),
         ("delete reminder 2", "delete_task"),
+        ("delete todos 4-6", "delete_task"),
         ("task summary", "task_summary"),
     ]
     
     print("\n🧪 Testing Intent Recognition\n" + "=" * 50 + "\n")
     
+    failures = 0
     for command, expected_intent in test_commands:
+        matched_intent = processor._match_intent(command)
         result = await processor.process(command)
-        # Check if the intent was matched correctly by looking at the log
         print(f"Command: '{command}'")
         print(f"Expected: {expected_intent}")
+        print(f"Matched: {matched_intent}")
         print(f"Result: {result[:100]}...\n")
+        if matched_intent != expected_intent:
+            failures += 1
+    
+    if failures:
+        print(f"❌ {failures} intent(s) matched incorrectly")
+        return 1
     
     print("✅ Test complete!")
+    return 0
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    exit(asyncio.run(main()))
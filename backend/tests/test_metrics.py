@@ -0,0 +1,80 @@
+"""Test script for the system metrics sampler"""
+
+import sys
+import asyncio
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.metrics import MetricsSampler
+
+
+def test_latest_on_demand():
+    """Without the background task, latest() samples again once its snapshot is stale"""
+    print("Test: on-demand sampling")
+    metrics = MetricsSampler(interval=0.2)
+
+    first = metrics.latest()
+    assert metrics.latest() is first, "re-sampled within the interval"
+
+    time.sleep(0.3)
+    second = metrics.latest()
+    assert second is not first and second["timestamp"] > first["timestamp"]
+    assert len(metrics.history) == 0, "reader-triggered samples added to the history"
+    print("✓ fresh snapshot after the interval\n")
+
+
+async def test_latest_from_sampler():
+    """With the background task running, reads never sample"""
+    print("Test: reads from the background sampler")
+    metrics = MetricsSampler(interval=0.1)
+    metrics.start()
+    try:
+        assert len(metrics.history) == 1, "no snapshot right after start()"
+        samples = []
+        sample = metrics.sample
+        metrics.sample = lambda: samples.append(1) or sample()
+
+        for _ in range(40):
+            assert metrics.latest() is metrics.history[-1]
+            await asyncio.sleep(0.01)
+        # Only the background task sampled: about one per interval
+        assert 2 <= len(samples) <= 5, samples
+        assert len(metrics.history) == 1 + len(samples)
+    finally:
+        await metrics.stop()
+    print("✓ latest snapshot read, history evenly spaced\n")
+
+
+def test_averages():
+    """Averages cover the snapshots inside each window"""
+    print("Test: averages")
+    metrics = MetricsSampler(interval=1.0)
+    for _ in range(3):
+        metrics.sample()
+    averages = metrics.averages()
+    assert set(averages) == {"1m", "5m", "15m"}
+    assert 0.0 <= averages["1m"]["memory_percent"] <= 100.0
+    print("✓ averages\n")
+
+
+def main():
+    try:
+        test_latest_on_demand()
+        asyncio.run(test_latest_from_sampler())
+        test_averages()
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+    print("✅ Metrics tests passed")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
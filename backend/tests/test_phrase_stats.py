@@ -0,0 +1,117 @@
+"""Test script for the bounded phrase statistics (Space-Saving sketches)"""
+
+import sys
+import random
+from collections import Counter
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from user.phrase_stats import SpaceSaving, PhraseStats
+
+
+def check_invariants(sketch: SpaceSaving):
+    """Buckets and the minimum count agree with the counts"""
+    bucketed = {item: count for count, bucket in sketch._buckets.items() for item in bucket}
+    assert bucketed == sketch.counts, "buckets out of sync with counts"
+    if sketch.counts:
+        assert sketch._min_count == min(sketch.counts.values()), "wrong minimum count"
+
+
+def test_exact_under_capacity():
+    """Below capacity every count is exact"""
+    print("Test: exact counts under capacity")
+    sketch = SpaceSaving(capacity=10)
+    for item in ["a"] * 5 + ["b"] * 3 + ["c"]:
+        sketch.add(item)
+    assert sketch.top(3) == [("a", 5, 0), ("b", 3, 0), ("c", 1, 0)]
+    check_invariants(sketch)
+    print("✓ exact\n")
+
+
+def test_heavy_hitters_kept():
+    """Items seen more than N / capacity times stay tracked, within their error bounds"""
+    print("Test: heavy hitters in a long stream")
+    rng = random.Random(7)
+    stream = [f"rare {rng.randrange(5000)}" for _ in range(20000)]
+    stream += ["hello there"] * 900 + ["thank you"] * 600
+    rng.shuffle(stream)
+
+    capacity = 50
+    sketch = SpaceSaving(capacity)
+    for item in stream:
+        sketch.add(item)
+        assert len(sketch) <= capacity
+    check_invariants(sketch)
+
+    true_counts = Counter(stream)
+    for item, count, error in sketch.top(capacity):
+        assert count - error <= true_counts[item] <= count, f"bounds violated for {item}"
+    top_two = [item for item, _, _ in sketch.top(2)]
+    assert top_two == ["hello there", "thank you"], top_two
+    print("✓ bounded memory, heavy hitters found\n")
+
+
+def test_eviction_order():
+    """The oldest of the lowest-count items is replaced first"""
+    print("Test: eviction order")
+    sketch = SpaceSaving(capacity=3)
+    for item in ["a", "a", "b", "c", "d"]:
+        sketch.add(item)
+    assert set(sketch.counts) == {"a", "c", "d"}, "b (oldest with count 1) should go"
+    assert sketch.counts["d"] == 2 and sketch.errors["d"] == 1
+    check_invariants(sketch)
+    print("✓ oldest minimum evicted\n")
+
+
+def test_round_trip():
+    """Serialized sketches keep their counts, errors and eviction order"""
+    print("Test: serialization round trip")
+    stats = PhraseStats(capacity=4)
+    for message in ["how are you today", "how are you doing", "see you today"]:
+        stats.add_words(message.split())
+
+    restored = PhraseStats.from_dict(stats.to_dict(), capacity=4)
+    assert sorted(restored.top(10)) == sorted(stats.top(10))
+    for n, sketch in stats.sketches.items():
+        assert restored.sketches[n].counts == sketch.counts
+        assert restored.sketches[n].errors == sketch.errors
+        check_invariants(restored.sketches[n])
+
+    # Both evict the same phrase next
+    stats.add_words(["brand", "new"])
+    restored.add_words(["brand", "new"])
+    assert restored.sketches[2].counts == stats.sketches[2].counts
+    print("✓ round trip\n")
+
+
+def test_legacy_phrases():
+    """Plain phrase lists from older profiles go to the sketch of their length"""
+    print("Test: legacy phrases")
+    stats = PhraseStats()
+    stats.add_phrases(["good morning", "good morning", "see you later", "hi", "one two three four"])
+    assert stats.top(5) == [("good morning", 2), ("see you later", 1)]
+    print("✓ imported\n")
+
+
+def main():
+    try:
+        test_exact_under_capacity()
+        test_heavy_hitters_kept()
+        test_eviction_order()
+        test_round_trip()
+        test_legacy_phrases()
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+    print("✅ Phrase statistics tests passed")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,168 @@
+"""Test script for the per-session prefix cache (no model needed)"""
+
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from nlp.prefix_cache import PrefixCache, MIN_REUSED_TOKENS, cache_nbytes, common_prefix_length
+
+
+class Block:
+    """Tensor stand-in: `tokens` entries of 4 bytes"""
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+
+    def element_size(self) -> int:
+        return 4
+
+    def nelement(self) -> int:
+        return self.tokens
+
+
+class StubCache:
+    """Attention cache stand-in with one layer's keys and values"""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.crops = []
+
+    def get_seq_length(self) -> int:
+        return self.length
+
+    def crop(self, length: int):
+        self.crops.append(length)
+        self.length = length
+
+    def to_legacy_cache(self):
+        return ((Block(self.length), Block(self.length)),)
+
+
+def tokens(count: int, first: int = 1) -> list:
+    return list(range(first, first + count))
+
+
+def test_hit_and_crop():
+    """A continued conversation reuses the shared prefix, cropped to it"""
+    print("Test: hit and crop")
+    cache = PrefixCache(max_bytes=10_000)
+    conversation = tokens(40)
+    past = StubCache(40)
+    cache.put("s1", conversation, past)
+
+    # Next turn: same 40 tokens plus new ones
+    taken, reused = cache.take("s1", conversation + [900, 901])
+    assert taken is past and reused == 40 and past.crops == [], "full prefix cropped"
+    assert cache.stats()["sessions"] == 0, "cache not taken out while in use"
+
+    # Old messages edited: only the first 30 tokens still match
+    cache.put("s1", conversation, past)
+    taken, reused = cache.take("s1", tokens(30) + [500] * 10)
+    assert reused == 30 and past.crops == [30] and past.length == 30
+
+    # A prompt that is exactly the cached tokens leaves one to run the model on
+    cache.put("s1", tokens(30), past)
+    assert cache.take("s1", tokens(30))[1] == 29
+
+    stats = cache.stats()
+    assert stats["hits"] == 3 and stats["reused_tokens"] == 99 and stats["misses"] == 0
+    print("✓ reused and cropped\n")
+
+
+def test_misses():
+    """Unknown sessions and short shared prefixes are misses; the entry is dropped"""
+    print("Test: misses")
+    cache = PrefixCache(max_bytes=10_000)
+    assert cache.take("nobody", tokens(20)) == (None, 0)
+
+    cache.put("s1", tokens(40), StubCache(40))
+    short = MIN_REUSED_TOKENS - 1
+    assert cache.take("s1", tokens(short) + [999] * 30) == (None, 0)
+    assert cache.take("s1", tokens(40)) == (None, 0), "discarded entry used again"
+
+    cache.put("s2", tokens(40), StubCache(40))
+    cache.discard("s2")
+    cache.discard("s2")
+    assert cache.take("s2", tokens(41)) == (None, 0)
+    assert cache.stats()["misses"] == 4 and cache.stats()["bytes"] == 0
+    print("✓ missed\n")
+
+
+def test_eviction_by_bytes():
+    """Least recently used sessions go first once the byte budget is exceeded"""
+    print("Test: eviction by memory")
+    entry_bytes = cache_nbytes(StubCache(50))
+    assert entry_bytes == 400
+    cache = PrefixCache(max_bytes=3 * entry_bytes)
+
+    for key in ("a", "b", "c"):
+        cache.put(key, tokens(50), StubCache(50))
+    # "a" is used (taken and put back), so "b" is now the oldest
+    past, _ = cache.take("a", tokens(51))
+    cache.put("a", tokens(50), past)
+    cache.put("d", tokens(50), StubCache(50))
+
+    assert cache.stats()["sessions"] == 3 and cache.stats()["bytes"] == 3 * entry_bytes
+    assert cache.take("b", tokens(51)) == (None, 0), "least recently used kept"
+    past, reused = cache.take("a", tokens(51))
+    assert reused == 50
+    cache.put("a", tokens(50), past)
+
+    # One long conversation can push out several short ones
+    cache.put("long", tokens(100), StubCache(100))
+    assert cache.stats()["sessions"] == 2 and cache.stats()["bytes"] == 3 * entry_bytes
+    assert cache.take("c", tokens(51)) == (None, 0) and cache.take("d", tokens(51)) == (None, 0)
+
+    # Replacing an entry doesn't count it twice
+    cache.put("long", tokens(100), StubCache(100))
+    assert cache.stats()["bytes"] == 3 * entry_bytes
+    print("✓ evicted by size, oldest first\n")
+
+
+def test_oversize_ignored():
+    """An entry bigger than the whole budget isn't stored and evicts nothing"""
+    print("Test: oversize entries")
+    cache = PrefixCache(max_bytes=1000)
+    cache.put("small", tokens(50), StubCache(50))
+    cache.put("huge", tokens(500), StubCache(500))
+    assert cache.take("huge", tokens(501)) == (None, 0)
+    assert cache.take("small", tokens(51))[1] == 50
+
+    cache.put("small", tokens(50), StubCache(50))
+    cache.clear()
+    assert cache.stats()["sessions"] == 0 and cache.stats()["bytes"] == 0
+    print("✓ ignored\n")
+
+
+def test_helpers():
+    """Prefix lengths and sizes of legacy (tuple) caches"""
+    print("Test: helpers")
+    assert common_prefix_length([1, 2, 3], [1, 2, 4, 5]) == 2
+    assert common_prefix_length([], [1]) == 0 and common_prefix_length([1, 2], [1, 2]) == 2
+    legacy = ((Block(10), Block(10)), (Block(10), Block(10)))
+    assert cache_nbytes(legacy) == 160
+    print("✓ helpers\n")
+
+
+def main():
+    try:
+        test_hit_and_crop()
+        test_misses()
+        test_eviction_by_bytes()
+        test_oversize_ignored()
+        test_helpers()
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+    print("✅ Prefix cache tests passed")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,224 @@
+"""Test script for the reminder scheduler's delivery rules"""
+
+import sys
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.database import close_all
+from nlp.reminder_system import ReminderSystem
+from nlp.reminder_scheduler import ReminderScheduler, ReminderOutbox, ReminderRelay, next_occurrence
+
+
+class Clients:
+    """Stand-in for the server's broadcast: records reminders, reports how many clients got them"""
+
+    def __init__(self, connected: int = 0):
+        self.connected = connected
+        self.received = []
+
+    async def notify(self, reminder: dict) -> int:
+        if self.connected:
+            self.received.append(reminder["id"])
+        return self.connected
+
+
+async def wait_for(condition, timeout: float = 2.0):
+    """Poll until condition() holds"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def pending_ids(reminders: ReminderSystem) -> set:
+    return {reminder["id"] for reminder in reminders.get_schedulable_reminders()}
+
+
+def past(minutes: int = 5) -> tuple:
+    when = datetime.now() - timedelta(minutes=minutes)
+    return when.strftime("%Y-%m-%d"), when.strftime("%H:%M")
+
+
+async def test_held_until_a_client_connects(reminders: ReminderSystem):
+    """Overdue at startup with nobody connected: kept pending, sent on connect"""
+    print("Test: reminder due with no clients is held")
+    due_date, due_time = past()
+    reminder_id = reminders.create_reminder("Stretch", due_date=due_date, due_time=due_time)
+
+    clients = Clients(connected=0)
+    scheduler = ReminderScheduler(reminders, clients.notify)
+    scheduler.start()
+    await wait_for(lambda: scheduler.waiting == 1)
+    assert reminder_id in pending_ids(reminders), "marked notified with no one to receive it"
+
+    clients.connected = 1
+    scheduler.client_connected()
+    await wait_for(lambda: scheduler.waiting == 0)
+    await wait_for(lambda: reminder_id not in pending_ids(reminders))
+    assert clients.received == [reminder_id]
+    await scheduler.stop()
+    print("✓ held, then delivered once\n")
+
+
+async def test_completed_while_waiting(reminders: ReminderSystem):
+    """A held reminder that is completed isn't sent later"""
+    print("Test: completing a held reminder drops it")
+    due_date, due_time = past()
+    reminder_id = reminders.create_reminder("Call back", due_date=due_date, due_time=due_time)
+
+    clients = Clients(connected=0)
+    scheduler = ReminderScheduler(reminders, clients.notify)
+    scheduler.start()
+    await wait_for(lambda: scheduler.waiting == 1)
+
+    reminders.complete_reminder(reminder_id)
+    await wait_for(lambda: scheduler.waiting == 0)
+    clients.connected = 1
+    scheduler.client_connected()
+    await asyncio.sleep(0.05)
+    assert clients.received == []
+    await scheduler.stop()
+    print("✓ not delivered after completion\n")
+
+
+async def test_repeating_moves_on(reminders: ReminderSystem):
+    """A delivered repeating reminder moves to its next occurrence"""
+    print("Test: repeating reminder advances after delivery")
+    due_date, due_time = past(minutes=60 * 24 * 3 + 5)
+    reminder_id = reminders.create_reminder("Water plants", due_date=due_date, due_time=due_time,
+                                            recurring="daily")
+
+    clients = Clients(connected=1)
+    scheduler = ReminderScheduler(reminders, clients.notify)
+    scheduler.start()
+    await wait_for(lambda: clients.received == [reminder_id])
+
+    def next_due():
+        return next((r for r in reminders.get_schedulable_reminders() if r["id"] == reminder_id), None)
+
+    await wait_for(lambda: next_due() and next_due()["due_date"] != due_date)
+    assert next_due()["due_at"] > datetime.now().timestamp(), "missed occurrences weren't skipped"
+    assert len(scheduler) == 1
+    await scheduler.stop()
+    print("✓ rescheduled past the missed days\n")
+
+
+async def test_relayed_between_workers(reminders: ReminderSystem):
+    """Multi-worker mode: the leader publishes, a worker with clients delivers and records it"""
+    print("Test: reminders relayed through the outbox")
+    outbox = ReminderOutbox(reminders)
+    idle, busy = Clients(connected=0), Clients(connected=2)
+    relays = [ReminderRelay(outbox, idle.notify, poll_interval=0.02),
+              ReminderRelay(outbox, busy.notify, poll_interval=0.02)]
+    for relay in relays:
+        relay.start()
+    await asyncio.sleep(0.05)
+
+    async def publish(reminder):
+        await asyncio.get_running_loop().run_in_executor(None, outbox.publish, reminder)
+        return 1
+
+    scheduler = ReminderScheduler(reminders, publish, record=False)
+    scheduler.start()
+    due_date, due_time = past()
+    reminder_id = reminders.create_reminder("Stand up", due_date=due_date, due_time=due_time)
+
+    await wait_for(lambda: busy.received == [reminder_id])
+    await wait_for(lambda: reminder_id not in pending_ids(reminders))
+    assert idle.received == [] and scheduler.waiting == 0
+    # Publishing the same occurrence again (e.g. after a leader change) is a no-op
+    outbox.publish(next(r for r in reminders.get_reminders() if r["id"] == reminder_id))
+    assert len(outbox.entries()) == 1
+
+    # Nobody connected anywhere: held until a client connects to either worker
+    busy.connected = 0
+    later_id = reminders.create_reminder("Lock up", due_date=due_date, due_time=due_time)
+    await wait_for(lambda: len(outbox.entries(undelivered=True)) == 1)
+    assert later_id in pending_ids(reminders)
+
+    idle.connected = 1
+    relays[0].client_connected()
+    await wait_for(lambda: later_id not in pending_ids(reminders))
+    assert idle.received == [later_id]
+    assert outbox.entries(undelivered=True) == []
+
+    await scheduler.stop()
+    for relay in relays:
+        await relay.stop()
+    print("✓ delivered once by a worker with clients, held otherwise\n")
+
+
+async def test_retry_includes_new_entries(reminders: ReminderSystem):
+    """A connecting client gets new entries too, including ones another worker already claimed"""
+    print("Test: retry after entries claimed elsewhere")
+    outbox = ReminderOutbox(reminders)
+    clients = Clients(connected=0)
+    # Long poll interval: only the connecting client triggers a check
+    relay = ReminderRelay(outbox, clients.notify, poll_interval=60)
+    relay.start()
+    await asyncio.sleep(0.05)
+
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    claimed_id = reminders.create_reminder("Feed cat", due_date=tomorrow, due_time="09:00")
+    waiting_id = reminders.create_reminder("Walk dog", due_date=tomorrow, due_time="10:00")
+    for reminder in reminders.get_reminders():
+        if reminder["id"] in (claimed_id, waiting_id):
+            outbox.publish(reminder)
+    claimed_entry = next(entry_id for entry_id, reminder in outbox.entries() if reminder["id"] == claimed_id)
+    assert outbox.claim(claimed_entry), "entry already claimed"
+
+    clients.connected = 1
+    relay.client_connected()
+    await wait_for(lambda: len(clients.received) == 2)
+    assert clients.received == [claimed_id, waiting_id]
+    assert outbox.entries(undelivered=True) == []
+
+    await relay.stop()
+    print("✓ claimed entry still relayed\n")
+
+
+def test_next_occurrence():
+    """Monthly reminders keep their day, clamped to short months"""
+    print("Test: next occurrence")
+    assert next_occurrence("2024-01-31", "09:00", "monthly", datetime(2024, 1, 31, 10)) == "2024-02-29"
+    assert next_occurrence("2024-01-31", "09:00", "monthly", datetime(2024, 3, 1)) == "2024-03-31"
+    assert next_occurrence("2024-01-01", None, "weekly", datetime(2024, 1, 20)) == "2024-01-22"
+    assert next_occurrence("2024-01-01", None, "yearly", datetime(2024, 1, 20)) is None
+    print("✓ dates\n")
+
+
+async def main_async():
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            reminders = ReminderSystem(Path(tmp) / "reminders.db")
+            await test_held_until_a_client_connects(reminders)
+            await test_completed_while_waiting(reminders)
+            await test_repeating_moves_on(reminders)
+            await test_relayed_between_workers(reminders)
+            await test_retry_includes_new_entries(reminders)
+            test_next_occurrence()
+        except Exception as e:
+            print(f"\n❌ Test failed with error: {e}")
+            import traceback
+            traceback.print_exc()
+            return 1
+        finally:
+            close_all()
+
+    print("✅ Reminder scheduler tests passed")
+    return 0
+
+
+def main():
+    """Run the async main function"""
+    return asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,152 @@
+"""Test script for full-text search over conversations, reminders and todos"""
+
+import sys
+import sqlite3
+import tempfile
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.database import close_all, fts_match_query
+from nlp.reminder_system import ReminderSystem
+from nlp.search import HistorySearch, parse_search_request
+from user.profile import UserProfile
+
+
+def test_match_query():
+    """Free text becomes quoted words; FTS5 syntax in it is never interpreted"""
+    print("Test: MATCH expressions")
+    assert fts_match_query("Python decorators") == '"python" "decorators"'
+    assert fts_match_query('say "hi" OR bye*') == '"say" "hi" "or" "bye"'
+    assert fts_match_query("NEAR(a b) -c title:d ^e") == '"near" "a" "b" "c" "title" "d" "e"'
+    assert fts_match_query("  ?!  ") is None and fts_match_query("") is None
+
+    # Each expression is valid FTS5, whatever the input
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE VIRTUAL TABLE t USING fts5(body)")
+    conn.execute("INSERT INTO t VALUES ('or and not near')")
+    for text in ['"unbalanced', "a AND", "NOT", "(x", "x:y", "near*"]:
+        conn.execute("SELECT * FROM t WHERE t MATCH ?", (fts_match_query(text),)).fetchall()
+    conn.close()
+    print("✓ escaped\n")
+
+
+def test_parse_request():
+    """Chat requests give the search words and the sources to look in"""
+    print("Test: search requests")
+    assert parse_search_request("search my todos for paint") == ("paint", ("todos",))
+    assert parse_search_request("find tax forms in my tasks?") == ("tax forms", ("reminders", "todos"))
+    assert parse_search_request("what did i say about rust") == ("rust", ("conversations",))
+    assert parse_search_request("search history for decorators")[1] == ("conversations", "reminders", "todos")
+    assert parse_search_request("remind me to search for a new flat") is None
+    print("✓ parsed\n")
+
+
+def test_task_search(tasks: ReminderSystem):
+    """Stemmed matches, index kept in step with edits and deletes"""
+    print("Test: reminder and todo search")
+    paint = tasks.create_todo("Paint the fence", description="buy brushes and white paint")
+    tasks.create_todo("Book dentist", description="ask whether painting the hallway can wait")
+    reminder = tasks.create_reminder("Pay painter")
+    tasks.create_reminder("Dentist appointment")
+
+    results = tasks.search("painting", "todos")
+    assert [result["id"] for result in results][0] == paint, "best match not first"
+    assert len(results) == 2 and all(result["source"] == "todos" for result in results)
+    assert "**" in results[0]["snippet"] and results[0]["score"] > 0
+
+    assert [result["id"] for result in tasks.search("pay", "reminders")] == [reminder]
+    assert tasks.search("OR", "todos") == [] and tasks.search("", "todos") == []
+    assert len(tasks.search("paint", "todos", limit=1)) == 1
+    assert len(tasks.search("paint", "todos", limit=1, offset=1)) == 1
+
+    tasks.delete_todo(paint)
+    assert tasks.search("fence", "todos") == [], "deleted todo still indexed"
+    try:
+        tasks.search("paint", "notes")
+        raise AssertionError("unknown kind accepted")
+    except ValueError:
+        pass
+    print("✓ stemmed, ranked, in sync\n")
+
+
+def test_conversation_search(profile: UserProfile):
+    """Queued exchanges are searchable at once; pages don't overlap"""
+    print("Test: conversation search")
+    for i in range(12):
+        profile.save_conversation(f"question {i} about decorators", f"answer {i}")
+    profile.save_conversation("What's the weather?", "Sunny")
+
+    # Still in the write-behind queue: search flushes it first
+    results = profile.search_conversations("decorator", limit=5)
+    assert len(results) == 5 and all("decorators" in result["user"] for result in results)
+
+    ids = [result["id"] for offset in (0, 5, 10)
+           for result in profile.search_conversations("decorator", 5, offset)]
+    assert len(ids) == len(set(ids)) == 12, ids
+    assert profile.search_conversations("weather sunny")[0]["assistant"] == "Sunny"
+    assert profile.search_conversations("weather decorators") == []
+    print("✓ flushed, paged\n")
+
+
+def test_history_search(profile: UserProfile, tasks: ReminderSystem):
+    """Merged results page by score across every source"""
+    print("Test: searching everything")
+    search = HistorySearch(profile, tasks)
+    tasks.create_todo("Read about decorators")
+    tasks.create_reminder("Decorators talk at 6")
+
+    everything, offset = [], 0
+    while offset is not None:
+        page = search.search("decorators", limit=4, offset=offset)
+        everything += page["items"]
+        offset = page["next_offset"]
+    assert len(everything) == 14
+    assert {result["source"] for result in everything} == {"conversations", "reminders", "todos"}
+    assert len({(result["source"], result["id"]) for result in everything}) == 14, "pages overlap"
+    scores = [result["score"] for result in everything]
+    assert scores == sorted(scores, reverse=True)
+
+    only_todos = search.search("decorators", ["todos"])
+    assert [result["source"] for result in only_todos["items"]] == ["todos"]
+    assert only_todos["next_offset"] is None
+    text = search.format_results(only_todos["items"], start=3)
+    assert text.startswith("3. ☐ Todo #") and "**decorators**" in text.lower()
+
+    try:
+        search.search("decorators", ["emails"])
+        raise AssertionError("unknown source accepted")
+    except ValueError:
+        pass
+    print("✓ merged and paged\n")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        profile = None
+        try:
+            test_match_query()
+            test_parse_request()
+            tasks = ReminderSystem(Path(tmp) / "tasks.db")
+            test_task_search(tasks)
+            profile = UserProfile(Path(tmp) / "profile")
+            test_conversation_search(profile)
+            test_history_search(profile, tasks)
+        except Exception as e:
+            print(f"\n❌ Test failed with error: {e}")
+            import traceback
+            traceback.print_exc()
+            return 1
+        finally:
+            if profile:
+                profile.conversation_writer.close()
+            close_all()
+
+    print("✅ Search tests passed")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,145 @@
+"""Test script for conversation sessions: in-process and stored in SQLite"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.database import close_all
+from nlp.session import Session, SessionManager, SessionStore, MAX_HISTORY, HISTORY_TRIM
+
+
+def test_lru_eviction():
+    """Past max_sessions, the least recently used session goes first"""
+    print("Test: LRU eviction")
+    sessions = SessionManager(max_sessions=3)
+    for session_id in ("a", "b", "c"):
+        sessions.get(session_id).context["id"] = session_id
+
+    sessions.get("a")  # now the most recently used
+    sessions.get("d")
+    assert len(sessions) == 3
+    assert sessions.get("a").context == {"id": "a"}, "recently used session evicted"
+    assert sessions.get("b").context == {}, "least recently used session kept"
+    print("✓ least recently used evicted\n")
+
+
+def test_ttl_expiry():
+    """Sessions idle longer than the TTL are dropped on the next lookup"""
+    print("Test: idle expiry")
+    sessions = SessionManager(ttl=0.2)
+    sessions.get("idle").message_count = 4
+    time.sleep(0.1)
+    sessions.get("active").message_count = 1
+    time.sleep(0.15)
+
+    sessions.get("active")
+    assert len(sessions) == 1, "idle session not expired"
+    assert sessions.get("active").message_count == 1
+    assert sessions.get("idle").message_count == 0
+
+    sessions.end("active")
+    sessions.end("never-created")
+    assert len(sessions) == 1
+    print("✓ expired after the TTL, ending is idempotent\n")
+
+
+def test_store_round_trip(tmp: Path):
+    """Stored sessions come back with their state; any manager can serve them"""
+    print("Test: session store")
+    store = SessionStore(tmp / "sessions.db")
+    # Two workers sharing one store
+    first, second = SessionManager(store=store), SessionManager(store=store)
+
+    session = first.get("alice")
+    session.add_message("user", "hi")
+    session.pending_question = "What do you do?"
+    session.message_count = 3
+    first.save(session)
+
+    loaded = second.get("alice")
+    assert loaded is not session
+    assert loaded.conversation_history == [{"role": "user", "content": "hi"}]
+    assert loaded.pending_question == "What do you do?" and loaded.message_count == 3
+    assert len(second) == 1
+
+    second.end("alice")
+    assert store.load("alice") is None and len(first) == 0
+    print("✓ saved, loaded elsewhere, deleted\n")
+
+
+def test_attached_sessions(tmp: Path):
+    """A connection's session stays in process until it disconnects"""
+    print("Test: attached sessions")
+    store = SessionStore(tmp / "attached.db")
+    sessions = SessionManager(store=store)
+    saves = []
+    save = store.save
+    store.save = lambda session, ttl: (saves.append(session.session_id), save(session, ttl))
+
+    session = sessions.attach("bob")
+    for i in range(5):
+        turn = sessions.get("bob")
+        assert turn is session, "attached session re-read from the store"
+        turn.add_message("user", f"message {i}")
+        sessions.save(turn)
+    assert saves == [], "attached session written per message"
+
+    # A second connection to the same session keeps it attached
+    sessions.attach("bob")
+    sessions.detach("bob")
+    assert saves == []
+    sessions.detach("bob")
+    assert saves == ["bob"]
+    assert len(store.load("bob").conversation_history) == 5
+
+    # Sessions that can't be resumed are dropped without touching the store
+    sessions.attach("ws-temporary")
+    sessions.detach("ws-temporary", keep=False)
+    assert store.load("ws-temporary") is None and saves == ["bob"]
+    print("✓ written back once on disconnect\n")
+
+
+def test_session_history_limit():
+    """Conversation history drops its oldest messages a block at a time"""
+    print("Test: session history limit")
+    session = Session("carol")
+    starts = []
+    for i in range(50):
+        session.add_message("user", str(i))
+        starts.append(session.conversation_history[0]["content"])
+        assert len(session.conversation_history) <= MAX_HISTORY + HISTORY_TRIM
+        assert len(session.conversation_history) >= min(i + 1, MAX_HISTORY)
+
+    # The start only moves when a block is dropped, and always by a whole block
+    assert sorted(set(starts), key=int) == ["0", "10", "20"], set(starts)
+    assert len(session.conversation_history) == 30
+    print("✓ trimmed in blocks\n")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            test_lru_eviction()
+            test_ttl_expiry()
+            test_store_round_trip(Path(tmp))
+            test_attached_sessions(Path(tmp))
+            test_session_history_limit()
+        except Exception as e:
+            print(f"\n❌ Test failed with error: {e}")
+            import traceback
+            traceback.print_exc()
+            return 1
+        finally:
+            close_all()
+
+    print("✅ Session tests passed")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
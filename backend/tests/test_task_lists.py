@@ -0,0 +1,198 @@
+"""Test script for reminder and todo listings (keyset pages) and bulk operations"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.database import close_all
+from nlp.reminder_system import ReminderSystem, PRIORITY_RANKS, NO_DUE_DATE
+
+PRIORITIES = ["low", "high", "medium", "someday"]
+DATES = ["2024-03-02", None, "2024-03-01"]
+
+
+def listing_key(item: dict) -> tuple:
+    """The listing order: priority, due date (undated last), id"""
+    return (PRIORITY_RANKS.get(item["priority"], 4), item["due_date"] or NO_DUE_DATE, item["id"])
+
+
+def fill(tasks: ReminderSystem, count: int = 30):
+    """Reminders and todos with many (priority, due date) ties"""
+    for i in range(count):
+        priority, due_date = PRIORITIES[i % 4], DATES[i % 3]
+        tasks.create_reminder(f"reminder {i}", due_date=due_date, due_time="10:00", priority=priority)
+        tasks.create_todo(f"todo {i}", priority=priority, category="work" if i % 2 else "home",
+                          due_date=due_date)
+
+
+def ids(items: list) -> list:
+    return [item["id"] for item in items]
+
+
+def test_pages_follow_listing_order(tasks: ReminderSystem):
+    """Pages cover every item once, in listing order, across tied keys"""
+    print("Test: keyset pages")
+    expected = sorted(tasks.get_reminders("all"), key=listing_key)
+    assert ids(tasks.get_reminders("all")) == ids(expected)
+
+    for page_size in (1, 4, 7, 30, 50):
+        seen, cursor = [], None
+        while True:
+            page = tasks.get_reminders_page("all", page_size, cursor)
+            assert len(page["items"]) <= page_size
+            seen += ids(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == ids(expected), f"page size {page_size}: {seen}"
+
+    # A full last page has no next cursor
+    assert tasks.get_reminders_page("all", 30)["next_cursor"] is None
+    print("✓ every item once, in order\n")
+
+
+def test_filtered_pages(tasks: ReminderSystem):
+    """Filters apply on every page"""
+    print("Test: filtered pages")
+    expected = sorted((todo for todo in tasks.get_todos("all") if todo["category"] == "work"),
+                      key=listing_key)
+    seen, cursor = [], None
+    while True:
+        page = tasks.get_todos_page("all", "work", 4, cursor)
+        seen += ids(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ids(expected) and len(seen) == 15
+    print("✓ category filter kept\n")
+
+
+def test_pages_stable_under_changes(tasks: ReminderSystem):
+    """Items added or removed before the cursor don't shift the next page"""
+    print("Test: changes between pages")
+    first = tasks.get_todos_page("pending", None, 5)
+    before = tasks.get_todos_page("pending", None, 5, first["next_cursor"])
+
+    # A new item sorting first, and the page's last item deleted
+    tasks.create_todo("urgent", priority="high", due_date="2000-01-01")
+    tasks.delete_todo(first["items"][-1]["id"])
+
+    after = tasks.get_todos_page("pending", None, 5, first["next_cursor"])
+    assert ids(after["items"]) == ids(before["items"]), "page moved"
+
+    try:
+        tasks.get_todos_page("pending", None, 5, "not-a-cursor")
+        raise AssertionError("malformed cursor accepted")
+    except ValueError:
+        pass
+    print("✓ no repeats or gaps, bad cursors rejected\n")
+
+
+def test_iter_pages(tasks: ReminderSystem):
+    """iter_*_pages yields every page until the listing ends"""
+    print("Test: page iterators")
+    pages = list(tasks.iter_reminder_pages("pending", page_size=8))
+    assert [len(page) for page in pages] == [8, 8, 8, 6]
+    assert [item["id"] for page in pages for item in page] == ids(tasks.get_reminders("pending"))
+
+    todo_pages = list(tasks.iter_todo_pages("pending", page_size=100))
+    assert len(todo_pages) == 1 and len(todo_pages[0]) == len(tasks.get_todos("pending"))
+    assert list(tasks.iter_todo_pages("completed")) == [], "empty listing yielded a page"
+    print("✓ iterated\n")
+
+
+def test_bulk_reminders(tmp: Path):
+    """Bulk completes and deletes skip missing ids and tell listeners once per reminder"""
+    print("Test: bulk reminder operations")
+    tasks = ReminderSystem(tmp / "bulk_reminders.db")
+    events = []
+    tasks.add_listener(lambda event, reminder_id, reminder: events.append((event, reminder_id)))
+
+    created = tasks.import_reminders([
+        {"title": "water plants", "due_date": "2024-05-01", "due_time": "08:30", "recurring": "daily"},
+        {"title": "call mum", "priority": "high"},
+        {"title": "pay rent", "due_date": "2024-05-01"},
+    ])
+    assert len(created) == 3 and created == sorted(created)
+    assert events == [("created", reminder_id) for reminder_id in created]
+    stored = {reminder["id"]: reminder for reminder in tasks.get_reminders("all")}
+    assert stored[created[0]]["due_time"] == "08:30" and stored[created[1]]["priority"] == "high"
+    assert stored[created[2]]["due_at"] is not None, "due_at not computed on import"
+
+    events.clear()
+    first, second, third = created
+    assert tasks.complete_reminders([third, 999, first, third]) == [third, first]
+    assert events == [("completed", third), ("completed", first)]
+    assert ids(tasks.get_reminders("pending")) == [second]
+
+    events.clear()
+    assert tasks.delete_reminders([998, second]) == [second]
+    assert tasks.delete_reminders([998, second]) == []
+    assert tasks.complete_reminders([]) == []
+    assert events == [("deleted", second)]
+    assert tasks.import_reminders([]) == []
+    assert tasks.get_stats()["reminders"] == {"pending": 0, "completed": 2}, "stats not refreshed"
+    print("✓ missing ids skipped, listeners told\n")
+
+
+def test_bulk_todos(tmp: Path):
+    """Imported todos keep their tags; bulk deletes remove the tags too"""
+    print("Test: bulk todo operations")
+    tasks = ReminderSystem(tmp / "bulk_todos.db")
+    created = tasks.import_todos([
+        {"title": "draft report", "category": "work", "tags": ["q2", " writing "]},
+        {"title": "review report", "category": "work", "tags": ["q2"]},
+        {"title": "buy paint", "category": "home"},
+        {"title": "fix shelf", "category": "home", "tags": ["diy"]},
+    ])
+    todos = {todo["id"]: todo for todo in tasks.get_todos("all")}
+    assert sorted(todos[created[0]]["tags"]) == ["q2", "writing"]
+
+    assert tasks.complete_todos_where(tag="q2") == 2
+    assert tasks.complete_todos_where(tag="q2") == 0, "completed todos counted again"
+    assert tasks.complete_todos_where(tag="diy", category="work") == 0
+    assert tasks.complete_todos_where(category="home") == 2
+    try:
+        tasks.complete_todos_where()
+        raise AssertionError("completed every todo without a filter")
+    except ValueError:
+        pass
+    assert tasks.get_todos("pending") == []
+
+    assert tasks.delete_todos([created[0], 12345, created[3]]) == [created[0], created[3]]
+    with tasks.db.transaction() as cursor:
+        cursor.execute("SELECT DISTINCT todo_id FROM tags")
+        assert [row[0] for row in cursor.fetchall()] == [created[1]], "tags left behind"
+    assert tasks.complete_todos([created[0], created[1]]) == [created[1]]
+    print("✓ tags imported and removed, filters required\n")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            tasks = ReminderSystem(Path(tmp) / "tasks.db")
+            fill(tasks)
+            test_pages_follow_listing_order(tasks)
+            test_filtered_pages(tasks)
+            test_pages_stable_under_changes(tasks)
+            test_iter_pages(tasks)
+            test_bulk_reminders(Path(tmp))
+            test_bulk_todos(Path(tmp))
+        except Exception as e:
+            print(f"\n❌ Test failed with error: {e}")
+            import traceback
+            traceback.print_exc()
+            return 1
+        finally:
+            close_all()
+
+    print("✅ Task list tests passed")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,102 @@
+"""Test script for multi-worker mode: leader election and shared user memory"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.database import close_all
+from core.leader import LeaderLock
+from user.profile import UserProfile
+from user.memory import UserMemory
+
+
+def test_leader_lock(tmp: Path):
+    """Only one holder at a time; another takes over once it's released"""
+    print("Test: leader lock")
+    first, second = LeaderLock(tmp / "leader.lock"), LeaderLock(tmp / "leader.lock")
+
+    assert first.try_acquire() and first.held
+    assert not second.try_acquire(), "two leaders at once"
+    assert first.try_acquire(), "re-acquiring should be a no-op"
+
+    first.release()
+    assert not first.held
+    assert second.try_acquire(), "no takeover after the leader left"
+    second.release()
+    print("✓ single leader, takeover after release\n")
+
+
+def count_write_locks(profile: UserProfile) -> list:
+    """Record every write-locked (immediate) transaction on the profile database"""
+    taken = []
+    transaction = profile.db.transaction
+
+    def counting(immediate: bool = False):
+        if immediate:
+            taken.append(1)
+        return transaction(immediate=immediate)
+
+    profile.db.transaction = counting
+    return taken
+
+
+def test_shared_memory(tmp: Path):
+    """Workers learn without the write lock per message and merge at sync"""
+    print("Test: shared user memory")
+    profile = UserProfile(tmp / "memory")
+    # One UserMemory per worker process
+    first = UserMemory(profile, checkpoint_interval=3600, shared=True)
+    second = UserMemory(profile, checkpoint_interval=3600, shared=True)
+    write_locks = count_write_locks(profile)
+
+    for _ in range(10):
+        with first.synchronized():
+            first.analyze_message("can you debug this python code")
+        with second.synchronized():
+            second.analyze_message("let's watch a movie tonight")
+    assert write_locks == [], "messages took the write lock"
+
+    first.save_memory()
+    second.save_memory()
+    assert len(write_locks) == 2
+
+    merged = UserMemory(profile, shared=True)
+    assert merged.total_messages == 20, "a worker's messages were lost"
+    assert merged.interests["programming"] == 10 and merged.interests["entertainment"] == 10
+
+    # New facts are synced right away and picked up by the other worker
+    with first.synchronized():
+        first.analyze_message("my name is alice")
+    with second.synchronized():
+        assert second.user_facts.get("name") == "Alice"
+    assert second.total_messages == 21
+
+    second.forget_user_data()
+    with first.synchronized():
+        assert first.user_facts == {} and first.interests == {}
+    print("✓ merged without per-message locking\n")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            test_leader_lock(Path(tmp))
+            test_shared_memory(Path(tmp))
+        except Exception as e:
+            print(f"\n❌ Test failed with error: {e}")
+            import traceback
+            traceback.print_exc()
+            return 1
+        finally:
+            close_all()
+
+    print("✅ Worker tests passed")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,362 @@
+"""
+Conversation Archive
+Compressed chunks of old conversation history, kept out of the
+main profile database, and the background task that moves history there
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.logger import setup_logger
+from core.database import get_database, FTS_TOKENIZER
+
+logger = setup_logger("ConversationArchive")
+
+# Writes are rare and reads decompress a whole chunk, so favour ratio
+COMPRESSION_LEVEL = 9
+
+# Exchanges per compressed chunk: bounds the work of one append and of
+# reading one page of old history
+CHUNK_ROWS = 1000
+
+# Decompressed chunks kept in memory for paging through old history
+CHUNK_CACHE_SIZE = 4
+
+
+def _key(row: Sequence) -> Tuple[str, int]:
+    """Sort key of an archived row: (timestamp, id)"""
+    return (row[3] or "", row[0])
+
+
+class ConversationArchive:
+    """
+    Archived conversations in zlib-compressed JSON chunks
+
+    Each month's rows are split into chunks of at most CHUNK_ROWS, in
+    (timestamp, id) order and never overlapping. Appending fills up the
+    month's last chunk and then starts new ones, so the work per batch stays
+    bounded however large the month grows. Only rows older than what a chunk
+    already holds (rare: compaction moves history oldest first) make the
+    chunks they fall into be rewritten.
+
+    Rows keep their original id and timestamp, so history reads can carry
+    on from the live table into the archive in the same order. Archiving
+    the same row twice (say, after a crash between archiving and deleting
+    it from the live table) stores it once.
+
+    Archived text is also indexed for full-text search (rowid = the
+    original id), so searches still find exchanges after they leave the live
+    table. The index is contentless: matched rows are read back from their
+    chunks, and only the text stays compressed.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db = get_database(db_path)
+        # (chunk id, rows) -> decompressed rows; rewritten chunks get new ids
+        self._cache: "OrderedDict[Tuple[int, int], List[list]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        with self.db.transaction(immediate=True) as cursor:
+            # AUTOINCREMENT: ids of rewritten chunks are never reused
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    month TEXT NOT NULL,
+                    rows INTEGER NOT NULL,
+                    first_timestamp TEXT NOT NULL,
+                    first_id INTEGER NOT NULL,
+                    last_timestamp TEXT NOT NULL,
+                    last_id INTEGER NOT NULL,
+                    data BLOB NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_chunks_month ON chunks(month, last_timestamp, last_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_chunks_last ON chunks(last_timestamp, last_id)")
+            # Archived rows' keys, to skip rows archived twice and to find a
+            # search match's chunk
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS archived_rows (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL
+                )
+            """)
+            # Same tokenizer as the live conversations_fts, so queries match alike
+            cursor.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS archive_fts USING fts5(
+                    user_input, assistant_response, content='', tokenize='{FTS_TOKENIZER}'
+                )
+            """)
+
+    def append(self, rows: Sequence[Sequence]) -> int:
+        """
+        Add conversation rows to their months' chunks
+
+        Args:
+            rows: (id, user_input, assistant_response, timestamp) tuples
+
+        Returns:
+            Number of rows that weren't archived already
+        """
+        added = 0
+        with self.db.transaction(immediate=True) as cursor:
+            by_month: Dict[str, List[list]] = {}
+            for row in rows:
+                cursor.execute("INSERT OR IGNORE INTO archived_rows (id, timestamp) VALUES (?, ?)",
+                               (row[0], row[3] or ""))
+                if cursor.rowcount:
+                    by_month.setdefault((row[3] or "")[:7], []).append(list(row))
+
+            cursor.executemany(
+                "INSERT INTO archive_fts (rowid, user_input, assistant_response) VALUES (?, ?, ?)",
+                [row[:3] for fresh in by_month.values() for row in fresh]
+            )
+
+            for month, fresh in by_month.items():
+                fresh.sort(key=_key)
+                first_timestamp, first_id = _key(fresh[0])
+                # The month's last chunk if it has room, and any chunk that
+                # the new rows reach back into
+                cursor.execute("""
+                    SELECT id, data FROM chunks
+                    WHERE month = ? AND (
+                        last_timestamp > ? OR (last_timestamp = ? AND last_id > ?)
+                        OR (rows < ? AND id = (SELECT id FROM chunks WHERE month = ?
+                                               ORDER BY last_timestamp DESC, last_id DESC LIMIT 1))
+                    )
+                """, (month, first_timestamp, first_timestamp, first_id, CHUNK_ROWS, month))
+                rewritten = cursor.fetchall()
+
+                merged = fresh
+                if rewritten:
+                    merged = [row for _, data in rewritten for row in self._decode(data)] + fresh
+                    merged.sort(key=_key)
+                    cursor.executemany("DELETE FROM chunks WHERE id = ?", [(chunk_id,) for chunk_id, _ in rewritten])
+                self._insert_chunks(cursor, month, merged)
+                added += len(fresh)
+
+        return added
+
+    def _insert_chunks(self, cursor, month: str, rows: List[list]):
+        """Store rows (sorted, non-empty) as chunks of at most CHUNK_ROWS"""
+        for start in range(0, len(rows), CHUNK_ROWS):
+            chunk = rows[start:start + CHUNK_ROWS]
+            first, last = _key(chunk[0]), _key(chunk[-1])
+            cursor.execute("""
+                INSERT INTO chunks (month, rows, first_timestamp, first_id, last_timestamp, last_id, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (month, len(chunk), first[0], first[1], last[0], last[1], self._encode(chunk)))
+
+    def history(self, limit: int, before: Optional[Tuple[str, int]] = None) -> List[Dict[str, Any]]:
+        """
+        Archived exchanges, newest first
+
+        Args:
+            limit: Maximum number of exchanges
+            before: Only exchanges older than this (timestamp, id)
+
+        Returns:
+            Exchanges in the same form as UserProfile.get_conversation_page()
+        """
+        with self.db.transaction() as cursor:
+            if before is None:
+                cursor.execute("SELECT id, rows FROM chunks ORDER BY last_timestamp DESC, last_id DESC")
+            else:
+                # Chunks don't overlap, so only those starting before the
+                # cursor hold older rows
+                cursor.execute("""
+                    SELECT id, rows FROM chunks
+                    WHERE first_timestamp < ? OR (first_timestamp = ? AND first_id < ?)
+                    ORDER BY last_timestamp DESC, last_id DESC
+                """, (before[0], before[0], before[1]))
+            chunks = cursor.fetchall()
+
+        items = []
+        for chunk_id, count in chunks:
+            for row in reversed(self._chunk(chunk_id, count)):
+                if before is not None and _key(row) >= before:
+                    continue
+                items.append({"id": row[0], "user": row[1], "assistant": row[2], "timestamp": row[3]})
+                if len(items) >= limit:
+                    return items
+        return items
+
+    def search(self, match: str, limit: int, window: int, snippet_words: int) -> List[Dict[str, Any]]:
+        """
+        Full-text search of archived exchanges, best matches first
+
+        Args:
+            match: FTS5 MATCH expression (from fts_match_query)
+            limit: Maximum number of results
+            window: Rank only this many of the newest matches
+            snippet_words: Words of context around each match
+
+        Returns:
+            Matches in the same form as UserProfile.search_conversations()
+        """
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                WITH recent AS (
+                    SELECT rowid AS id, rank
+                    FROM archive_fts
+                    WHERE archive_fts MATCH ?1
+                    ORDER BY rowid DESC
+                    LIMIT ?3
+                )
+                SELECT r.id, r.rank, a.timestamp
+                FROM recent r
+                JOIN archived_rows a ON a.id = r.id
+                ORDER BY r.rank, r.id DESC
+                LIMIT ?2
+            """, (match, limit, window))
+            hits = cursor.fetchall()
+
+        rows = {}
+        for row_id, _, timestamp in hits:
+            row = self._find_row(row_id, timestamp)
+            if row is not None:
+                rows[row_id] = row
+        snippets = self._snippets(match, list(rows.values()), snippet_words)
+
+        return [
+            {
+                "source": "conversations",
+                "id": row_id,
+                "user": rows[row_id][1],
+                "assistant": rows[row_id][2],
+                "timestamp": rows[row_id][3],
+                "snippet": snippets.get(row_id, ""),
+                "score": -rank
+            }
+            for row_id, rank, _ in hits
+            if row_id in rows
+        ]
+
+    def _find_row(self, row_id: int, timestamp: str) -> Optional[list]:
+        """An archived row, read from the chunk that holds its (timestamp, id)"""
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                SELECT id, rows FROM chunks
+                WHERE (last_timestamp, last_id) >= (?, ?)
+                ORDER BY last_timestamp, last_id
+                LIMIT 1
+            """, (timestamp, row_id))
+            chunk = cursor.fetchone()
+        if chunk is None:
+            return None
+        return next((row for row in self._chunk(*chunk) if row[0] == row_id), None)
+
+    @staticmethod
+    def _snippets(match: str, rows: List[list], snippet_words: int) -> Dict[int, str]:
+        """
+        Highlighted snippets for a page of matched rows
+
+        A contentless index can't build snippets, so the page's rows are
+        indexed again in memory with the same tokenizer.
+        """
+        if not rows:
+            return {}
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE page USING fts5(
+                    user_input, assistant_response, tokenize='{FTS_TOKENIZER}'
+                )
+            """)
+            conn.executemany("INSERT INTO page (rowid, user_input, assistant_response) VALUES (?, ?, ?)",
+                             [row[:3] for row in rows])
+            return dict(conn.execute(
+                "SELECT rowid, snippet(page, -1, '**', '**', '…', ?) FROM page WHERE page MATCH ?",
+                (snippet_words, match)
+            ).fetchall())
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Chunk count, archived rows and compressed size"""
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                SELECT COUNT(*), COALESCE(SUM(rows), 0), COALESCE(SUM(LENGTH(data)), 0),
+                    MIN(first_timestamp)
+                FROM chunks
+            """)
+            chunks, rows, size, oldest = cursor.fetchone()
+        return {"chunks": chunks, "rows": rows, "compressed_bytes": size, "oldest": oldest}
+
+    def _chunk(self, chunk_id: int, count: int) -> List[list]:
+        """Rows of one chunk, oldest first (from the cache when possible)"""
+        key = (chunk_id, count)
+        with self._cache_lock:
+            rows = self._cache.get(key)
+            if rows is not None:
+                self._cache.move_to_end(key)
+                return rows
+
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT data FROM chunks WHERE id = ?", (chunk_id,))
+            row = cursor.fetchone()
+        if row is None:
+            # Rewritten since the chunk list was read
+            return []
+        rows = self._decode(row[0])
+
+        with self._cache_lock:
+            self._cache[key] = rows
+            while len(self._cache) > CHUNK_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return rows
+
+    @staticmethod
+    def _encode(rows: List[list]) -> bytes:
+        return zlib.compress(json.dumps(rows, separators=(",", ":")).encode(), COMPRESSION_LEVEL)
+
+    @staticmethod
+    def _decode(data: bytes) -> List[list]:
+        return json.loads(zlib.decompress(data))
+
+
+class HistoryCompactor:
+    """Periodically archives old conversations and reclaims their space"""
+
+    def __init__(self, profile, hot_days: int, interval: float):
+        """
+        Args:
+            profile: UserProfile whose history is compacted
+            hot_days: Days of history kept in the main database
+            interval: Seconds between passes
+        """
+        self.profile = profile
+        self.hot_days = hot_days
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start compacting in the background on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"History compactor started (keeping {self.hot_days} days, every {self.interval}s)")
+
+    async def stop(self):
+        """Stop the background compactor"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """Compaction loop: one pass at startup, then every interval"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.profile.compact_history, self.hot_days)
+            except Exception as e:
+                logger.error(f"History compaction error: {e}")
+            await asyncio.sleep(self.interval)
@@ -5,21 +5,116 @@ Learns about user preferences, communication style, and personal information
 
 import re
 import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
-from collections import Counter
 
 from user.profile import UserProfile
+from user.phrase_stats import PhraseStats
 from core.logger import setup_logger
 
 logger = setup_logger("UserMemory")
 
+# Seconds between checkpoints of learned memory to the profile database
+CHECKPOINT_INTERVAL = 30.0
+
+# Shared mode: sync early once this many messages are waiting to be merged
+MAX_UNSYNCED = 200
+
+# Preference bumped by every shared-mode sync, so workers notice each other's
+REVISION_KEY = "memory_revision"
+
+# Message analysis tables, compiled once at import
+CASUAL_PATTERNS = [
+    re.compile(r"\b(hey|hi|sup|yo|yeah|yep|nah|gonna|wanna|gotta)\b"),
+    re.compile(r"[!]{2,}"),  # Multiple exclamation marks
+    re.compile(r"\blol\b|\blmao\b|\bhaha\b"),
+]
+
+FORMAL_PATTERNS = [
+    re.compile(r"\b(greetings|please|thank you|could you|would you|sir|madam)\b"),
+    re.compile(r"\b(kindly|appreciate|grateful)\b"),
+]
+
+EMOJI_PATTERN = re.compile(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]')
+
+NAME_PATTERN = re.compile(r"(my name is|i'm|i am|call me) (\w+)")
+LOCATION_PATTERN = re.compile(r"(i live in|i'm from|located in) ([\w\s]+)")
+OCCUPATION_PATTERN = re.compile(r"(i work as|i am a|i'm a) ([\w\s]+)")
+LIKES_PATTERN = re.compile(r"i (like|love|enjoy|prefer) ([\w\s]+)")
+DISLIKES_PATTERN = re.compile(r"i (don't like|hate|dislike) ([\w\s]+)")
+
+# A topic matches when any of its keywords occurs anywhere in the message
+TOPIC_KEYWORDS = {
+    "programming": ["code", "program", "script", "python", "java", "javascript", "function", "debug"],
+    "work": ["work", "job", "office", "project", "meeting", "deadline", "boss"],
+    "technology": ["computer", "system", "software", "hardware", "tech", "ai", "ml"],
+    "personal": ["i am", "i like", "i love", "i want", "my", "me"],
+    "entertainment": ["movie", "game", "music", "video", "watch", "play"],
+    "learning": ["learn", "study", "teach", "tutorial", "course", "understand"],
+    "health": ["exercise", "health", "fitness", "sleep", "diet"],
+    "hobbies": ["hobby", "interest", "enjoy", "fun", "leisure"],
+}
+
+
+def _trie_regex(trie: Dict[str, Any]) -> str:
+    """Regex for the words in a character trie; longer words are preferred"""
+    alternatives = [re.escape(char) + _trie_regex(child) for char, child in sorted(trie.items()) if char]
+    if not alternatives:
+        return ""
+    body = alternatives[0] if len(alternatives) == 1 else f"(?:{'|'.join(alternatives)})"
+    # A word ends here: the longer continuations are optional (and tried first)
+    return f"(?:{body})?" if "" in trie else body
+
+
+def _build_topic_scanner(topic_keywords: Dict[str, List[str]]):
+    """
+    Compile all topic keywords into a single-pass scanner
+    
+    The keywords form a trie compiled into one regex, tried at every
+    position through a lookahead, so one finditer finds every occurrence
+    (an Aho-Corasick style scan done by the regex engine). At each position
+    it reports the longest keyword; every shorter keyword matching there
+    is a prefix of it, so each keyword maps to the topics of its prefixes.
+    
+    Returns:
+        Tuple of (compiled pattern, keyword -> set of topics)
+    """
+    keyword_topics: Dict[str, set] = {}
+    for topic, keywords in topic_keywords.items():
+        for keyword in keywords:
+            keyword_topics.setdefault(keyword, set()).add(topic)
+    
+    trie: Dict[str, Any] = {}
+    for keyword in keyword_topics:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    pattern = re.compile(f"(?=({_trie_regex(trie)}))")
+    topics = {
+        keyword: set().union(*(keyword_topics[prefix] for prefix in keyword_topics if keyword.startswith(prefix)))
+        for keyword in keyword_topics
+    }
+    return pattern, topics
+
+
+TOPIC_PATTERN, KEYWORD_TOPICS = _build_topic_scanner(TOPIC_KEYWORDS)
+
 
 class UserMemory:
     """Advanced memory system that learns about the user"""
     
-    def __init__(self, profile: UserProfile):
+    def __init__(self, profile: UserProfile, checkpoint_interval: float = CHECKPOINT_INTERVAL,
+                 shared: bool = False):
         self.profile = profile
+        self.checkpoint_interval = checkpoint_interval
+        # Other processes update the same profile (multi-worker mode)
+        self.shared = shared
         self.session_data = {
             "topics_discussed": [],
             "communication_style": {},
@@ -29,9 +124,29 @@ class UserMemory:
         
         # Load persistent memory
         self._load_persistent_memory()
+        
+        # Fields changed since the last save, and when that save happened
+        self._dirty = set()
+        self._last_saved = time.monotonic()
+        
+        # Shared mode: messages learned from locally but not yet merged into
+        # the stored memory, and the stored revision they were learned on
+        self._unsynced: List[str] = []
+        self._revision = self.profile.get_preference(REVISION_KEY, 0) if shared else 0
+        
+        # Messages are analyzed on handler threads
+        self._lock = threading.RLock()
+        
+        # Don't lose learning that hasn't been checkpointed yet
+        atexit.register(self.save_memory)
     
     def _load_persistent_memory(self):
         """Load learned information from database"""
+        self._read_persistent_fields()
+        logger.info("User memory loaded")
+    
+    def _read_persistent_fields(self):
+        """Read the persisted memory fields from the profile"""
         self.user_facts = self.profile.get_preference("user_facts", {})
         self.interests = self.profile.get_preference("interests", {})
         self.communication_style = self.profile.get_preference("communication_style", {
@@ -39,181 +154,236 @@ class UserMemory:
             "verbosity": "medium",   # brief, medium, detailed
             "emoji_usage": False,
             "avg_message_length": 0,
-            "common_phrases": [],
             "preferred_greeting": "Hello"
         })
-        
-        logger.info("User memory loaded")
+        self.total_messages = self.profile.get_preference("total_messages", 0)
+        
+        stored_phrases = self.profile.get_preference("phrase_stats")
+        self.phrase_stats = PhraseStats.from_dict(stored_phrases or {})
+        # Older profiles kept a plain list of phrases in the communication style
+        legacy_phrases = self.communication_style.pop("common_phrases", None)
+        if legacy_phrases and stored_phrases is None:
+            self.phrase_stats.add_phrases(legacy_phrases)
+    
+    @contextmanager
+    def synchronized(self):
+        """
+        Make learning in the block safe against other threads and processes
+        
+        The block holds this memory's lock. In shared mode, memory is first
+        brought up to date with what other workers have synced (one small
+        read unless something changed), and new user facts are synced right
+        away so every worker can answer from them. Everything else is
+        merged into the stored memory at checkpoints, see _sync().
+        """
+        with self._lock:
+            if self.shared:
+                self._refresh()
+            yield
+            if self.shared and "user_facts" in self._dirty:
+                self._sync()
+    
+    def _refresh(self):
+        """Shared mode: pick up another worker's sync, keeping our unsynced learning on top"""
+        revision = self.profile.get_preference(REVISION_KEY, 0)
+        if revision == self._revision:
+            return
+        self._read_persistent_fields()
+        for message in self._unsynced:
+            self._learn(message)
+        self._revision = revision
+    
+    def _sync(self):
+        """
+        Shared mode: merge unsynced messages into the stored memory
+        
+        Under the profile's write lock, the stored fields are re-read and
+        the unsynced messages replayed on top, so updates other workers
+        made meanwhile are kept; only the fields this changed are written.
+        """
+        with self.profile.db.transaction(immediate=True):
+            self._read_persistent_fields()
+            self._dirty.clear()
+            for message in self._unsynced:
+                self._learn(message)
+            self._revision = self.profile.get_preference(REVISION_KEY, 0) + 1
+            self._write_fields(self._dirty, {REVISION_KEY: self._revision})
+        self._unsynced.clear()
+        self._dirty.clear()
+    
+    def _write_fields(self, fields, extra: Optional[Dict[str, Any]] = None):
+        """Store the given memory fields (and any extra preferences) in one transaction"""
+        values = {field: getattr(self, field) for field in fields}
+        if "phrase_stats" in values:
+            values["phrase_stats"] = self.phrase_stats.to_dict()
+        values.update(extra or {})
+        if values:
+            self.profile.set_preferences(values)
+    
+    def _set_style(self, key: str, value: Any):
+        """Update a communication style value, marking it dirty only if it changed"""
+        if self.communication_style.get(key) != value:
+            self.communication_style[key] = value
+            self._dirty.add("communication_style")
     
     def analyze_message(self, message: str):
         """Analyze user message to learn communication patterns"""
         self.session_data["interaction_count"] += 1
         
+        topics = self._learn(message)
+        self.session_data["topics_discussed"].extend(topics)
+        
+        if self.shared:
+            self._unsynced.append(message)
+            if len(self._unsynced) >= MAX_UNSYNCED:
+                self._sync()
+    
+    def _learn(self, message: str) -> List[str]:
+        """
+        Update the persistent memory fields from one message
+        
+        Returns:
+            The topics found in the message
+        """
+        # Lowercase and split once for all of the analyzers below
+        message_lower = message.lower()
+        words = message_lower.split()
+        
         # Analyze message length
-        msg_length = len(message.split())
-        self._update_avg_message_length(msg_length)
+        self._update_avg_message_length(len(words))
         
         # Detect communication style
-        self._detect_formality(message)
+        self._detect_formality(message_lower)
         self._detect_emoji_usage(message)
-        self._extract_common_phrases(message)
+        self._extract_common_phrases(words)
         
         # Extract topics
-        topics = self._extract_topics(message)
-        self.session_data["topics_discussed"].extend(topics)
+        topics = self._extract_topics(message_lower)
         
         # Learn about user interests
         self._update_interests(topics)
         
         # Extract potential personal facts
-        self._extract_user_facts(message)
+        self._extract_user_facts(message_lower)
+        return topics
     
     def _update_avg_message_length(self, new_length: int):
         """Update running average of message length"""
         current_avg = self.communication_style.get("avg_message_length", 0)
-        total_messages = self.profile.get_preference("total_messages", 0) + 1
+        self.total_messages += 1
+        self._dirty.add("total_messages")
         
-        new_avg = ((current_avg * (total_messages - 1)) + new_length) / total_messages
-        self.communication_style["avg_message_length"] = round(new_avg, 2)
+        new_avg = ((current_avg * (self.total_messages - 1)) + new_length) / self.total_messages
+        self._set_style("avg_message_length", round(new_avg, 2))
         
         # Update verbosity based on average length
         if new_avg < 5:
-            self.communication_style["verbosity"] = "brief"
+            self._set_style("verbosity", "brief")
         elif new_avg > 15:
-            self.communication_style["verbosity"] = "detailed"
+            self._set_style("verbosity", "detailed")
         else:
-            self.communication_style["verbosity"] = "medium"
-        
-        self.profile.set_preference("total_messages", total_messages)
+            self._set_style("verbosity", "medium")
     
-    def _detect_formality(self, message: str):
+    def _detect_formality(self, message_lower: str):
         """Detect if user prefers formal or casual communication"""
-        casual_indicators = [
-            r"\b(hey|hi|sup|yo|yeah|yep|nah|gonna|wanna|gotta)\b",
-            r"[!]{2,}",  # Multiple exclamation marks
-            r"\blol\b|\blmao\b|\bhaha\b"
-        ]
-        
-        formal_indicators = [
-            r"\b(greetings|please|thank you|could you|would you|sir|madam)\b",
-            r"\b(kindly|appreciate|grateful)\b"
-        ]
-        
-        casual_score = sum(1 for pattern in casual_indicators if re.search(pattern, message.lower()))
-        formal_score = sum(1 for pattern in formal_indicators if re.search(pattern, message.lower()))
+        casual_score = sum(1 for pattern in CASUAL_PATTERNS if pattern.search(message_lower))
+        formal_score = sum(1 for pattern in FORMAL_PATTERNS if pattern.search(message_lower))
         
         if casual_score > formal_score:
-            self.communication_style["formality"] = "casual"
+            self._set_style("formality", "casual")
         elif formal_score > casual_score:
-            self.communication_style["formality"] = "formal"
+            self._set_style("formality", "formal")
         else:
-            self.communication_style["formality"] = "neutral"
+            self._set_style("formality", "neutral")
     
     def _detect_emoji_usage(self, message: str):
         """Detect if user uses emojis"""
-        emoji_pattern = r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]'
-        has_emoji = bool(re.search(emoji_pattern, message))
-        
-        if has_emoji:
-            self.communication_style["emoji_usage"] = True
+        if EMOJI_PATTERN.search(message):
+            self._set_style("emoji_usage", True)
     
-    def _extract_common_phrases(self, message: str):
+    def _extract_common_phrases(self, words: List[str]):
         """Track commonly used phrases"""
-        # Extract 2-3 word phrases
-        words = message.lower().split()
+        # Count 2-3 word phrases in bounded heavy-hitter sketches
         if len(words) >= 2:
-            bigrams = [' '.join(words[i:i+2]) for i in range(len(words)-1)]
-            
-            common_phrases = self.communication_style.get("common_phrases", [])
-            common_phrases.extend(bigrams)
-            
-            # Keep only most common phrases (top 20)
-            if len(common_phrases) > 50:
-                phrase_counts = Counter(common_phrases)
-                self.communication_style["common_phrases"] = [
-                    phrase for phrase, _ in phrase_counts.most_common(20)
-                ]
-            else:
-                self.communication_style["common_phrases"] = common_phrases
+            self.phrase_stats.add_words(words)
+            self._dirty.add("phrase_stats")
     
-    def _extract_topics(self, message: str) -> List[str]:
-        """Extract topics from message"""
-        topics = []
-        
-        topic_keywords = {
-            "programming": ["code", "program", "script", "python", "java", "javascript", "function", "debug"],
-            "work": ["work", "job", "office", "project", "meeting", "deadline", "boss"],
-            "technology": ["computer", "system", "software", "hardware", "tech", "ai", "ml"],
-            "personal": ["i am", "i like", "i love", "i want", "my", "me"],
-            "entertainment": ["movie", "game", "music", "video", "watch", "play"],
-            "learning": ["learn", "study", "teach", "tutorial", "course", "understand"],
-            "health": ["exercise", "health", "fitness", "sleep", "diet"],
-            "hobbies": ["hobby", "interest", "enjoy", "fun", "leisure"],
-        }
-        
-        message_lower = message.lower()
-        for topic, keywords in topic_keywords.items():
-            if any(keyword in message_lower for keyword in keywords):
-                topics.append(topic)
+    def get_common_phrases(self, limit: int = 20) -> List[str]:
+        """Get the user's most frequently used phrases"""
+        return [phrase for phrase, _ in self.phrase_stats.top(limit)]
+    
+    def _extract_topics(self, message_lower: str) -> List[str]:
+        """Extract topics from message (in TOPIC_KEYWORDS order)"""
+        found = set()
+        for match in TOPIC_PATTERN.finditer(message_lower):
+            found |= KEYWORD_TOPICS[match.group(1)]
         
-        return topics
+        return [topic for topic in TOPIC_KEYWORDS if topic in found]
     
     def _update_interests(self, topics: List[str]):
         """Update user interests based on discussed topics"""
         for topic in topics:
             self.interests[topic] = self.interests.get(topic, 0) + 1
+        if topics:
+            self._dirty.add("interests")
         
         # Keep track of top interests
         if len(self.interests) > 0:
             sorted_interests = sorted(self.interests.items(), key=lambda x: x[1], reverse=True)
-            logger.info(f"Top user interests: {sorted_interests[:3]}")
+            logger.debug(f"Top user interests: {sorted_interests[:3]}")
     
-    def _extract_user_facts(self, message: str):
+    def _extract_user_facts(self, message_lower: str):
         """Extract personal facts about the user"""
-        message_lower = message.lower()
-        
         # Extract name
-        name_match = re.search(r"(my name is|i'm|i am|call me) (\w+)", message_lower)
+        name_match = NAME_PATTERN.search(message_lower)
         if name_match:
             name = name_match.group(2).capitalize()
-            self.user_facts["name"] = name
+            self._set_fact("name", name)
             self.profile.user_name = name
             logger.info(f"Learned user name: {name}")
         
         # Extract location
-        location_match = re.search(r"(i live in|i'm from|located in) ([\w\s]+)", message_lower)
+        location_match = LOCATION_PATTERN.search(message_lower)
         if location_match:
             location = location_match.group(2).strip()
-            self.user_facts["location"] = location
+            self._set_fact("location", location)
             logger.info(f"Learned user location: {location}")
         
         # Extract occupation
-        occupation_match = re.search(r"(i work as|i am a|i'm a) ([\w\s]+)", message_lower)
+        occupation_match = OCCUPATION_PATTERN.search(message_lower)
         if occupation_match:
             occupation = occupation_match.group(2).strip()
-            self.user_facts["occupation"] = occupation
+            self._set_fact("occupation", occupation)
             logger.info(f"Learned user occupation: {occupation}")
         
         # Extract likes/preferences
-        likes_match = re.search(r"i (like|love|enjoy|prefer) ([\w\s]+)", message_lower)
+        likes_match = LIKES_PATTERN.search(message_lower)
         if likes_match:
             liked_thing = likes_match.group(2).strip()
             likes = self.user_facts.get("likes", [])
             if liked_thing not in likes:
                 likes.append(liked_thing)
                 self.user_facts["likes"] = likes
+                self._dirty.add("user_facts")
                 logger.info(f"Learned user likes: {liked_thing}")
         
         # Extract dislikes
-        dislikes_match = re.search(r"i (don't like|hate|dislike) ([\w\s]+)", message_lower)
+        dislikes_match = DISLIKES_PATTERN.search(message_lower)
         if dislikes_match:
             disliked_thing = dislikes_match.group(2).strip()
             dislikes = self.user_facts.get("dislikes", [])
             if disliked_thing not in dislikes:
                 dislikes.append(disliked_thing)
                 self.user_facts["dislikes"] = dislikes
+                self._dirty.add("user_facts")
                 logger.info(f"Learned user dislikes: {disliked_thing}")
     
+    def _set_fact(self, key: str, value: Any):
+        """Record a user fact, marking it dirty only if it changed"""
+        if self.user_facts.get(key) != value:
+            self.user_facts[key] = value
+            self._dirty.add("user_facts")
+    
     def get_personalized_greeting(self) -> str:
         """Get personalized greeting based on learned preferences"""
         formality = self.communication_style.get("formality", "neutral")
@@ -237,6 +407,7 @@ class UserMemory:
             "verbosity": self.communication_style.get("verbosity", "medium"),
             "top_interests": sorted(self.interests.items(), key=lambda x: x[1], reverse=True)[:3],
             "known_facts": self.user_facts,
+            "common_phrases": self.get_common_phrases(5),
             "session_topics": list(set(self.session_data["topics_discussed"]))
         }
     
@@ -269,11 +440,25 @@ class UserMemory:
         
         return None
     
+    def checkpoint(self):
+        """Persist learned information if the checkpoint interval has elapsed"""
+        pending = self._unsynced if self.shared else self._dirty
+        if pending and time.monotonic() - self._last_saved >= self.checkpoint_interval:
+            self.save_memory()
+    
     def save_memory(self):
-        """Persist learned information to database"""
-        self.profile.set_preference("user_facts", self.user_facts)
-        self.profile.set_preference("interests", self.interests)
-        self.profile.set_preference("communication_style", self.communication_style)
+        """Persist changed learned information to database now"""
+        with self._lock:
+            self._last_saved = time.monotonic()
+            if self.shared:
+                if self._unsynced:
+                    self._sync()
+                return
+            if not self._dirty:
+                return
+            
+            self._write_fields(self._dirty)
+            self._dirty.clear()
         
         # Log learning summary
         logger.info(f"Memory saved - Known facts: {len(self.user_facts)}, Interests: {len(self.interests)}")
@@ -316,15 +501,26 @@ class UserMemory:
     
     def forget_user_data(self):
         """Clear all learned user data (privacy feature)"""
-        self.user_facts = {}
-        self.interests = {}
-        self.communication_style = {
-            "formality": "neutral",
-            "verbosity": "medium",
-            "emoji_usage": False,
-            "avg_message_length": 0,
-            "common_phrases": [],
-            "preferred_greeting": "Hello"
-        }
-        self.save_memory()
+        with self._lock:
+            self.user_facts = {}
+            self.interests = {}
+            self.communication_style = {
+                "formality": "neutral",
+                "verbosity": "medium",
+                "emoji_usage": False,
+                "avg_message_length": 0,
+                "preferred_greeting": "Hello"
+            }
+            self.phrase_stats = PhraseStats()
+            if self.shared:
+                # Overwrite rather than merge: what other workers learned goes too
+                self._unsynced.clear()
+                self._dirty.clear()
+                with self.profile.db.transaction(immediate=True):
+                    self._revision = self.profile.get_preference(REVISION_KEY, 0) + 1
+                    self._write_fields(("user_facts", "interests", "communication_style", "phrase_stats"),
+                                       {REVISION_KEY: self._revision})
+            else:
+                self._dirty.update(("user_facts", "interests", "communication_style", "phrase_stats"))
+                self.save_memory()
         logger.info("User memory cleared")
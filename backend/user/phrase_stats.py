@@ -0,0 +1,169 @@
+"""
+Phrase Statistics
+Streaming heavy-hitter counts of the user's common phrases in bounded memory
+"""
+
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+# Phrase lengths tracked (bigrams and trigrams)
+PHRASE_ORDERS = (2, 3)
+
+# Phrases tracked per order; frequent phrases are kept, rare ones are recycled
+PHRASE_CAPACITY = 200
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch (Metwally et al.)
+
+    Tracks at most `capacity` items. When a new item arrives and the sketch
+    is full, the item with the lowest count is replaced and the newcomer
+    inherits that count (recorded as its error). Any item seen more than
+    N / capacity times out of N is guaranteed to be tracked, and its true
+    count lies between count - error and count.
+
+    Items are grouped in buckets by count, so updates and evictions are O(1).
+    """
+
+    def __init__(self, capacity: int = PHRASE_CAPACITY):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # count -> items with that count, oldest first
+        self._buckets: Dict[int, Dict[str, None]] = {}
+        self._min_count = 0
+
+    def add(self, item: str):
+        """Count one occurrence of an item"""
+        count = self.counts.get(item)
+
+        if count is not None:
+            self._move(item, count, count + 1)
+            if count == self._min_count and count not in self._buckets:
+                self._min_count = count + 1
+            return
+
+        if len(self.counts) < self.capacity:
+            self.counts[item] = 1
+            self.errors[item] = 0
+            self._buckets.setdefault(1, {})[item] = None
+            self._min_count = 1
+            return
+
+        # Full: replace the oldest item with the lowest count
+        floor = self._min_count
+        bucket = self._buckets[floor]
+        victim = next(iter(bucket))
+        del bucket[victim]
+        if not bucket:
+            del self._buckets[floor]
+            self._min_count = floor + 1
+        del self.counts[victim]
+        del self.errors[victim]
+
+        self.counts[item] = floor + 1
+        self.errors[item] = floor
+        self._buckets.setdefault(floor + 1, {})[item] = None
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """
+        Most frequent items
+
+        Args:
+            k: Number of items to return
+
+        Returns:
+            List of (item, count, error), highest count first
+        """
+        items = sorted(self.counts.items(), key=lambda x: x[1], reverse=True)[:k]
+        return [(item, count, self.errors[item]) for item, count in items]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact serializable form"""
+        # Highest count first, and newest first within a count, so that
+        # from_dict (which reads it backwards) restores the eviction order
+        return {
+            "capacity": self.capacity,
+            "items": [
+                [item, count, self.errors[item]]
+                for count in sorted(self._buckets, reverse=True)
+                for item in reversed(self._buckets[count])
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], capacity: int = PHRASE_CAPACITY) -> "SpaceSaving":
+        """Rebuild a sketch from to_dict() output"""
+        sketch = cls(data.get("capacity", capacity))
+        # Lowest counts first, so eviction order survives a round trip
+        for item, count, error in reversed(data.get("items", [])[:sketch.capacity]):
+            sketch.counts[item] = count
+            sketch.errors[item] = error
+            sketch._buckets.setdefault(count, {})[item] = None
+        if sketch._buckets:
+            sketch._min_count = min(sketch._buckets)
+        return sketch
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _move(self, item: str, old: int, new: int):
+        """Move an item between count buckets"""
+        bucket = self._buckets[old]
+        del bucket[item]
+        if not bucket:
+            del self._buckets[old]
+        self.counts[item] = new
+        self._buckets.setdefault(new, {})[item] = None
+
+
+class PhraseStats:
+    """Heavy-hitter phrase counts for each tracked phrase length"""
+
+    def __init__(self, orders: Sequence[int] = PHRASE_ORDERS, capacity: int = PHRASE_CAPACITY):
+        self.sketches = {n: SpaceSaving(capacity) for n in orders}
+
+    def add_words(self, words: List[str]):
+        """Count every n-gram of a tokenized message"""
+        for n, sketch in self.sketches.items():
+            for i in range(len(words) - n + 1):
+                sketch.add(' '.join(words[i:i + n]))
+
+    def add_phrases(self, phrases: Iterable[str]):
+        """Count already-joined phrases (e.g. from older saved data)"""
+        for phrase in phrases:
+            sketch = self.sketches.get(len(phrase.split()))
+            if sketch is not None:
+                sketch.add(phrase)
+
+    def top(self, k: int = 20) -> List[Tuple[str, int]]:
+        """
+        Most frequent phrases across all lengths
+
+        Args:
+            k: Number of phrases to return
+
+        Returns:
+            List of (phrase, count), most frequent first
+        """
+        entries = [
+            (phrase, count)
+            for sketch in self.sketches.values()
+            for phrase, count, _ in sketch.top(k)
+        ]
+        entries.sort(key=lambda x: x[1], reverse=True)
+        return entries[:k]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact serializable form"""
+        return {str(n): sketch.to_dict() for n, sketch in self.sketches.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], orders: Sequence[int] = PHRASE_ORDERS,
+                  capacity: int = PHRASE_CAPACITY) -> "PhraseStats":
+        """Rebuild phrase stats from to_dict() output"""
+        stats = cls(orders, capacity)
+        for n in orders:
+            if str(n) in data:
+                stats.sketches[n] = SpaceSaving.from_dict(data[str(n)], capacity)
+        return stats
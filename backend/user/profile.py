@@ -1,15 +1,73 @@
 """User profile and personalization system"""
 
+import base64
 import json
-import sqlite3
 from pathlib import Path
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 
 from core.logger import setup_logger
+from core.database import get_database, fts_index_statements, fts_match_query
+from user.archive import ConversationArchive
 
 logger = setup_logger("UserProfile")
 
+# Schema changes applied after the base tables exist (see Database.migrate).
+# Append new migrations; never edit released ones.
+SCHEMA_MIGRATIONS = [
+    # 1: full-text index of conversation history
+    fts_index_statements("conversations", ["user_input", "assistant_response"]),
+    # 2: history reads and retention go by timestamp
+    ["CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations(timestamp)"],
+]
+
+# Conversation timestamps, as stored (UTC, like CURRENT_TIMESTAMP)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Exchanges per page of history
+HISTORY_PAGE_SIZE = 20
+
+# Exchanges moved to the archive per transaction
+ARCHIVE_BATCH_SIZE = 5000
+
+# Words of context around each match in search snippets
+SNIPPET_WORDS = 12
+
+# Conversation searches rank only this many of the newest matches, so a
+# very common word costs the same after years of history as after a month
+SEARCH_RANK_WINDOW = 2000
+
+
+def encode_history_cursor(item: Dict[str, Any]) -> str:
+    """
+    Build the cursor that continues a history listing after this exchange
+    
+    Args:
+        item: Last (oldest) exchange of a page
+    
+    Returns:
+        Opaque URL-safe cursor string
+    """
+    key = [item["timestamp"] or "", item["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_history_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Parse a cursor from encode_history_cursor()
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    
+    if not (isinstance(timestamp, str) and isinstance(item_id, int)):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return timestamp, item_id
+
 
 class UserProfile:
     """Manages user profile and personalization"""
@@ -20,165 +78,346 @@ class UserProfile:
         
         self.db_path = self.data_dir / "user_profile.db"
         self.user_name = user_name
+        self.db = get_database(self.db_path)
         
         self._init_database()
+        
+        # History older than the retention window, in compressed chunks
+        self.archive = ConversationArchive(self.data_dir / "conversation_archive.db")
+        
+        # Conversation rows are written behind the chat path in batches
+        self.conversation_writer = self.db.write_behind("""
+            INSERT INTO conversations (user_input, assistant_response, timestamp)
+            VALUES (?, ?, ?)
+        """)
     
     def _init_database(self):
         """Initialize SQLite database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # User preferences table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS preferences (
-                key TEXT PRIMARY KEY,
-                value TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Conversation history table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS conversations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_input TEXT,
-                assistant_response TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        with self.db.transaction() as cursor:
+            # User preferences table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS preferences (
+                    key TEXT PRIMARY KEY,
+                    value TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Conversation history table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS conversations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_input TEXT,
+                    assistant_response TEXT,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # User habits/patterns table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS user_patterns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    pattern_type TEXT,
+                    pattern_data TEXT,
+                    frequency INTEGER DEFAULT 1,
+                    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
         
-        # User habits/patterns table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_patterns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pattern_type TEXT,
-                pattern_data TEXT,
-                frequency INTEGER DEFAULT 1,
-                last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        self.db.migrate(SCHEMA_MIGRATIONS)
         
-        conn.commit()
-        conn.close()
         logger.info("User profile database initialized")
     
     def set_preference(self, key: str, value: Any):
         """Set user preference"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO preferences (key, value, updated_at)
-            VALUES (?, ?, ?)
-        """, (key, json.dumps(value), datetime.now()))
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                INSERT OR REPLACE INTO preferences (key, value, updated_at)
+                VALUES (?, ?, ?)
+            """, (key, json.dumps(value), datetime.now()))
         
-        conn.commit()
-        conn.close()
         logger.info(f"Preference set: {key}")
     
+    def set_preferences(self, values: Dict[str, Any]):
+        """Set several user preferences in one transaction"""
+        now = datetime.now()
+        with self.db.transaction() as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO preferences (key, value, updated_at)
+                VALUES (?, ?, ?)
+            """, [(key, json.dumps(value), now) for key, value in values.items()])
+        
+        logger.info(f"Preferences set: {', '.join(values)}")
+    
     def get_preference(self, key: str, default: Any = None) -> Any:
         """Get user preference"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT value FROM preferences WHERE key = ?", (key,))
-        row = cursor.fetchone()
-        conn.close()
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT value FROM preferences WHERE key = ?", (key,))
+            row = cursor.fetchone()
         
         if row:
             return json.loads(row[0])
         return default
     
     def save_conversation(self, user_input: str, assistant_response: str):
-        """Save conversation to history"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO conversations (user_input, assistant_response)
-            VALUES (?, ?)
-        """, (user_input, assistant_response))
-        
-        conn.commit()
-        conn.close()
+        """Queue conversation for saving to history (written in background batches)"""
+        # Stamp now, in the same UTC format as CURRENT_TIMESTAMP, not at flush time
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        self.conversation_writer.put((user_input, assistant_response, timestamp))
+    
+    def flush(self):
+        """Wait until queued conversation rows are committed"""
+        self.conversation_writer.flush()
     
     def get_conversation_history(self, limit: int = 10) -> list:
-        """Get recent conversation history"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Get recent conversation history, oldest first (reads into the archive if needed)"""
+        return list(reversed(self.get_conversation_page(limit)["items"]))
+    
+    def get_conversation_page(self, limit: int = HISTORY_PAGE_SIZE,
+                              cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get a page of conversation history, newest first
         
-        cursor.execute("""
-            SELECT user_input, assistant_response, timestamp
-            FROM conversations
-            ORDER BY timestamp DESC
-            LIMIT ?
-        """, (limit,))
+        Pages run from the main database on into the archive, so callers
+        don't need to know where an exchange is kept.
         
-        rows = cursor.fetchall()
-        conn.close()
+        Args:
+            limit: Exchanges per page
+            cursor: next_cursor of the previous page
         
-        return [
+        Returns:
+            {"items": [...], "next_cursor": cursor for the next page, or None}
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        before = decode_history_cursor(cursor) if cursor else None
+        self.flush()
+        
+        with self.db.transaction() as db_cursor:
+            if before is None:
+                db_cursor.execute("""
+                    SELECT id, user_input, assistant_response, timestamp
+                    FROM conversations
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                """, (limit + 1,))
+            else:
+                db_cursor.execute("""
+                    SELECT id, user_input, assistant_response, timestamp
+                    FROM conversations
+                    WHERE (timestamp, id) < (?, ?)
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                """, (*before, limit + 1))
+            rows = db_cursor.fetchall()
+        
+        items = [
             {
-                "user": row[0],
-                "assistant": row[1],
-                "timestamp": row[2]
+                "id": row[0],
+                "user": row[1],
+                "assistant": row[2],
+                "timestamp": row[3]
             }
-            for row in reversed(rows)
+            for row in rows
         ]
+        
+        # Everything archived is older than everything still in the table
+        if len(items) <= limit:
+            items += self.archive.history(limit + 1 - len(items), before)
+        
+        if len(items) > limit:
+            items = items[:limit]
+            return {"items": items, "next_cursor": encode_history_cursor(items[-1])}
+        return {"items": items, "next_cursor": None}
     
-    def learn_pattern(self, pattern_type: str, pattern_data: Dict):
-        """Learn user patterns for personalization"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def archive_conversations(self, hot_days: int) -> int:
+        """
+        Move conversations older than hot_days into the archive
         
-        pattern_json = json.dumps(pattern_data)
+        Rows are archived before they're deleted here, in batches, so an
+        interrupted pass loses nothing and the next one picks up after it.
+        The archive indexes their text, so they stay searchable.
         
-        # Check if pattern exists
-        cursor.execute("""
-            SELECT id, frequency FROM user_patterns
-            WHERE pattern_type = ? AND pattern_data = ?
-        """, (pattern_type, pattern_json))
+        Args:
+            hot_days: Days of history to keep in the main database
         
-        row = cursor.fetchone()
+        Returns:
+            Number of exchanges moved
+        """
+        self.flush()
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=hot_days)).strftime(TIMESTAMP_FORMAT)
         
-        if row:
-            # Increment frequency
-            cursor.execute("""
-                UPDATE user_patterns
-                SET frequency = frequency + 1, last_seen = ?
-                WHERE id = ?
-            """, (datetime.now(), row[0]))
-        else:
-            # Insert new pattern
+        moved = 0
+        while True:
+            with self.db.transaction() as cursor:
+                cursor.execute("""
+                    SELECT id, user_input, assistant_response, timestamp
+                    FROM conversations
+                    WHERE timestamp < ?
+                    ORDER BY timestamp, id
+                    LIMIT ?
+                """, (cutoff, ARCHIVE_BATCH_SIZE))
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            
+            self.archive.append(rows)
+            with self.db.transaction(immediate=True) as cursor:
+                cursor.execute(
+                    "DELETE FROM conversations WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps([row[0] for row in rows]),)
+                )
+            moved += len(rows)
+        
+        if moved:
+            # Deletes only add tombstones to the full-text index; merge them away
+            with self.db.transaction(immediate=True) as cursor:
+                cursor.execute("INSERT INTO conversations_fts(conversations_fts) VALUES ('optimize')")
+            logger.info(f"Archived {moved} conversations older than {hot_days} days")
+        return moved
+    
+    def compact_history(self, hot_days: int) -> Dict[str, int]:
+        """
+        Archive old conversations, then return freed space to the filesystem
+        
+        Args:
+            hot_days: Days of history to keep in the main database
+        
+        Returns:
+            {"archived": exchanges moved, "pages_freed": pages given back}
+        """
+        archived = self.archive_conversations(hot_days)
+        pages_freed = self.db.reclaim_space() + self.archive.db.reclaim_space()
+        return {"archived": archived, "pages_freed": pages_freed}
+    
+    def get_history_stats(self) -> Dict[str, Any]:
+        """Exchanges in the main database and in the archive"""
+        self.flush()
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT COUNT(*), MIN(timestamp) FROM conversations")
+            rows, oldest = cursor.fetchone()
+        return {"hot": {"rows": rows, "oldest": oldest}, "archive": self.archive.stats()}
+    
+    def search_conversations(self, query: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Full-text search of conversation history, best matches first
+        
+        Args:
+            query: Words to look for (all must appear)
+            limit: Maximum number of results
+            offset: Number of results to skip (for paging)
+        
+        Archived exchanges are searched too; the two indexes' matches are
+        merged by score.
+        
+        Returns:
+            Matching exchanges with a highlighted snippet and a relevance
+            score (higher is better), from the newest SEARCH_RANK_WINDOW
+            matches in the main database and in the archive
+        """
+        match = fts_match_query(query)
+        if not match:
+            return []
+        
+        self.flush()
+        
+        # The merged page can only hold each index's top offset + limit matches
+        wanted = offset + limit
+        
+        # Rank the newest matches first, then build rows and snippets for just
+        # this page; otherwise SQLite makes them for every match before sorting
+        with self.db.transaction() as cursor:
+            cursor.execute(f"""
+                WITH recent AS (
+                    SELECT rowid AS id, rank
+                    FROM conversations_fts
+                    WHERE conversations_fts MATCH ?1
+                    ORDER BY rowid DESC
+                    LIMIT {SEARCH_RANK_WINDOW}
+                ),
+                ranked AS (
+                    SELECT id, rank FROM recent
+                    ORDER BY rank, id DESC
+                    LIMIT ?2
+                )
+                SELECT c.id, c.user_input, c.assistant_response, c.timestamp,
+                    snippet(conversations_fts, -1, '**', '**', '…', {SNIPPET_WORDS}), r.rank
+                FROM ranked r
+                JOIN conversations c ON c.id = r.id
+                JOIN conversations_fts f ON f.rowid = r.id
+                WHERE conversations_fts MATCH ?1
+                ORDER BY r.rank, r.id DESC
+            """, (match, wanted))
+            rows = cursor.fetchall()
+        
+        results = [
+            {
+                "source": "conversations",
+                "id": row[0],
+                "user": row[1],
+                "assistant": row[2],
+                "timestamp": row[3],
+                "snippet": row[4],
+                "score": -row[5]
+            }
+            for row in rows
+        ]
+        
+        # An exchange archived but not yet deleted here is only listed once
+        live_ids = {result["id"] for result in results}
+        results += [
+            result for result in self.archive.search(match, wanted, SEARCH_RANK_WINDOW, SNIPPET_WORDS)
+            if result["id"] not in live_ids
+        ]
+        results.sort(key=lambda result: (-result["score"], -result["id"]))
+        return results[offset:offset + limit]
+    
+    def learn_pattern(self, pattern_type: str, pattern_data: Dict):
+        """Learn user patterns for personalization"""
+        with self.db.transaction() as cursor:
+            pattern_json = json.dumps(pattern_data)
+            
+            # Check if pattern exists
             cursor.execute("""
-                INSERT INTO user_patterns (pattern_type, pattern_data)
-                VALUES (?, ?)
+                SELECT id, frequency FROM user_patterns
+                WHERE pattern_type = ? AND pattern_data = ?
             """, (pattern_type, pattern_json))
-        
-        conn.commit()
-        conn.close()
+            
+            row = cursor.fetchone()
+            
+            if row:
+                # Increment frequency
+                cursor.execute("""
+                    UPDATE user_patterns
+                    SET frequency = frequency + 1, last_seen = ?
+                    WHERE id = ?
+                """, (datetime.now(), row[0]))
+            else:
+                # Insert new pattern
+                cursor.execute("""
+                    INSERT INTO user_patterns (pattern_type, pattern_data)
+                    VALUES (?, ?)
+                """, (pattern_type, pattern_json))
     
     def get_patterns(self, pattern_type: Optional[str] = None) -> list:
         """Get learned patterns"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if pattern_type:
-            cursor.execute("""
-                SELECT pattern_type, pattern_data, frequency, last_seen
-                FROM user_patterns
-                WHERE pattern_type = ?
-                ORDER BY frequency DESC
-            """, (pattern_type,))
-        else:
-            cursor.execute("""
-                SELECT pattern_type, pattern_data, frequency, last_seen
-                FROM user_patterns
-                ORDER BY frequency DESC
-            """)
-        
-        rows = cursor.fetchall()
-        conn.close()
+        with self.db.transaction() as cursor:
+            if pattern_type:
+                cursor.execute("""
+                    SELECT pattern_type, pattern_data, frequency, last_seen
+                    FROM user_patterns
+                    WHERE pattern_type = ?
+                    ORDER BY frequency DESC
+                """, (pattern_type,))
+            else:
+                cursor.execute("""
+                    SELECT pattern_type, pattern_data, frequency, last_seen
+                    FROM user_patterns
+                    ORDER BY frequency DESC
+                """)
+            
+            rows = cursor.fetchall()
         
         return [
             {
@@ -200,12 +439,10 @@ class UserProfile:
         }
         
         # Get all preferences
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT key, value FROM preferences")
-        for row in cursor.fetchall():
-            export_data["preferences"][row[0]] = json.loads(row[1])
-        conn.close()
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT key, value FROM preferences")
+            for row in cursor.fetchall():
+                export_data["preferences"][row[0]] = json.loads(row[1])
         
         # Save to file
         with open(export_path, 'w') as f:
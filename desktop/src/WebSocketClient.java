@@ -50,7 +50,7 @@ public class WebSocketClient implements WebSocket.Listener {
                 JSONObject json = new JSONObject(message);
                 String type = json.getString("type");
                 
-                if (type.equals("welcome") || type.equals("response")) {
+                if (type.equals("welcome") || type.equals("response") || type.equals("reminder")) {
                     String text = json.optString("message", json.optString("text", ""));
                     client.onMessage(text);
                 }